@@ -0,0 +1,37 @@
+"""document ingestion status
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('document', sa.Column('status', sa.String(), server_default='ready', nullable=False))
+    op.add_column('document', sa.Column('chunks_total', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('document', sa.Column('chunks_processed', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('document', sa.Column('error', sa.Text(), nullable=True))
+    op.execute(
+        "UPDATE document SET chunks_total = counts.n, chunks_processed = counts.n "
+        "FROM (SELECT document_id, count(*) AS n FROM documentchunk GROUP BY document_id) AS counts "
+        "WHERE counts.document_id = document.id"
+    )
+    op.create_index(op.f('ix_documentchunk_document_id'), 'documentchunk', ['document_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_documentchunk_document_id'), table_name='documentchunk')
+    op.drop_column('document', 'error')
+    op.drop_column('document', 'chunks_processed')
+    op.drop_column('document', 'chunks_total')
+    op.drop_column('document', 'status')
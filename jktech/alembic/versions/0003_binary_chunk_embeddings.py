@@ -0,0 +1,68 @@
+"""store chunk embeddings as float32 bytes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+import numpy as np
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def _array_to_bytes(value) -> bytes:
+    return np.asarray(value, dtype='<f4').tobytes()
+
+
+def _bytes_to_array(value) -> list:
+    return np.frombuffer(value, dtype='<f4').tolist()
+
+
+def _backfill(bind, select_sql: str, update_sql: str, convert, batch_size: int = BACKFILL_BATCH_SIZE) -> None:
+    """Copy embeddings between the old and new column in batches of chunk IDs."""
+    last_id = 0
+    while True:
+        rows = bind.execute(sa.text(select_sql), {"last_id": last_id, "limit": batch_size}).all()
+        if not rows:
+            break
+        bind.execute(
+            sa.text(update_sql),
+            [{"id": chunk_id, "value": convert(value)} for chunk_id, value in rows]
+        )
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    op.add_column('documentchunk', sa.Column('embedding_vec', sa.LargeBinary(), nullable=True))
+    _backfill(
+        op.get_bind(),
+        "SELECT id, embedding FROM documentchunk "
+        "WHERE id > :last_id AND embedding IS NOT NULL ORDER BY id LIMIT :limit",
+        "UPDATE documentchunk SET embedding_vec = :value WHERE id = :id",
+        _array_to_bytes
+    )
+    op.drop_column('documentchunk', 'embedding')
+    op.alter_column('documentchunk', 'embedding_vec', new_column_name='embedding')
+
+
+def downgrade() -> None:
+    op.add_column('documentchunk', sa.Column('embedding_arr', postgresql.ARRAY(sa.Float()), nullable=True))
+    _backfill(
+        op.get_bind(),
+        "SELECT id, embedding FROM documentchunk "
+        "WHERE id > :last_id AND embedding IS NOT NULL ORDER BY id LIMIT :limit",
+        "UPDATE documentchunk SET embedding_arr = :value WHERE id = :id",
+        _bytes_to_array
+    )
+    op.drop_column('documentchunk', 'embedding')
+    op.alter_column('documentchunk', 'embedding_arr', new_column_name='embedding')
@@ -0,0 +1,49 @@
+"""L2-normalize stored chunk embeddings
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import numpy as np
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.text(
+                "SELECT id, embedding FROM documentchunk "
+                "WHERE id > :last_id AND embedding IS NOT NULL ORDER BY id LIMIT :limit"
+            ),
+            {"last_id": last_id, "limit": BATCH_SIZE}
+        ).all()
+        if not rows:
+            break
+
+        updates = []
+        for chunk_id, value in rows:
+            vector = np.frombuffer(value, dtype='<f4')
+            norm = np.linalg.norm(vector)
+            if norm > 0 and not np.isclose(norm, 1.0):
+                updates.append({"id": chunk_id, "value": (vector / norm).astype('<f4').tobytes()})
+        if updates:
+            bind.execute(sa.text("UPDATE documentchunk SET embedding = :value WHERE id = :id"), updates)
+        last_id = rows[-1][0]
+
+
+def downgrade() -> None:
+    # Normalized vectors are valid input for the previous retrieval code
+    pass
@@ -0,0 +1,42 @@
+"""chunk content hash for embedding reuse
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.core.config import settings
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('documentchunk', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('documentchunk', sa.Column('embedding_model', sa.String(), nullable=True))
+    op.add_column('document', sa.Column('embeddings_reused', sa.Integer(), server_default='0', nullable=False))
+
+    # Existing embeddings were produced by the configured model
+    op.execute(
+        sa.text(
+            "UPDATE documentchunk "
+            "SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex'), "
+            "embedding_model = CASE WHEN embedding IS NOT NULL THEN :model END"
+        ).bindparams(model=settings.EMBEDDING_MODEL)
+    )
+    op.create_index(
+        'ix_documentchunk_content_hash_model', 'documentchunk', ['content_hash', 'embedding_model'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_documentchunk_content_hash_model', table_name='documentchunk')
+    op.drop_column('document', 'embeddings_reused')
+    op.drop_column('documentchunk', 'embedding_model')
+    op.drop_column('documentchunk', 'content_hash')
@@ -0,0 +1,78 @@
+"""lexical inverted index over chunk terms
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.models.document import chunk_terms
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    op.add_column('documentchunk', sa.Column('term_count', sa.Integer(), nullable=True))
+    op.create_table(
+        'chunkterm',
+        sa.Column('term', sa.String(length=64), nullable=False),
+        sa.Column('chunk_id', sa.Integer(), nullable=False),
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('term_frequency', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['chunk_id'], ['documentchunk.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['document_id'], ['document.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('term', 'chunk_id')
+    )
+    op.create_index(op.f('ix_chunkterm_document_id'), 'chunkterm', ['document_id'], unique=False)
+
+    # Index the terms of existing chunks
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.text(
+                "SELECT id, document_id, content FROM documentchunk "
+                "WHERE id > :last_id ORDER BY id LIMIT :limit"
+            ),
+            {"last_id": last_id, "limit": BATCH_SIZE}
+        ).all()
+        if not rows:
+            break
+
+        postings = []
+        counts = []
+        for chunk_id, document_id, content in rows:
+            terms = chunk_terms(content)
+            counts.append({"id": chunk_id, "term_count": sum(terms.values())})
+            postings.extend(
+                {"term": term, "chunk_id": chunk_id, "document_id": document_id, "term_frequency": frequency}
+                for term, frequency in terms.items()
+            )
+        bind.execute(sa.text("UPDATE documentchunk SET term_count = :term_count WHERE id = :id"), counts)
+        if postings:
+            bind.execute(
+                sa.text(
+                    "INSERT INTO chunkterm (term, chunk_id, document_id, term_frequency) "
+                    "VALUES (:term, :chunk_id, :document_id, :term_frequency)"
+                ),
+                postings
+            )
+        last_id = rows[-1][0]
+
+    # Built after the backfill so the bulk insert doesn't maintain it row by row
+    op.create_index('ix_chunkterm_term_document', 'chunkterm', ['term', 'document_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_chunkterm_term_document', table_name='chunkterm')
+    op.drop_index(op.f('ix_chunkterm_document_id'), table_name='chunkterm')
+    op.drop_table('chunkterm')
+    op.drop_column('documentchunk', 'term_count')
@@ -0,0 +1,30 @@
+"""indexes for keyset pagination on (created_at, id)
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_document_user_created', 'document', ['user_id', 'created_at', 'id'])
+    op.create_index('ix_document_created', 'document', ['created_at', 'id'])
+    op.create_index('ix_qasession_user_created', 'qasession', ['user_id', 'created_at', 'id'])
+    op.create_index('ix_user_created', 'user', ['created_at', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_created', table_name='user')
+    op.drop_index('ix_qasession_user_created', table_name='qasession')
+    op.drop_index('ix_document_created', table_name='document')
+    op.drop_index('ix_document_user_created', table_name='document')
@@ -0,0 +1,24 @@
+"""index for paging through a document's chunks in order
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_documentchunk_document_index', 'documentchunk', ['document_id', 'chunk_index'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_documentchunk_document_index', table_name='documentchunk')
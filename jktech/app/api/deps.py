@@ -1,23 +1,31 @@
-from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from typing import AsyncGenerator, Generator, Optional
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.base import get_async_session
-from app.models.user import User
+from app.db.replica import WRITE_COOKIE, replica_router
 from app.core.security import ALGORITHM
 from app.core.config import settings
 from app.services.user_service import UserService
+from app.services.principal_cache import Principal, principal_cache
+from app.services.embedding_service import EmbeddingService
+from app.services.document_service import DocumentService
+from app.services.rag_service import RAGService
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_PREFIX}/auth/login")
 
 async def get_current_user(
     session: AsyncSession = Depends(get_async_session),
     token: str = Depends(oauth2_scheme)
-) -> User:
-    """Get the current user from the token."""
+) -> Principal:
+    """Get the current user from the token.
+
+    The user's ID and roles are cached per worker for a short TTL, so most
+    requests authenticate without a database lookup.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -31,17 +39,45 @@ async def get_current_user(
     except (JWTError, ValidationError):
         raise credentials_exception
 
-    user_service = UserService()
-    user = await user_service.get_user(session, int(user_id))
-    if user is None:
-        raise credentials_exception
-    if not user.is_active:
+    principal = principal_cache.get(int(user_id))
+    if principal is None:
+        generation = principal_cache.generation()
+        user = await UserService().get_user(session, int(user_id))
+        if user is None:
+            raise credentials_exception
+        principal = Principal.from_user(user)
+        principal_cache.put(principal, generation)
+    if not principal.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return user
+    # Commits on this session count as the user's writes for read-your-writes
+    session.info["user_id"] = principal.id
+    return principal
+
+async def get_read_session(
+    request: Request,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_user)
+) -> AsyncGenerator[AsyncSession, None]:
+    """Get a session for read-only work on the read replica.
+
+    Falls back to the request's primary session when no replica is
+    configured, when the replica is unhealthy or lagging, and right after
+    the user's own writes, whether made on this worker or, going by the
+    request's write cookie, on another.
+    """
+    if not await replica_router.use_replica(current_user.id, request.cookies.get(WRITE_COOKIE)):
+        replica_router.primary_reads.inc()
+        yield session
+        return
+
+    replica_router.replica_reads.inc()
+    async with replica_router.session_maker() as read_session:
+        read_session.info["user_id"] = current_user.id
+        yield read_session
 
 async def get_current_active_superuser(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: Principal = Depends(get_current_user),
+) -> Principal:
     """Check if the current user is a superuser."""
     if not current_user.is_superuser:
         raise HTTPException(
@@ -49,3 +85,32 @@ async def get_current_active_superuser(
             detail="The user doesn't have enough privileges",
         )
     return current_user
+
+def get_embedding_service() -> EmbeddingService:
+    """Get an embedding service backed by the shared model registry."""
+    return EmbeddingService()
+
+def get_document_service(
+    embedding_service: EmbeddingService = Depends(get_embedding_service),
+) -> DocumentService:
+    """Get a document service using the shared embedding model."""
+    return DocumentService(embedding_service=embedding_service)
+
+def get_rag_service(
+    embedding_service: EmbeddingService = Depends(get_embedding_service),
+) -> RAGService:
+    """Get a RAG service using the shared embedding model."""
+    return RAGService(embedding_service=embedding_service)
+
+async def release_sessions(*sessions: AsyncSession) -> None:
+    """Close the request's sessions so their connections go back to the pool.
+
+    Dependency sessions are only torn down after the response has been sent,
+    so endpoints returning a long-running stream release them first and let
+    the stream open its own.
+    """
+    closed = set()
+    for session in sessions:
+        if id(session) not in closed:
+            closed.add(id(session))
+            await session.close()
@@ -0,0 +1,36 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends
+
+from app.core.metrics import metrics
+from app.db.engine import engine_stats
+from app.db.replica import replica_router
+from app.services.principal_cache import Principal
+from app.services.model_registry import model_registry
+from app.api.deps import get_current_active_superuser
+
+router = APIRouter()
+
+@router.get("/models")
+async def read_model_stats(
+    current_user: Principal = Depends(get_current_active_superuser)
+) -> Any:
+    """Get load time and memory footprint of the loaded embedding models (superuser only)."""
+    return model_registry.stats()
+
+@router.get("/metrics")
+async def read_metrics(
+    current_user: Principal = Depends(get_current_active_superuser)
+) -> Any:
+    """Get the current value of every in-process metric (superuser only)."""
+    return metrics.snapshot()
+
+@router.get("/db")
+async def read_database_stats(
+    current_user: Principal = Depends(get_current_active_superuser)
+) -> Any:
+    """Get pool status, slow queries and read-replica routing of the database engines (superuser only)."""
+    return {
+        "engines": engine_stats(),
+        "read_routing": replica_router.stats(),
+    }
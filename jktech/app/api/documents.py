@@ -1,113 +1,322 @@
-from typing import Any, List
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+import codecs
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Request, Response
+from pydantic import ValidationError, parse_obj_as
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.base import get_async_session
-from app.models.user import User
-from app.schemas.document import DocumentCreate, Document as DocumentSchema
+from app.core.config import settings
+from app.models.document import Document
+from app.services.principal_cache import Principal
+from app.schemas.document import (
+    BulkDocumentResult, DocumentChunkInDB, DocumentCreate, DocumentExport, DocumentRead, DocumentStatus,
+    DocumentSummary
+)
 from app.services.document_service import DocumentService
-from app.api.deps import get_current_user
+from app.services.ingestion_service import ingestion_pipeline, IngestionQueueFullError
+from app.api.deps import get_current_active_superuser, get_current_user, get_document_service, get_read_session
+from app.api.pagination import PageParams, get_page_params, ndjson_export, set_next_page
 
 router = APIRouter()
 
-@router.post("/", response_model=DocumentSchema, status_code=status.HTTP_201_CREATED)
+# Parts of a document left out of responses unless requested with ?include=
+DOCUMENT_INCLUDES = ("content", "chunks")
+
+def get_document_includes(
+    include: Optional[str] = Query(
+        None, description=f"Comma-separated parts to add to each document: {', '.join(DOCUMENT_INCLUDES)}"
+    )
+) -> Set[str]:
+    """Get the optional document parts a request asked for."""
+    includes = {part.strip() for part in include.split(",") if part.strip()} if include else set()
+    unknown = includes.difference(DOCUMENT_INCLUDES)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown include: {', '.join(sorted(unknown))}"
+        )
+    return includes
+
+def _document_view(document: Document, includes: Set[str]) -> DocumentRead:
+    """Summary of a document with only the requested parts added, so nothing else is read from it."""
+    return DocumentRead(
+        **DocumentSummary.from_orm(document).dict(),
+        **{part: getattr(document, part) for part in includes}
+    )
+
+async def _get_accessible_document(
+    session: AsyncSession,
+    document_service: DocumentService,
+    document_id: int,
+    current_user: Principal,
+    **options: bool
+) -> Document:
+    """Get a document the current user may read, or raise 404/403."""
+    document = await document_service.get_document(session, document_id, **options)
+
+    if not document:
+        raise HTTPException(
+            status_code=404,
+            detail="Document not found"
+        )
+
+    # Check if user has access to this document
+    if document.user_id != current_user.id and not current_user.is_superuser:
+        raise HTTPException(
+            status_code=403,
+            detail="Not enough permissions"
+        )
+
+    return document
+
+async def _iter_upload_text(file: UploadFile) -> AsyncIterator[str]:
+    """Decode an uploaded file as UTF-8 text block by block, up to ``UPLOAD_MAX_BYTES``."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    received = 0
+    while True:
+        data = await file.read(settings.UPLOAD_READ_BLOCK_BYTES)
+        if not data:
+            break
+        received += len(data)
+        if received > settings.UPLOAD_MAX_BYTES:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File is larger than {settings.UPLOAD_MAX_BYTES} bytes"
+            )
+        text = decoder.decode(data)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+def _parse_ndjson_document(line: bytes, line_number: int) -> Optional[Dict[str, str]]:
+    if not line.strip():
+        return None
+    try:
+        return DocumentCreate.parse_raw(line).dict()
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Invalid document on line {line_number}: {str(e)}"
+        )
+
+async def _iter_ndjson_documents(request: Request) -> AsyncIterator[Dict[str, str]]:
+    """Parse documents from an NDJSON request body as it is received."""
+    buffer = b""
+    line_number = 0
+    async for data in request.stream():
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            document = _parse_ndjson_document(line, line_number)
+            if document is not None:
+                yield document
+    document = _parse_ndjson_document(buffer, line_number + 1)
+    if document is not None:
+        yield document
+
+def _ensure_ingestion_capacity() -> None:
+    if ingestion_pipeline.is_full():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many documents are being processed. Try again later."
+        )
+
+async def _submit_for_ingestion(session: AsyncSession, document_service: DocumentService, document) -> None:
+    """Queue a stored document for chunking and embedding."""
+    try:
+        ingestion_pipeline.submit(document.id)
+    except IngestionQueueFullError:
+        await document_service.delete_document(session, document.id)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many documents are being processed. Try again later."
+        )
+
+@router.post("/", response_model=DocumentSummary, status_code=status.HTTP_201_CREATED)
 async def create_document(
     *,
     session: AsyncSession = Depends(get_async_session),
     document_in: DocumentCreate,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user),
+    document_service: DocumentService = Depends(get_document_service)
 ) -> Any:
-    """Create new document."""
-    document_service = DocumentService()
+    """Create new document. Chunking and embedding happen in the background."""
+    _ensure_ingestion_capacity()
     document = await document_service.create_document(
         session=session,
         user_id=current_user.id,
         title=document_in.title,
         content=document_in.content,
-        content_type=document_in.content_type
+        content_type=document_in.content_type,
+        defer_processing=True
     )
+    await _submit_for_ingestion(session, document_service, document)
     return document
 
-@router.post("/upload", response_model=DocumentSchema, status_code=status.HTTP_201_CREATED)
+@router.post("/upload", response_model=DocumentSummary, status_code=status.HTTP_201_CREATED)
 async def upload_document(
     *,
     session: AsyncSession = Depends(get_async_session),
     file: UploadFile = File(...),
     title: str = Form(...),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user),
+    document_service: DocumentService = Depends(get_document_service)
 ) -> Any:
-    """Upload a document file."""
-    document_service = DocumentService()
-
-    # Read file content
-    content = await file.read()
-    content_str = content.decode("utf-8")
+    """Upload a document file. The file is streamed and never held in memory as a whole."""
+    _ensure_ingestion_capacity()
 
     # Determine content type from file
     content_type = file.content_type or "text/plain"
 
-    document = await document_service.create_document(
+    try:
+        document = await document_service.create_document_from_stream(
+            session=session,
+            user_id=current_user.id,
+            title=title,
+            text_stream=_iter_upload_text(file),
+            content_type=content_type
+        )
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=400,
+            detail="Uploaded file is not valid UTF-8 text"
+        )
+
+    await _submit_for_ingestion(session, document_service, document)
+    return document
+
+@router.post("/bulk", response_model=BulkDocumentResult, status_code=status.HTTP_201_CREATED)
+async def bulk_create_documents(
+    *,
+    request: Request,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_user),
+    document_service: DocumentService = Depends(get_document_service)
+) -> Any:
+    """Create many documents from a JSON array or an ``application/x-ndjson`` stream.
+
+    Documents are embedded and stored in batches as the body is read; batches
+    stored before an invalid NDJSON line are kept.
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith(("application/x-ndjson", "application/jsonl")):
+        documents = _iter_ndjson_documents(request)
+    else:
+        try:
+            documents = [document.dict() for document in parse_obj_as(List[DocumentCreate], await request.json())]
+        except (ValueError, ValidationError) as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Expected a JSON array of documents: {str(e)}"
+            )
+
+    return await document_service.bulk_create_documents(
         session=session,
         user_id=current_user.id,
-        title=title,
-        content=content_str,
-        content_type=content_type
+        documents=documents
     )
-    return document
 
-@router.get("/{document_id}", response_model=DocumentSchema)
+@router.get("/export")
+async def export_documents(
+    *,
+    session: AsyncSession = Depends(get_read_session),
+    primary_session: AsyncSession = Depends(get_async_session),
+    user_id: Optional[int] = None,
+    current_user: Principal = Depends(get_current_active_superuser),
+    document_service: DocumentService = Depends(get_document_service)
+) -> Any:
+    """Export all documents, or one user's, as newline-delimited JSON (superuser only)."""
+    return await ndjson_export(
+        session,
+        lambda export_session: document_service.stream_documents(export_session, user_id),
+        DocumentExport,
+        primary_session
+    )
+
+@router.get("/{document_id}", response_model=DocumentRead, response_model_exclude_unset=True)
 async def read_document(
     *,
-    session: AsyncSession = Depends(get_async_session),
+    session: AsyncSession = Depends(get_read_session),
     document_id: int,
-    current_user: User = Depends(get_current_user)
+    includes: Set[str] = Depends(get_document_includes),
+    current_user: Principal = Depends(get_current_user),
+    document_service: DocumentService = Depends(get_document_service)
 ) -> Any:
-    """Get document by ID."""
-    document_service = DocumentService()
-    document = await document_service.get_document(session, document_id)
-
-    if not document:
-        raise HTTPException(
-            status_code=404,
-            detail="Document not found"
-        )
+    """Get document by ID, with its content or chunks if requested."""
+    document = await _get_accessible_document(
+        session, document_service, document_id, current_user,
+        with_content="content" in includes, with_chunks="chunks" in includes
+    )
+    return _document_view(document, includes)
 
-    # Check if user has access to this document
-    if document.user_id != current_user.id and not current_user.is_superuser:
-        raise HTTPException(
-            status_code=403,
-            detail="Not enough permissions"
-        )
+@router.get("/{document_id}/chunks", response_model=List[DocumentChunkInDB])
+async def read_document_chunks(
+    *,
+    request: Request,
+    response: Response,
+    document_id: int,
+    page: PageParams = Depends(get_page_params),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: Principal = Depends(get_current_user),
+    document_service: DocumentService = Depends(get_document_service)
+) -> Any:
+    """Get a page of a document's chunks in order."""
+    await _get_accessible_document(session, document_service, document_id, current_user, with_content=False)
+    chunks, next_cursor = await document_service.get_chunks(
+        session, document_id, cursor=page.cursor, limit=page.limit
+    )
+    set_next_page(request, response, next_cursor)
 
-    return document
+    return chunks
 
-@router.get("/", response_model=List[DocumentSchema])
-async def read_documents(
+@router.get("/{document_id}/status", response_model=DocumentStatus)
+async def read_document_status(
     *,
     session: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user)
+    document_id: int,
+    current_user: Principal = Depends(get_current_user),
+    document_service: DocumentService = Depends(get_document_service)
 ) -> Any:
-    """Get all documents for current user."""
-    document_service = DocumentService()
+    """Get the ingestion status of a document."""
+    return await _get_accessible_document(
+        session, document_service, document_id, current_user, with_content=False
+    )
 
+@router.get("/", response_model=List[DocumentRead], response_model_exclude_unset=True)
+async def read_documents(
+    *,
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(get_page_params),
+    includes: Set[str] = Depends(get_document_includes),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: Principal = Depends(get_current_user),
+    document_service: DocumentService = Depends(get_document_service)
+) -> Any:
+    """Get a page of documents for current user."""
     # If superuser, get all documents, otherwise only user's documents
-    if current_user.is_superuser:
-        documents = await document_service.get_documents(session)
-    else:
-        documents = await document_service.get_documents(session, current_user.id)
+    user_id = None if current_user.is_superuser else current_user.id
+    documents, next_cursor = await document_service.get_documents(
+        session, user_id, cursor=page.cursor, limit=page.limit,
+        with_content="content" in includes, with_chunks="chunks" in includes
+    )
+    set_next_page(request, response, next_cursor)
 
-    return documents
+    return [_document_view(document, includes) for document in documents]
 
-@router.delete("/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/{document_id}", status_code=status.HTTP_204_NO_CONTENT, response_model=None)
 async def delete_document(
     *,
     session: AsyncSession = Depends(get_async_session),
     document_id: int,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user),
+    document_service: DocumentService = Depends(get_document_service)
 ) -> Any:
     """Delete a document."""
-    document_service = DocumentService()
     document = await document_service.get_document(session, document_id)
 
     if not document:
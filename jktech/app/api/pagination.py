@@ -0,0 +1,52 @@
+from typing import Any, AsyncIterator, Callable, NamedTuple, Optional, Type
+
+from fastapi import Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import release_sessions
+from app.db.pagination import page_size
+
+class PageParams(NamedTuple):
+    cursor: Optional[str]
+    limit: int
+
+def get_page_params(
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    limit: Optional[int] = Query(None, ge=1, description="Page size, capped by the server")
+) -> PageParams:
+    """Get the cursor and capped page size of a list request.
+
+    Cursors are decoded by the query they page through; a malformed one is
+    answered with 400 by the ``InvalidCursorError`` handler in ``app.main``.
+    """
+    return PageParams(cursor=cursor, limit=page_size(limit))
+
+def set_next_page(request: Request, response: Response, next_cursor: Optional[str]) -> None:
+    """Point the client at the next page through the X-Next-Cursor and Link headers."""
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+
+async def ndjson_export(
+    session: AsyncSession,
+    rows: Callable[[AsyncSession], AsyncIterator[Any]],
+    schema: Type[BaseModel],
+    *request_sessions: AsyncSession
+) -> StreamingResponse:
+    """Stream rows as newline-delimited JSON, one ``schema`` object per line.
+
+    The stream outlives the request's sessions, so ``session`` and any other
+    ``request_sessions`` are released first and the rows are read through
+    a session of the stream's own on the same engine as ``session``.
+    """
+    bind = session.bind
+    await release_sessions(session, *request_sessions)
+
+    async def lines() -> AsyncIterator[str]:
+        async with AsyncSession(bind, expire_on_commit=False) as session:
+            async for row in rows(session):
+                yield schema.from_orm(row).json() + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
@@ -1,26 +1,36 @@
-from typing import Any, List, Dict
+from typing import Any, AsyncIterator, List, Dict
+import json
+import logging
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.base import get_async_session
-from app.models.user import User
+from app.services.principal_cache import Principal
 from app.schemas.qa import (
     QASessionCreate, QASessionResponse, QASessionUpdate,
     AskQuestionRequest, AskQuestionResponse
 )
 from app.services.qa_session_service import QASessionService
 from app.services.rag_service import RAGService
-from app.api.deps import get_current_user
+from app.services.generation_service import GenerationQueueFullError
+from app.api.deps import get_current_user, get_rag_service, get_read_session, release_sessions
+from app.api.pagination import PageParams, get_page_params, set_next_page
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
 @router.post("/sessions", response_model=QASessionResponse, status_code=status.HTTP_201_CREATED)
 async def create_qa_session(
     *,
     session: AsyncSession = Depends(get_async_session),
     qa_session_in: QASessionCreate,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ) -> Any:
     """Create a new QA session with selected documents."""
     qa_session_service = QASessionService()
@@ -51,12 +61,18 @@ async def create_qa_session(
 @router.get("/sessions", response_model=List[QASessionResponse])
 async def read_qa_sessions(
     *,
-    session: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(get_page_params),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: Principal = Depends(get_current_user)
 ) -> Any:
-    """Get all QA sessions for current user."""
+    """Get a page of QA sessions for current user."""
     qa_session_service = QASessionService()
-    qa_sessions = await qa_session_service.get_qa_sessions(session, current_user.id)
+    qa_sessions, next_cursor = await qa_session_service.get_qa_sessions(
+        session, current_user.id, cursor=page.cursor, limit=page.limit
+    )
+    set_next_page(request, response, next_cursor)
 
     # Prepare response with document IDs for each session
     result = []
@@ -76,13 +92,13 @@ async def read_qa_sessions(
 @router.get("/sessions/{qa_session_id}", response_model=QASessionResponse)
 async def read_qa_session(
     *,
-    session: AsyncSession = Depends(get_async_session),
+    session: AsyncSession = Depends(get_read_session),
     qa_session_id: int,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ) -> Any:
     """Get a QA session by ID."""
     qa_session_service = QASessionService()
-    qa_session = await qa_session_service.get_qa_session(session, qa_session_id)
+    qa_session = await qa_session_service.get_qa_session(session, qa_session_id, include_details=True)
 
     if not qa_session:
         raise HTTPException(
@@ -114,7 +130,7 @@ async def update_qa_session(
     session: AsyncSession = Depends(get_async_session),
     qa_session_id: int,
     qa_session_in: QASessionUpdate,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ) -> Any:
     """Update a QA session."""
     qa_session_service = QASessionService()
@@ -157,12 +173,12 @@ async def update_qa_session(
         "questions": qa_session.questions
     }
 
-@router.delete("/sessions/{qa_session_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/sessions/{qa_session_id}", status_code=status.HTTP_204_NO_CONTENT, response_model=None)
 async def delete_qa_session(
     *,
     session: AsyncSession = Depends(get_async_session),
     qa_session_id: int,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ) -> Any:
     """Delete a QA session."""
     qa_session_service = QASessionService()
@@ -188,8 +204,10 @@ async def delete_qa_session(
 async def ask_question(
     *,
     session: AsyncSession = Depends(get_async_session),
+    read_session: AsyncSession = Depends(get_read_session),
     question_in: AskQuestionRequest,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user),
+    rag_service: RAGService = Depends(get_rag_service)
 ) -> Any:
     """Ask a question and get an answer based on the documents in the QA session."""
     # Check if user has access to this QA session
@@ -209,11 +227,80 @@ async def ask_question(
         )
 
     # Use RAG service to answer the question
-    rag_service = RAGService()
-    answer = await rag_service.answer_question(
-        session=session,
-        question=question_in.question,
-        qa_session_id=question_in.qa_session_id
-    )
+    try:
+        answer = await rag_service.answer_question(
+            session=session,
+            question=question_in.question,
+            qa_session_id=question_in.qa_session_id,
+            read_session=read_session
+        )
+    except GenerationQueueFullError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many questions are being answered. Try again later."
+        )
 
     return answer
+
+@router.post("/ask/stream")
+async def ask_question_stream(
+    *,
+    session: AsyncSession = Depends(get_async_session),
+    read_session: AsyncSession = Depends(get_read_session),
+    question_in: AskQuestionRequest,
+    current_user: Principal = Depends(get_current_user),
+    rag_service: RAGService = Depends(get_rag_service)
+) -> Any:
+    """Ask a question and stream the sources and answer as Server-Sent Events."""
+    # Check if user has access to this QA session
+    qa_session_service = QASessionService()
+    qa_session = await qa_session_service.get_qa_session(session, question_in.qa_session_id)
+
+    if not qa_session:
+        raise HTTPException(
+            status_code=404,
+            detail="QA session not found"
+        )
+
+    if qa_session.user_id != current_user.id and not current_user.is_superuser:
+        raise HTTPException(
+            status_code=403,
+            detail="Not enough permissions"
+        )
+
+    # The stream outlives the request's sessions, so they are released now and
+    # the stream opens its own on the same engines while it runs
+    primary_bind = session.bind
+    replica_bind = read_session.bind if read_session is not session else None
+    await release_sessions(session, read_session)
+
+    async def events() -> AsyncIterator[str]:
+        async with AsyncSession(primary_bind, expire_on_commit=False) as stream_session:
+            stream_session.info["user_id"] = current_user.id
+            stream_read_session = None
+            if replica_bind is not None:
+                stream_read_session = AsyncSession(replica_bind, expire_on_commit=False)
+            try:
+                async for event, data in rag_service.stream_answer(
+                    session=stream_session,
+                    question=question_in.question,
+                    qa_session_id=question_in.qa_session_id,
+                    read_session=stream_read_session
+                ):
+                    yield _sse_event(event, data)
+            except GenerationQueueFullError:
+                await stream_session.rollback()
+                yield _sse_event("error", {"detail": "Too many questions are being answered. Try again later."})
+            except Exception:
+                logger.exception(f"Error streaming answer for QA session {question_in.qa_session_id}")
+                await stream_session.rollback()
+                yield _sse_event("error", {"detail": "Could not generate an answer"})
+            finally:
+                if stream_read_session is not None:
+                    await stream_read_session.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
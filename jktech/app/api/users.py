@@ -1,22 +1,34 @@
 from typing import Any, List
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.base import get_async_session
 from app.models.user import User
+from app.services.principal_cache import Principal
 from app.schemas.user import UserCreate, UserUpdate, User as UserSchema
 from app.services.user_service import UserService
-from app.api.deps import get_current_user, get_current_active_superuser
+from app.api.deps import get_current_user, get_current_active_superuser, get_read_session
+from app.api.pagination import PageParams, get_page_params, ndjson_export, set_next_page
 
 router = APIRouter()
 
+async def _get_user_record(session: AsyncSession, current_user: Principal) -> User:
+    """Load the current user's full record; the principal only carries its ID and roles."""
+    user = await UserService().get_user(session, current_user.id)
+    if not user:
+        raise HTTPException(
+            status_code=404,
+            detail="User not found"
+        )
+    return user
+
 @router.post("/", response_model=UserSchema, status_code=status.HTTP_201_CREATED)
 async def create_user(
     *,
     session: AsyncSession = Depends(get_async_session),
     user_in: UserCreate,
-    current_user: User = Depends(get_current_active_superuser)
+    current_user: Principal = Depends(get_current_active_superuser)
 ) -> Any:
     """Create new user (superuser only)."""
     user_service = UserService()
@@ -47,34 +59,36 @@ async def create_user(
 
 @router.get("/me", response_model=UserSchema)
 async def read_user_me(
-    current_user: User = Depends(get_current_user)
+    session: AsyncSession = Depends(get_read_session),
+    current_user: Principal = Depends(get_current_user)
 ) -> Any:
     """Get current user."""
-    return current_user
+    return await _get_user_record(session, current_user)
 
 @router.put("/me", response_model=UserSchema)
 async def update_user_me(
     *,
     session: AsyncSession = Depends(get_async_session),
     user_in: UserUpdate,
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ) -> Any:
     """Update current user."""
     user_service = UserService()
+    user = await _get_user_record(session, current_user)
 
     # Check if email is being changed and if it's already taken
-    if user_in.email and user_in.email != current_user.email:
-        user = await user_service.get_user_by_email(session, user_in.email)
-        if user:
+    if user_in.email and user_in.email != user.email:
+        existing = await user_service.get_user_by_email(session, user_in.email)
+        if existing:
             raise HTTPException(
                 status_code=400,
                 detail="A user with this email already exists."
             )
 
     # Check if username is being changed and if it's already taken
-    if user_in.username and user_in.username != current_user.username:
-        user = await user_service.get_user_by_username(session, user_in.username)
-        if user:
+    if user_in.username and user_in.username != user.username:
+        existing = await user_service.get_user_by_username(session, user_in.username)
+        if existing:
             raise HTTPException(
                 status_code=400,
                 detail="A user with this username already exists."
@@ -89,11 +103,20 @@ async def update_user_me(
     )
     return user
 
+@router.get("/export")
+async def export_users(
+    session: AsyncSession = Depends(get_read_session),
+    primary_session: AsyncSession = Depends(get_async_session),
+    current_user: Principal = Depends(get_current_active_superuser)
+) -> Any:
+    """Export all users as newline-delimited JSON (superuser only)."""
+    return await ndjson_export(session, UserService().stream_users, UserSchema, primary_session)
+
 @router.get("/{user_id}", response_model=UserSchema)
 async def read_user_by_id(
     user_id: int,
-    session: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_active_superuser)
+    session: AsyncSession = Depends(get_read_session),
+    current_user: Principal = Depends(get_current_active_superuser)
 ) -> Any:
     """Get a specific user by id (superuser only)."""
     user_service = UserService()
@@ -107,12 +130,14 @@ async def read_user_by_id(
 
 @router.get("/", response_model=List[UserSchema])
 async def read_users(
-    skip: int = 0,
-    limit: int = 100,
-    session: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_active_superuser)
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(get_page_params),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: Principal = Depends(get_current_active_superuser)
 ) -> Any:
-    """Retrieve users (superuser only)."""
+    """Retrieve a page of users (superuser only)."""
     user_service = UserService()
-    users = await user_service.get_users(session, skip=skip, limit=limit)
+    users, next_cursor = await user_service.get_users(session, cursor=page.cursor, limit=page.limit)
+    set_next_page(request, response, next_cursor)
     return users
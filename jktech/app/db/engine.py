@@ -0,0 +1,145 @@
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.core.config import settings
+from app.core.metrics import Histogram, metrics
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_HISTORY = 20
+SLOW_QUERY_STATEMENT_CHARS = 500
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waits for a connection.
+
+    The wait includes opening a new connection when the pool is below its
+    size, and queueing for a returned one when it is exhausted.
+    """
+
+    checkout_wait: Optional[Histogram] = None
+
+    def _do_get(self) -> Any:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self.checkout_wait is not None:
+                self.checkout_wait.observe(time.perf_counter() - start)
+
+    def recreate(self) -> "InstrumentedAsyncQueuePool":
+        pool = super().recreate()
+        pool.checkout_wait = self.checkout_wait
+        return pool
+
+class EngineInstrumentation:
+    """Pool gauges, query timing and a log of slow queries for one engine."""
+
+    def __init__(self, name: str, engine: AsyncEngine, slow_query_ms: float):
+        self.name = name
+        self.engine = engine
+        self.slow_query_seconds = slow_query_ms / 1000
+        self.slow_queries: Deque[Dict[str, Any]] = deque(maxlen=SLOW_QUERY_HISTORY)
+        self.query_seconds = metrics.histogram(
+            f"db_{name}_query_seconds", description=f"Duration of statements on the {name} database"
+        )
+        self.slow_query_counter = metrics.counter(
+            f"db_{name}_slow_queries", f"Statements on the {name} database slower than DB_SLOW_QUERY_MS"
+        )
+        # Gauges are registered once per name; the latest instrumentation of that name feeds them
+        metrics.gauge(f"db_{name}_pool_in_use", f"Connections checked out of the {name} pool").callback = (
+            lambda: self.pool_status().get("checked_out", 0)
+        )
+        metrics.gauge(f"db_{name}_pool_overflow", f"Connections open beyond the {name} pool size").callback = (
+            lambda: self.pool_status().get("overflow", 0)
+        )
+
+        pool = engine.sync_engine.pool
+        if isinstance(pool, InstrumentedAsyncQueuePool):
+            pool.checkout_wait = metrics.histogram(
+                f"db_{name}_pool_checkout_wait_seconds",
+                description=f"Time spent waiting for a connection from the {name} pool"
+            )
+
+        event.listen(engine.sync_engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine.sync_engine, "handle_error", self._handle_error)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        self.query_seconds.observe(elapsed)
+        if elapsed >= self.slow_query_seconds:
+            self.slow_query_counter.inc()
+            statement = statement[:SLOW_QUERY_STATEMENT_CHARS]
+            self.slow_queries.append({
+                "statement": statement,
+                "seconds": round(elapsed, 4),
+                "executemany": executemany,
+                "at": datetime.now(timezone.utc).isoformat(),
+            })
+            logger.warning(f"Slow query on {self.name} database ({elapsed * 1000:.0f} ms): {statement}")
+
+    def _handle_error(self, context) -> None:
+        if context.connection is not None and context.connection.info.get("query_start"):
+            context.connection.info["query_start"].pop()
+
+    def pool_status(self) -> Dict[str, Any]:
+        pool = self.engine.sync_engine.pool
+        status: Dict[str, Any] = {"class": type(pool).__name__}
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            status.update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": max(0, pool.overflow()),
+                "max_overflow": pool._max_overflow,
+                "timeout": pool.timeout(),
+                "recycle": pool._recycle,
+            })
+        return status
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.engine.url.render_as_string(hide_password=True),
+            "echo": self.engine.echo,
+            "pool": self.pool_status(),
+            "slow_query_ms": self.slow_query_seconds * 1000,
+            "slow_queries": list(self.slow_queries),
+        }
+
+_instrumented_engines: Dict[str, EngineInstrumentation] = {}
+
+def create_engine(url: str, name: str = "primary") -> AsyncEngine:
+    """Create an async engine configured and instrumented from the database settings.
+
+    Pool settings apply to server databases; SQLite keeps SQLAlchemy's default
+    pool. The asyncpg prepared-statement cache size is only passed to asyncpg.
+    """
+    url_object = make_url(url)
+    kwargs: Dict[str, Any] = {"echo": settings.DB_ECHO}
+    if url_object.get_backend_name() != "sqlite":
+        kwargs.update(
+            poolclass=InstrumentedAsyncQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+    if url_object.get_driver_name() == "asyncpg":
+        kwargs["connect_args"] = {"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+
+    engine = create_async_engine(url_object, **kwargs)
+    _instrumented_engines[name] = EngineInstrumentation(name, engine, settings.DB_SLOW_QUERY_MS)
+    return engine
+
+def engine_stats() -> Dict[str, Any]:
+    """Pool status and recent slow queries of every engine created by ``create_engine``."""
+    return {name: instrumentation.stats() for name, instrumentation in _instrumented_engines.items()}
@@ -0,0 +1,104 @@
+from datetime import datetime
+from typing import Any, AsyncIterator, List, Optional, Tuple
+from sqlalchemy import and_, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+from app.core.config import settings
+import base64
+import binascii
+import json
+
+class InvalidCursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+def encode_cursor(*key: Any) -> str:
+    """Opaque cursor pointing just after the row with the given sort key."""
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in key]
+    payload = json.dumps(values).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode("ascii")
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Sort key encoded in a cursor, with datetimes left as ISO strings."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor!r}") from e
+    if not isinstance(values, list):
+        raise InvalidCursorError(f"Invalid cursor: {cursor!r}")
+    return values
+
+def _created_at_position(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_at, row_id = decode_cursor(cursor)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (TypeError, ValueError) as e:
+        raise InvalidCursorError(f"Invalid cursor: {cursor!r}") from e
+
+def page_size(limit: Optional[int] = None) -> int:
+    """Requested page size, defaulted and capped by the server."""
+    return max(1, min(limit or settings.PAGE_SIZE_DEFAULT, settings.PAGE_SIZE_MAX))
+
+async def paginate(
+    session: AsyncSession,
+    stmt: Select,
+    model: Any,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """Fetch one page of ``model`` rows in (created_at, id) order.
+
+    Returns the rows and the cursor of the next page, or ``None`` on the last
+    page. Pages are selected by keyset rather than OFFSET, so each one costs
+    the same however deep into the listing it is.
+    """
+    size = page_size(limit)
+    if cursor is not None:
+        after_created_at, after_id = _created_at_position(cursor)
+        created_at = model.created_at
+        if session.bind.dialect.name == "sqlite":
+            # SQLite keeps server-side timestamps as text without fractional
+            # seconds, so compare them as Julian days rather than as strings
+            created_at, after_created_at = func.julianday(created_at), func.julianday(after_created_at)
+        stmt = stmt.where(or_(
+            created_at > after_created_at,
+            and_(created_at == after_created_at, model.id > after_id)
+        ))
+
+    stmt = stmt.order_by(model.created_at, model.id).limit(size + 1)
+    rows = (await session.execute(stmt)).scalars().all()
+    if len(rows) <= size:
+        return list(rows), None
+    last = rows[size - 1]
+    return list(rows[:size]), encode_cursor(last.created_at, last.id)
+
+async def paginate_by(
+    session: AsyncSession,
+    stmt: Select,
+    column: Any,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """Fetch one page of rows ordered by a column whose values are unique among them.
+
+    Like ``paginate``, but keyed on a single integer column such as a
+    chunk's position within its document.
+    """
+    size = page_size(limit)
+    if cursor is not None:
+        values = decode_cursor(cursor)
+        if len(values) != 1 or not isinstance(values[0], int) or isinstance(values[0], bool):
+            raise InvalidCursorError(f"Invalid cursor: {cursor!r}")
+        stmt = stmt.where(column > values[0])
+
+    stmt = stmt.order_by(column).limit(size + 1)
+    rows = (await session.execute(stmt)).scalars().all()
+    if len(rows) <= size:
+        return list(rows), None
+    return list(rows[:size]), encode_cursor(getattr(rows[size - 1], column.key))
+
+async def stream_rows(session: AsyncSession, stmt: Select, model: Any) -> AsyncIterator[Any]:
+    """Yield every ``model`` row of a query in (created_at, id) order from a server-side cursor."""
+    stmt = stmt.order_by(model.created_at, model.id).execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+    result = await session.stream_scalars(stmt)
+    async for row in result:
+        yield row
@@ -0,0 +1,181 @@
+from contextvars import ContextVar
+from typing import Dict, Optional
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session, sessionmaker
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.engine import create_engine
+import asyncio
+import hashlib
+import hmac
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CHECK_TIMEOUT_SECONDS = 2.0
+
+# Cookie carrying the signed time of the user's last write, so every worker can honour read-your-writes
+WRITE_COOKIE = "last_write"
+
+# Writes committed while handling the current request, by user ID, for the response to hand back
+request_writes: ContextVar[Optional[Dict[int, float]]] = ContextVar("request_writes", default=None)
+
+# Seconds the replica is behind the primary; zero once it has replayed everything it received
+REPLICATION_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+class ReplicaRouter:
+    """Decides whether a read can be served by the read replica.
+
+    Reads go to the primary when no replica is configured, for users who
+    committed a write within the last ``read_your_writes_seconds``, and while
+    the last health check found the replica unreachable or lagging by more
+    than ``max_lag_seconds``. The health check runs at most once every
+    ``health_check_seconds``; requests in between use its last result.
+
+    Writes are remembered by the worker that committed them and handed back
+    to the client as a signed ``WRITE_COOKIE``, which any worker accepts.
+    Writes committed after the response has started, such as during a
+    stream, only reach the cookie of a later response and are otherwise
+    known to their own worker alone.
+    """
+
+    def __init__(
+        self,
+        engine: Optional[AsyncEngine],
+        read_your_writes_seconds: Optional[float] = None,
+        max_lag_seconds: Optional[float] = None,
+        health_check_seconds: Optional[float] = None
+    ):
+        """Initialize the replica router."""
+        self.engine = engine
+        self.read_your_writes_seconds = (
+            read_your_writes_seconds if read_your_writes_seconds is not None else settings.DB_READ_YOUR_WRITES_SECONDS
+        )
+        self.max_lag_seconds = max_lag_seconds if max_lag_seconds is not None else settings.DB_REPLICA_MAX_LAG_SECONDS
+        self.health_check_seconds = (
+            health_check_seconds if health_check_seconds is not None else settings.DB_REPLICA_HEALTH_CHECK_SECONDS
+        )
+        self.session_maker = (
+            sessionmaker(engine, class_=AsyncSession, expire_on_commit=False) if engine is not None else None
+        )
+        self.healthy = engine is not None
+        self.lag_seconds: Optional[float] = None
+        self._checked_at: Optional[float] = None
+        self._last_writes: Dict[int, float] = {}
+        self.replica_reads = metrics.counter("db_replica_reads", "Read sessions served by the read replica")
+        self.primary_reads = metrics.counter("db_primary_reads", "Read sessions served by the primary")
+        metrics.gauge("db_replica_lag_seconds", "Replication lag at the last replica health check",
+                      lambda: self.lag_seconds or 0.0)
+
+    def record_write(self, user_id: int) -> None:
+        """Note that a user just committed a write to the primary."""
+        writes = request_writes.get()
+        if writes is not None:
+            writes[user_id] = time.time()
+        now = time.monotonic()
+        self._last_writes[user_id] = now
+        if len(self._last_writes) > 10000:
+            cutoff = now - self.read_your_writes_seconds
+            self._last_writes = {uid: at for uid, at in self._last_writes.items() if at >= cutoff}
+
+    def wrote_recently(self, user_id: Optional[int]) -> bool:
+        written_at = self._last_writes.get(user_id) if user_id is not None else None
+        return written_at is not None and time.monotonic() - written_at < self.read_your_writes_seconds
+
+    @staticmethod
+    def _sign(payload: str) -> str:
+        return hmac.new(settings.SECRET_KEY.encode(), payload.encode(), hashlib.sha256).hexdigest()
+
+    def write_token(self, user_id: int, written_at: float) -> str:
+        """Signed token recording when a user last wrote, for ``WRITE_COOKIE``."""
+        payload = f"{user_id}.{int(written_at * 1000)}"
+        return f"{payload}.{self._sign(payload)}"
+
+    def token_wrote_recently(self, token: Optional[str], user_id: Optional[int]) -> bool:
+        """Whether a write token shows the user writing within the read-your-writes window."""
+        if not token or user_id is None:
+            return False
+        payload, _, signature = token.rpartition(".")
+        token_user, _, written_ms = payload.partition(".")
+        if not hmac.compare_digest(signature.encode(), self._sign(payload).encode()) or token_user != str(user_id):
+            return False
+        try:
+            written_at = int(written_ms) / 1000
+        except ValueError:
+            return False
+        return time.time() - written_at < self.read_your_writes_seconds
+
+    async def _measure_lag(self) -> float:
+        async with self.engine.connect() as conn:
+            if self.engine.dialect.name != "postgresql":
+                await conn.execute(text("SELECT 1"))
+                return 0.0
+            return float((await conn.execute(REPLICATION_LAG_SQL)).scalar_one())
+
+    async def check_health(self) -> bool:
+        """Measure the replica's lag, marking it unhealthy if it is unreachable or too far behind."""
+        self._checked_at = time.monotonic()
+        try:
+            self.lag_seconds = await asyncio.wait_for(self._measure_lag(), timeout=HEALTH_CHECK_TIMEOUT_SECONDS)
+        except Exception as e:
+            if self.healthy:
+                logger.warning(f"Read replica unavailable, reading from the primary: {str(e)}")
+            self.healthy = False
+            self.lag_seconds = None
+            return False
+
+        healthy = self.lag_seconds <= self.max_lag_seconds
+        if healthy != self.healthy:
+            logger.warning(f"Read replica {'caught up' if healthy else 'lagging'}: {self.lag_seconds:.1f}s behind")
+        self.healthy = healthy
+        return healthy
+
+    async def use_replica(self, user_id: Optional[int], write_token: Optional[str] = None) -> bool:
+        """Whether a read for this user should go to the replica.
+
+        ``write_token`` is the request's ``WRITE_COOKIE``, if it sent one.
+        """
+        if self.engine is None or self.wrote_recently(user_id) or self.token_wrote_recently(write_token, user_id):
+            return False
+        if self._checked_at is None or time.monotonic() - self._checked_at >= self.health_check_seconds:
+            await self.check_health()
+        return self.healthy
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "configured": self.engine is not None,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag_seconds,
+            "max_lag_seconds": self.max_lag_seconds,
+            "read_your_writes_seconds": self.read_your_writes_seconds,
+            "users_in_read_your_writes_window": sum(
+                1 for user_id in list(self._last_writes) if self.wrote_recently(user_id)
+            ),
+        }
+
+read_engine = create_engine(settings.DATABASE_READ_URL, name="replica") if settings.DATABASE_READ_URL else None
+replica_router = ReplicaRouter(read_engine)
+
+@event.listens_for(Session, "after_flush")
+def _mark_flush_write(session, flush_context) -> None:
+    session.info["wrote"] = True
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_statement_write(orm_execute_state) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+@event.listens_for(Session, "after_rollback")
+def _forget_write(session) -> None:
+    session.info.pop("wrote", None)
+
+@event.listens_for(Session, "after_commit")
+def _record_user_write(session) -> None:
+    # Sessions learn their user when the request authenticates (see app.api.deps)
+    if session.info.pop("wrote", False) and session.info.get("user_id") is not None:
+        replica_router.record_write(session.info["user_id"])
@@ -0,0 +1,49 @@
+from typing import Any, Iterable, Optional
+import numpy as np
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+# Little-endian float32, independent of the host byte order
+VECTOR_DTYPE = np.dtype("<f4")
+
+class Vector(TypeDecorator):
+    """A float32 vector stored as contiguous little-endian bytes.
+
+    Values are bound from any array-like and loaded as read-only numpy
+    arrays backed by the fetched bytes, without per-element Python objects.
+    With a ``dimension``, binding or loading a vector of another length
+    raises ``ValueError`` instead of storing or returning misaligned data.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, dimension: Optional[int] = None):
+        super().__init__()
+        self.dimension = dimension
+
+    def process_bind_param(self, value: Any, dialect: Any) -> Optional[bytes]:
+        if value is None:
+            return None
+        vector = np.asarray(value, dtype=VECTOR_DTYPE)
+        if vector.ndim != 1:
+            raise ValueError(f"Expected a one-dimensional vector, got shape {vector.shape}")
+        self._check_dimension(len(vector))
+        return vector.tobytes()
+
+    def process_result_value(self, value: Optional[bytes], dialect: Any) -> Optional[np.ndarray]:
+        if value is None:
+            return None
+        if len(value) % VECTOR_DTYPE.itemsize:
+            raise ValueError(f"Stored vector of {len(value)} bytes is not a whole number of float32 values")
+        vector = np.frombuffer(value, dtype=VECTOR_DTYPE)
+        self._check_dimension(len(vector))
+        return vector
+
+    def _check_dimension(self, dimension: int) -> None:
+        if self.dimension is not None and dimension != self.dimension:
+            raise ValueError(f"Expected a vector of dimension {self.dimension}, got {dimension}")
+
+def vectors_to_matrix(blobs: Iterable[bytes], dimension: int) -> np.ndarray:
+    """Decode raw vector bytes into a single (n, dimension) float32 matrix."""
+    data = b"".join(blobs)
+    return np.frombuffer(data, dtype=VECTOR_DTYPE).reshape(-1, dimension).astype(np.float32, copy=False)
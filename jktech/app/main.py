@@ -1,9 +1,20 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 import logging
+import math
 
-from app.api import auth, users, documents, qa
+from app.api import auth, users, documents, qa, diagnostics
 from app.core.config import settings
+from app.db.base import engine
+from app.db.pagination import InvalidCursorError
+from app.db.replica import WRITE_COOKIE, replica_router, request_writes
+from app.services.model_registry import model_registry
+from app.services.ingestion_service import ingestion_pipeline
+from app.services.query_cache import query_embedding_cache
+from app.services.principal_cache import principal_cache
+from app.services.password_service import PasswordServiceBusyError, password_service
 
 # Configure logging
 logging.basicConfig(
@@ -29,11 +40,87 @@ if settings.CORS_ORIGINS:
         allow_headers=["*"],
     )
 
+@app.middleware("http")
+async def set_write_cookie(request: Request, call_next):
+    """Hand the time of the user's writes back as a signed cookie, so any worker can keep their reads on the primary."""
+    writes = {}
+    token = request_writes.set(writes)
+    try:
+        response = await call_next(request)
+    finally:
+        request_writes.reset(token)
+    if replica_router.engine is not None:
+        for user_id, written_at in writes.items():
+            response.set_cookie(
+                WRITE_COOKIE,
+                replica_router.write_token(user_id, written_at),
+                max_age=math.ceil(replica_router.read_your_writes_seconds),
+                httponly=True,
+                samesite="lax",
+            )
+    return response
+
 # Include API routers
 app.include_router(auth.router, prefix=f"{settings.API_PREFIX}/auth", tags=["auth"])
 app.include_router(users.router, prefix=f"{settings.API_PREFIX}/users", tags=["users"])
 app.include_router(documents.router, prefix=f"{settings.API_PREFIX}/documents", tags=["documents"])
 app.include_router(qa.router, prefix=f"{settings.API_PREFIX}/qa", tags=["qa"])
+app.include_router(diagnostics.router, prefix=f"{settings.API_PREFIX}/diagnostics", tags=["diagnostics"])
+
+@app.exception_handler(InvalidCursorError)
+async def invalid_cursor_handler(request: Request, exc: InvalidCursorError):
+    """Reject list requests whose cursor is malformed or belongs to another listing."""
+    return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": "Invalid cursor"})
+
+@app.exception_handler(PasswordServiceBusyError)
+async def password_service_busy_handler(request: Request, exc: PasswordServiceBusyError):
+    """Shed logins and password changes while the hashing queue is full."""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Too many password operations in progress. Try again later."},
+        headers={"Retry-After": "1"},
+    )
+
+@app.on_event("startup")
+async def warm_up_models():
+    """Load and warm up the configured embedding models before serving requests."""
+    if settings.EMBEDDING_WARMUP_ON_STARTUP:
+        await run_in_threadpool(model_registry.warm_up)
+
+@app.on_event("startup")
+async def load_query_cache():
+    """Restore persisted query embeddings."""
+    await run_in_threadpool(query_embedding_cache.load)
+
+@app.on_event("shutdown")
+async def save_query_cache():
+    """Persist query embeddings for the next start."""
+    await run_in_threadpool(query_embedding_cache.save)
+
+@app.on_event("startup")
+async def start_ingestion_pipeline():
+    """Start the background document ingestion pipeline."""
+    await ingestion_pipeline.start()
+
+@app.on_event("shutdown")
+async def stop_ingestion_pipeline():
+    """Stop the background document ingestion pipeline."""
+    await ingestion_pipeline.stop()
+
+@app.on_event("startup")
+async def start_principal_invalidation_listener():
+    """Listen for user changes made by other workers."""
+    await principal_cache.start_listener(engine)
+
+@app.on_event("shutdown")
+async def stop_principal_invalidation_listener():
+    """Stop listening for user changes made by other workers."""
+    await principal_cache.stop_listener()
+
+@app.on_event("shutdown")
+async def stop_password_service():
+    """Release the password hashing threads."""
+    password_service.shutdown()
 
 @app.get("/")
 async def root():
@@ -1,3 +1,3 @@
 from app.models.user import User
-from app.models.document import Document, DocumentChunk
+from app.models.document import Document, DocumentChunk, DocumentPart, ChunkTerm
 from app.models.qa_session import QASession, Question, qa_session_document
@@ -1,8 +1,25 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, LargeBinary, Float
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Boolean, LargeBinary, Float, Index, JSON
 from sqlalchemy.sql import func
-from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from app.db.base import Base
+from app.db.types import Vector
+from app.core.config import settings
+from collections import Counter
+import hashlib
+import re
+
+# Words, plus identifiers joined by dots or dashes such as "v1.2" or "ERR-404"
+TERM_PATTERN = re.compile(r"\w+(?:[.\-]\w+)*")
+MAX_TERM_LENGTH = 64
+
+def chunk_content_hash(content: str) -> str:
+    """SHA-256 hex digest identifying a chunk's text."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def chunk_terms(content: str) -> Counter:
+    """Lexical terms of a text with their frequencies, as stored in the inverted index."""
+    return Counter(term for term in TERM_PATTERN.findall(content.casefold()) if len(term) <= MAX_TERM_LENGTH)
 
 class Document(Base):
     id = Column(Integer, primary_key=True, index=True)
@@ -10,6 +27,11 @@ class Document(Base):
     content = Column(Text, nullable=False)
     content_type = Column(String, nullable=False)  # e.g., "text/plain", "application/pdf"
     user_id = Column(Integer, ForeignKey("user.id"))
+    status = Column(String, nullable=False, default="ready", server_default="ready")  # "processing", "ready" or "failed"
+    chunks_total = Column(Integer, nullable=False, default=0, server_default="0")
+    chunks_processed = Column(Integer, nullable=False, default=0, server_default="0")
+    embeddings_reused = Column(Integer, nullable=False, default=0, server_default="0")
+    error = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -17,14 +39,51 @@ class Document(Base):
     user = relationship("User", back_populates="documents")
     chunks = relationship("DocumentChunk", back_populates="document", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_document_user_created", "user_id", "created_at", "id"),
+        Index("ix_document_created", "created_at", "id"),
+    )
+
+class DocumentPart(Base):
+    """A block of a streamed upload, kept until the document has been ingested.
+
+    Uploads are staged block by block and ``Document.content`` is written once
+    at the end, and ingestion reads the blocks back by position, so neither
+    rewrites nor rescans the large content value.
+    """
+    document_id = Column(Integer, ForeignKey("document.id", ondelete="CASCADE"), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    content = Column(Text, nullable=False)
+
 class DocumentChunk(Base):
     id = Column(Integer, primary_key=True, index=True)
-    document_id = Column(Integer, ForeignKey("document.id"))
+    document_id = Column(Integer, ForeignKey("document.id"), index=True)
     chunk_index = Column(Integer, nullable=False)
     content = Column(Text, nullable=False)
-    embedding = Column(ARRAY(Float), nullable=True)  # Store vector embeddings
-    metadata = Column(JSONB, nullable=True)  # Store additional metadata
+    content_hash = Column(String(64), nullable=True)  # SHA-256 of content, used to reuse embeddings
+    embedding_model = Column(String, nullable=True)  # Model that produced the embedding
+    embedding = Column(Vector(settings.EMBEDDING_DIMENSION), nullable=True)  # float32 vector as little-endian bytes
+    # "metadata" is reserved by the declarative API, so map the column under another attribute name
+    chunk_metadata = Column("metadata", JSON().with_variant(JSONB, "postgresql"), nullable=True)  # Store additional metadata
+    term_count = Column(Integer, nullable=True)  # Number of lexical terms, the BM25 document length
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relationship
     document = relationship("Document", back_populates="chunks")
+    terms = relationship("ChunkTerm", cascade="all, delete-orphan", passive_deletes=True)
+
+    __table_args__ = (
+        Index("ix_documentchunk_content_hash_model", "content_hash", "embedding_model"),
+        Index("ix_documentchunk_document_index", "document_id", "chunk_index"),
+    )
+
+class ChunkTerm(Base):
+    """Posting of the lexical inverted index: a term occurring in a chunk."""
+    term = Column(String(MAX_TERM_LENGTH), primary_key=True)
+    chunk_id = Column(Integer, ForeignKey("documentchunk.id", ondelete="CASCADE"), primary_key=True)
+    document_id = Column(Integer, ForeignKey("document.id", ondelete="CASCADE"), nullable=False, index=True)
+    term_frequency = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_chunkterm_term_document", "term", "document_id"),
+    )
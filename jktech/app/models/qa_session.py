@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, Table, JSON
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.orm import relationship
@@ -24,6 +24,10 @@ class QASession(Base):
     documents = relationship("Document", secondary=qa_session_document)
     questions = relationship("Question", back_populates="qa_session", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_qasession_user_created", "user_id", "created_at", "id"),
+    )
+
 class Question(Base):
     id = Column(Integer, primary_key=True, index=True)
     qa_session_id = Column(Integer, ForeignKey("qasession.id"))
@@ -32,7 +36,7 @@ class Question(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Metadata about the retrieval process
-    retrieval_metadata = Column(JSONB, nullable=True)
+    retrieval_metadata = Column(JSON().with_variant(JSONB, "postgresql"), nullable=True)
 
     # Relationship
     qa_session = relationship("QASession", back_populates="questions")
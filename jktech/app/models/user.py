@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.db.base import Base
@@ -16,3 +16,7 @@ class User(Base):
 
     # Relationship
     documents = relationship("Document", back_populates="user")
+
+    __table_args__ = (
+        Index("ix_user_created", "created_at", "id"),
+    )
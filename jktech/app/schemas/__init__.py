@@ -1,4 +1,4 @@
 # Import schemas here for easier imports elsewhere
 from app.schemas.user import UserCreate, UserUpdate, UserInDB, User
-from app.schemas.document import DocumentCreate, DocumentUpdate, DocumentInDB, Document
+from app.schemas.document import DocumentCreate, DocumentUpdate, DocumentInDB, Document, DocumentSummary, DocumentRead
 from app.schemas.qa import QuestionCreate, QuestionResponse, QASessionCreate, QASessionResponse
@@ -1,4 +1,5 @@
 from pydantic import BaseModel, Field
+from pydantic.utils import GetterDict
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
@@ -22,6 +23,14 @@ class DocumentChunkBase(BaseModel):
 class DocumentChunkCreate(DocumentChunkBase):
     document_id: int
 
+class DocumentChunkGetterDict(GetterDict):
+    """Read ``metadata`` from the ORM attribute the column is mapped to."""
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        if key == "metadata":
+            key = "chunk_metadata"
+        return super().get(key, default)
+
 class DocumentChunkInDB(DocumentChunkBase):
     id: int
     document_id: int
@@ -29,19 +38,70 @@ class DocumentChunkInDB(DocumentChunkBase):
 
     class Config:
         orm_mode = True
+        getter_dict = DocumentChunkGetterDict
 
 class DocumentInDBBase(DocumentBase):
     id: int
     user_id: int
+    status: str = "ready"
+    chunks_total: int = 0
+    chunks_processed: int = 0
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
+class DocumentSummaryGetterDict(GetterDict):
+    """Read ``chunk_count`` from the chunk total kept on the document row."""
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        if key == "chunk_count":
+            key = "chunks_total"
+        return super().get(key, default)
+
+class DocumentSummary(DocumentBase):
+    """Document without its content or chunks, the default representation in responses."""
+    id: int
+    user_id: int
+    status: str = "ready"
+    chunk_count: int = 0
     created_at: datetime
     updated_at: Optional[datetime] = None
 
     class Config:
         orm_mode = True
+        getter_dict = DocumentSummaryGetterDict
+
+class DocumentRead(DocumentSummary):
+    """Document summary plus the content and chunks a request opted into with ``include``."""
+    content: Optional[str] = None
+    chunks: Optional[List[DocumentChunkInDB]] = None
 
 class Document(DocumentInDBBase):
     chunks: List[DocumentChunkInDB] = []
 
+class DocumentExport(DocumentInDBBase):
+    content: str
+
 class DocumentInDB(DocumentInDBBase):
     content: str
     chunks: List[DocumentChunkInDB] = []
+
+class DocumentStatus(BaseModel):
+    id: int
+    status: str
+    chunks_total: int
+    chunks_processed: int
+    embeddings_reused: int = 0
+    error: Optional[str] = None
+
+    class Config:
+        orm_mode = True
+
+class BulkDocumentResult(BaseModel):
+    documents: int
+    chunks: int
+    embeddings_reused: int
+    document_ids: List[int]
+    elapsed_seconds: float
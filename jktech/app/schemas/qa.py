@@ -47,3 +47,4 @@ class AskQuestionResponse(BaseModel):
     question: str
     answer: str
     sources: List[Dict[str, Any]]
+    metadata: Dict[str, Any] = {}
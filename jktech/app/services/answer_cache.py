@@ -0,0 +1,111 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+from app.core.metrics import metrics
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+def document_set_version(versions: Dict[int, Any]) -> str:
+    """Fingerprint of a QA session's documents and their last update times."""
+    digest = hashlib.sha256()
+    for document_id, updated_at in sorted(versions.items()):
+        digest.update(f"{document_id}:{updated_at}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+class _SessionAnswers:
+    """Cached answers of one QA session at one document-set version."""
+
+    def __init__(self, version: str, document_ids: List[int], dimension: int):
+        self.version = version
+        self.document_ids = set(document_ids)
+        self.embeddings = np.empty((0, dimension), dtype=np.float32)
+        self.answers: List[Dict[str, Any]] = []
+
+class AnswerCache:
+    """Semantic cache of generated answers per QA session.
+
+    An answer is reused for a question whose normalized embedding has a
+    cosine similarity of at least ``similarity_threshold`` with a cached
+    question, as long as the session's document set is at the same version.
+    Entries are dropped when a session or one of its documents changes.
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: Optional[float] = None,
+        max_entries_per_session: Optional[int] = None,
+        max_sessions: Optional[int] = None
+    ):
+        self.similarity_threshold = (
+            similarity_threshold if similarity_threshold is not None else settings.ANSWER_CACHE_SIMILARITY_THRESHOLD
+        )
+        self.max_entries_per_session = max_entries_per_session or settings.ANSWER_CACHE_MAX_ENTRIES_PER_SESSION
+        self.max_sessions = max_sessions or settings.ANSWER_CACHE_MAX_SESSIONS
+        self._sessions: "OrderedDict[int, _SessionAnswers]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = metrics.counter("answer_cache_hits", "Answers served from the semantic answer cache")
+        self.misses = metrics.counter("answer_cache_misses", "Questions not found in the semantic answer cache")
+
+    def get(self, qa_session_id: int, version: str, embedding: Any) -> Optional[Tuple[Dict[str, Any], float]]:
+        """Return a cached answer and its similarity to the question, if one is close enough."""
+        query = np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            answers = self._sessions.get(qa_session_id)
+            if answers is None or answers.version != version or not answers.answers:
+                self.misses.inc()
+                return None
+            self._sessions.move_to_end(qa_session_id)
+            similarities = answers.embeddings @ query
+            best = int(np.argmax(similarities))
+            similarity = float(similarities[best])
+            if similarity < self.similarity_threshold:
+                self.misses.inc()
+                return None
+            answer = answers.answers[best]
+        self.hits.inc()
+        return answer, similarity
+
+    def put(
+        self,
+        qa_session_id: int,
+        version: str,
+        document_ids: List[int],
+        embedding: Any,
+        answer: Dict[str, Any]
+    ) -> None:
+        """Cache the answer to a question for a session at a document-set version."""
+        vector = np.asarray(embedding, dtype=np.float32)[np.newaxis, :]
+        with self._lock:
+            answers = self._sessions.get(qa_session_id)
+            if answers is None or answers.version != version:
+                answers = _SessionAnswers(version, document_ids, vector.shape[1])
+                self._sessions[qa_session_id] = answers
+            self._sessions.move_to_end(qa_session_id)
+
+            answers.embeddings = np.vstack([answers.embeddings, vector])[-self.max_entries_per_session:]
+            answers.answers = (answers.answers + [answer])[-self.max_entries_per_session:]
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def invalidate_session(self, qa_session_id: int) -> None:
+        with self._lock:
+            self._sessions.pop(qa_session_id, None)
+
+    def invalidate_document(self, document_id: int) -> None:
+        """Drop the cached answers of every session containing a document."""
+        with self._lock:
+            for qa_session_id in [
+                qa_session_id for qa_session_id, answers in self._sessions.items()
+                if document_id in answers.document_ids
+            ]:
+                del self._sessions[qa_session_id]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+
+answer_cache = AnswerCache()
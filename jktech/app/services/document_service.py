@@ -1,16 +1,43 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterable, AsyncIterator, Awaitable, Callable, Iterable, Tuple, Union
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.models.document import Document, DocumentChunk
+from sqlalchemy import delete, insert, select, update, func
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import defer, selectinload
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db.pagination import paginate, paginate_by, stream_rows
+from app.models.document import (
+    ChunkTerm, Document, DocumentChunk, DocumentPart, chunk_content_hash, chunk_terms
+)
 from app.services.embedding_service import EmbeddingService
+from app.services.lexical_index import LexicalIndex
+from app.services.vector_index import vector_index_registry
+from app.services.answer_cache import answer_cache
+import asyncio
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+embeddings_reused_counter = metrics.counter("embeddings_reused", "Chunk embeddings reused by content hash")
+embeddings_computed_counter = metrics.counter("embeddings_computed", "Chunk embeddings computed by the model")
+
+# Chunks returned by the API never include their embedding vectors
+CHUNK_LOAD_OPTIONS = (defer(DocumentChunk.embedding),)
+
+async def _as_async_iterator(items: Union[Iterable[Any], AsyncIterable[Any]]) -> AsyncIterator[Any]:
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
 class DocumentService:
-    def __init__(self):
+    def __init__(self, embedding_service: Optional[EmbeddingService] = None):
         """Initialize the document service."""
-        self.embedding_service = EmbeddingService()
+        self.embedding_service = embedding_service or EmbeddingService()
         logger.info("Document service initialized")
 
     async def create_document(
@@ -19,49 +46,400 @@ class DocumentService:
         user_id: int,
         title: str,
         content: str,
-        content_type: str
+        content_type: str,
+        defer_processing: bool = False
     ) -> Document:
-        """Create a new document and process it for embeddings."""
+        """Create a new document and process it for embeddings.
+
+        With ``defer_processing`` the document is stored in the ``processing``
+        state and chunking/embedding is left to the ingestion pipeline.
+        """
         # Create the document
         document = Document(
             user_id=user_id,
             title=title,
             content=content,
-            content_type=content_type
+            content_type=content_type,
+            status="processing" if defer_processing else "ready"
         )
         session.add(document)
         await session.flush()  # Flush to get the document ID
 
-        # Process the document to create chunks and embeddings
-        processed_chunks = self.embedding_service.process_document(content)
+        if not defer_processing:
+            # Process the document to create chunks and embeddings
+            # Tokenizing is CPU-bound, keep it off the event loop
+            loop = asyncio.get_running_loop()
+            processed_chunks = await loop.run_in_executor(None, self.embedding_service.chunk_text, content)
+            document.embeddings_reused = await self.embed_chunks(session, processed_chunks)
+            self.add_chunks(session, document.id, processed_chunks)
+            document.chunks_total = document.chunks_processed = len(processed_chunks)
 
-        # Create document chunks with embeddings
-        for chunk_data in processed_chunks:
-            chunk = DocumentChunk(
-                document_id=document.id,
-                chunk_index=chunk_data["chunk_index"],
-                content=chunk_data["content"],
-                embedding=chunk_data["embedding"],
-                metadata=chunk_data["metadata"]
-            )
-            session.add(chunk)
+        await session.commit()
+        return document
+
+    async def create_document_from_stream(
+        self,
+        session: AsyncSession,
+        user_id: int,
+        title: str,
+        text_stream: AsyncIterator[str],
+        content_type: str
+    ) -> Document:
+        """Create a document from streamed text, leaving processing to the ingestion pipeline.
+
+        The text is staged in ``DocumentPart`` rows of about
+        ``UPLOAD_APPEND_BLOCK_CHARS`` characters and concatenated into the
+        content by the database in a single write, so memory use is bounded by
+        the block size and the content value is written once, not once per block.
+        """
+        document = Document(
+            user_id=user_id,
+            title=title,
+            content="",
+            content_type=content_type,
+            status="processing"
+        )
+        session.add(document)
+        await session.flush()  # Flush to get the document ID
 
+        buffer: List[str] = []
+        buffered = 0
+        position = 0
+        async for text in text_stream:
+            buffer.append(text)
+            buffered += len(text)
+            if buffered >= settings.UPLOAD_APPEND_BLOCK_CHARS:
+                await self._add_part(session, document.id, position, "".join(buffer))
+                buffer, buffered, position = [], 0, position + 1
+        if buffer:
+            await self._add_part(session, document.id, position, "".join(buffer))
+            position += 1
+
+        if position:
+            await session.execute(
+                update(Document)
+                .where(Document.id == document.id)
+                .values(content=self._joined_parts(session, document.id))
+                .execution_options(synchronize_session=False)
+            )
         await session.commit()
         return document
 
-    async def get_document(self, session: AsyncSession, document_id: int) -> Optional[Document]:
+    async def _add_part(self, session: AsyncSession, document_id: int, position: int, text: str) -> None:
+        await session.execute(insert(DocumentPart).values(document_id=document_id, position=position, content=text))
+
+    @staticmethod
+    def _joined_parts(session: AsyncSession, document_id: int) -> Any:
+        """Scalar subquery concatenating a document's staged parts in order."""
+        if session.bind.dialect.name == "postgresql":
+            return (
+                select(func.string_agg(DocumentPart.content, aggregate_order_by("", DocumentPart.position)))
+                .where(DocumentPart.document_id == document_id)
+                .scalar_subquery()
+            )
+        # SQLite concatenates in the order rows come out of the ordered subquery
+        parts = (
+            select(DocumentPart.content)
+            .where(DocumentPart.document_id == document_id)
+            .order_by(DocumentPart.position)
+            .subquery()
+        )
+        return select(func.group_concat(parts.c.content, "")).scalar_subquery()
+
+    async def _encode(self, texts: List[str]) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.embedding_service.get_embeddings, texts)
+
+    async def find_embeddings(self, session: AsyncSession, content_hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Find stored embeddings of the current model for the given chunk content hashes."""
+        if not content_hashes:
+            return {}
+
+        # One representative chunk per hash
+        representatives = (
+            select(func.min(DocumentChunk.id))
+            .where(DocumentChunk.content_hash.in_(content_hashes))
+            .where(DocumentChunk.embedding_model == self.embedding_service.model_name)
+            .where(DocumentChunk.embedding.isnot(None))
+            .group_by(DocumentChunk.content_hash)
+        )
+        stmt = select(DocumentChunk.content_hash, DocumentChunk.embedding).where(DocumentChunk.id.in_(representatives))
+        result = await session.execute(stmt)
+        return {content_hash: embedding for content_hash, embedding in result.all()}
+
+    async def embed_chunks(
+        self,
+        session: AsyncSession,
+        chunks: List[Dict[str, Any]],
+        encode: Optional[Callable[[List[str]], Awaitable[np.ndarray]]] = None
+    ) -> int:
+        """Set the content hash and embedding of each chunk, reusing stored embeddings.
+
+        Only texts whose content hash has no embedding for the current model,
+        in the database or earlier in the batch, are encoded. Returns the
+        number of embeddings reused.
+        """
+        for chunk_data in chunks:
+            chunk_data["content_hash"] = chunk_content_hash(chunk_data["content"])
+
+        embeddings = await self.find_embeddings(session, list({chunk["content_hash"] for chunk in chunks}))
+
+        missing: Dict[str, str] = {}
+        for chunk_data in chunks:
+            if chunk_data["content_hash"] not in embeddings:
+                missing.setdefault(chunk_data["content_hash"], chunk_data["content"])
+        if missing:
+            encoded = await (encode or self._encode)(list(missing.values()))
+            embeddings.update(zip(missing.keys(), encoded))
+
+        for chunk_data in chunks:
+            chunk_data["embedding"] = embeddings[chunk_data["content_hash"]]
+
+        reused = len(chunks) - len(missing)
+        embeddings_reused_counter.inc(reused)
+        embeddings_computed_counter.inc(len(missing))
+        return reused
+
+    @staticmethod
+    def _terms(chunk_data: Dict[str, Any]) -> Dict[str, int]:
+        if "terms" not in chunk_data:
+            chunk_data["terms"] = chunk_terms(chunk_data["content"])
+        return chunk_data["terms"]
+
+    def _chunk_row(self, document_id: int, chunk_data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "document_id": document_id,
+            "chunk_index": chunk_data["chunk_index"],
+            "content": chunk_data["content"],
+            "content_hash": chunk_data.get("content_hash") or chunk_content_hash(chunk_data["content"]),
+            "embedding": chunk_data["embedding"],
+            "embedding_model": self.embedding_service.model_name,
+            "chunk_metadata": chunk_data["metadata"],
+            "term_count": sum(self._terms(chunk_data).values())
+        }
+
+    def add_chunks(self, session: AsyncSession, document_id: int, processed_chunks: List[Dict[str, Any]]) -> None:
+        """Add processed chunks with their embeddings and lexical index postings to a document."""
+        for chunk_data in processed_chunks:
+            terms = [
+                ChunkTerm(term=term, document_id=document_id, term_frequency=frequency)
+                for term, frequency in self._terms(chunk_data).items()
+            ]
+            session.add(DocumentChunk(**self._chunk_row(document_id, chunk_data), terms=terms))
+
+    async def bulk_create_documents(
+        self,
+        session: AsyncSession,
+        user_id: int,
+        documents: Union[Iterable[Dict[str, str]], AsyncIterable[Dict[str, str]]],
+        batch_chunks: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Create many documents, embedding chunks from all of them together.
+
+        Documents are chunked as they arrive and buffered until about
+        ``batch_chunks`` chunks are pending. Each batch is then embedded with
+        one encode call and written with multi-row INSERTs in its own
+        transaction, so a failure only rolls back the current batch.
+        """
+        batch_chunks = batch_chunks or settings.BULK_INGEST_BATCH_CHUNKS
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        summary = {"documents": 0, "chunks": 0, "embeddings_reused": 0, "document_ids": []}
+
+        pending: List[Tuple[Dict[str, str], List[Dict[str, Any]]]] = []
+        pending_chunks = 0
+        async for document in _as_async_iterator(documents):
+            chunks = await loop.run_in_executor(None, self.embedding_service.chunk_text, document["content"])
+            pending.append((document, chunks))
+            pending_chunks += len(chunks)
+            if pending_chunks >= batch_chunks:
+                await self._store_bulk_batch(session, user_id, pending, summary)
+                pending, pending_chunks = [], 0
+        if pending:
+            await self._store_bulk_batch(session, user_id, pending, summary)
+
+        summary["elapsed_seconds"] = time.perf_counter() - started
+        logger.info(
+            f"Bulk ingested {summary['documents']} documents ({summary['chunks']} chunks, "
+            f"{summary['embeddings_reused']} embeddings reused) in {summary['elapsed_seconds']:.2f}s"
+        )
+        return summary
+
+    async def _store_bulk_batch(
+        self,
+        session: AsyncSession,
+        user_id: int,
+        batch: List[Tuple[Dict[str, str], List[Dict[str, Any]]]],
+        summary: Dict[str, Any]
+    ) -> None:
+        document_rows = [
+            {
+                "user_id": user_id,
+                "title": document["title"],
+                "content": document["content"],
+                "content_type": document["content_type"],
+                "status": "ready",
+                "chunks_total": len(chunks),
+                "chunks_processed": len(chunks)
+            }
+            for document, chunks in batch
+        ]
+        stmt = insert(Document).returning(Document.id, sort_by_parameter_order=True)
+        document_ids = (await session.execute(stmt, document_rows)).scalars().all()
+
+        chunks_with_ids = [
+            (document_id, chunk_data)
+            for document_id, (_, chunks) in zip(document_ids, batch)
+            for chunk_data in chunks
+        ]
+        reused = await self.embed_chunks(session, [chunk_data for _, chunk_data in chunks_with_ids])
+        if chunks_with_ids:
+            stmt = insert(DocumentChunk).returning(DocumentChunk.id, sort_by_parameter_order=True)
+            chunk_ids = (await session.execute(
+                stmt,
+                [self._chunk_row(document_id, chunk_data) for document_id, chunk_data in chunks_with_ids]
+            )).scalars().all()
+            postings = [
+                posting
+                for chunk_id, (document_id, chunk_data) in zip(chunk_ids, chunks_with_ids)
+                for posting in LexicalIndex.postings(document_id, chunk_id, self._terms(chunk_data))
+            ]
+            if postings:
+                await session.execute(insert(ChunkTerm), postings)
+        await session.commit()
+
+        summary["documents"] += len(document_ids)
+        summary["chunks"] += len(chunks_with_ids)
+        summary["embeddings_reused"] += reused
+        summary["document_ids"].extend(document_ids)
+
+    async def sync_chunks(
+        self,
+        session: AsyncSession,
+        document_id: int,
+        processed_chunks: List[Dict[str, Any]]
+    ) -> Tuple[int, int]:
+        """Replace a document's chunks with a new chunking, keeping unchanged ones.
+
+        Stored chunks are matched to the new chunks by content hash. Matched
+        rows keep their embedding and only get their position updated, new
+        chunks are embedded and inserted, and the remaining rows are removed
+        with a single bulk delete. Returns the number of chunks kept and the
+        number of new chunks whose embedding was reused from other documents.
+        """
+        stmt = (
+            select(
+                DocumentChunk.id,
+                DocumentChunk.content_hash,
+                DocumentChunk.chunk_index,
+                DocumentChunk.embedding_model,
+                DocumentChunk.embedding.isnot(None)
+            )
+            .where(DocumentChunk.document_id == document_id)
+        )
+        stored: Dict[str, List[Tuple[int, int]]] = {}
+        stale_ids: List[int] = []
+        rows = (await session.execute(stmt)).all()
+        for chunk_id, content_hash, chunk_index, embedding_model, has_embedding in rows:
+            if has_embedding and content_hash and embedding_model == self.embedding_service.model_name:
+                stored.setdefault(content_hash, []).append((chunk_id, chunk_index))
+            else:
+                stale_ids.append(chunk_id)
+
+        moved: List[Dict[str, Any]] = []
+        new_chunks: List[Dict[str, Any]] = []
+        kept = 0
+        for chunk_data in processed_chunks:
+            chunk_data["content_hash"] = chunk_content_hash(chunk_data["content"])
+            matches = stored.get(chunk_data["content_hash"])
+            if not matches:
+                new_chunks.append(chunk_data)
+                continue
+            chunk_id, chunk_index = matches.pop()
+            kept += 1
+            if chunk_index != chunk_data["chunk_index"]:
+                moved.append({
+                    "id": chunk_id,
+                    "chunk_index": chunk_data["chunk_index"],
+                    "chunk_metadata": chunk_data["metadata"]
+                })
+
+        stale_ids.extend(chunk_id for matches in stored.values() for chunk_id, _ in matches)
+        if stale_ids:
+            await session.execute(delete(ChunkTerm).where(ChunkTerm.chunk_id.in_(stale_ids)))
+            await session.execute(
+                delete(DocumentChunk)
+                .where(DocumentChunk.id.in_(stale_ids))
+                .execution_options(synchronize_session=False)
+            )
+        if moved:
+            await session.execute(update(DocumentChunk), moved)
+
+        reused = await self.embed_chunks(session, new_chunks)
+        self.add_chunks(session, document_id, new_chunks)
+        logger.info(
+            f"Updated document {document_id}: {kept} chunks kept, {len(new_chunks)} new, "
+            f"{len(stale_ids)} removed"
+        )
+        return kept, reused
+
+    @staticmethod
+    def _load_options(with_content: bool, with_chunks: bool) -> List[Any]:
+        """Loader options that leave out a document's content and chunks unless asked for."""
+        options: List[Any] = []
+        if not with_content:
+            options.append(defer(Document.content))
+        if with_chunks:
+            options.append(selectinload(Document.chunks).options(*CHUNK_LOAD_OPTIONS))
+        return options
+
+    async def get_document(
+        self,
+        session: AsyncSession,
+        document_id: int,
+        with_content: bool = True,
+        with_chunks: bool = False
+    ) -> Optional[Document]:
         """Get a document by ID."""
-        return await session.get(Document, document_id)
+        return await session.get(Document, document_id, options=self._load_options(with_content, with_chunks))
+
+    async def get_documents(
+        self,
+        session: AsyncSession,
+        user_id: Optional[int] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+        with_content: bool = False,
+        with_chunks: bool = False
+    ) -> Tuple[List[Document], Optional[str]]:
+        """Get a page of documents, optionally filtered by user ID, and the next page's cursor.
 
-    async def get_documents(self, session: AsyncSession, user_id: Optional[int] = None) -> List[Document]:
-        """Get all documents, optionally filtered by user ID."""
+        Content and chunks are only loaded when asked for; a summary listing
+        reads nothing but the document rows.
+        """
+        stmt = select(Document).options(*self._load_options(with_content, with_chunks))
         if user_id:
-            stmt = select(Document).where(Document.user_id == user_id)
-        else:
-            stmt = select(Document)
+            stmt = stmt.where(Document.user_id == user_id)
 
-        result = await session.execute(stmt)
-        return result.scalars().all()
+        return await paginate(session, stmt, Document, cursor, limit)
+
+    async def get_chunks(
+        self,
+        session: AsyncSession,
+        document_id: int,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Tuple[List[DocumentChunk], Optional[str]]:
+        """Get a page of a document's chunks in order, and the next page's cursor."""
+        stmt = select(DocumentChunk).options(*CHUNK_LOAD_OPTIONS).where(DocumentChunk.document_id == document_id)
+        return await paginate_by(session, stmt, DocumentChunk.chunk_index, cursor, limit)
+
+    def stream_documents(self, session: AsyncSession, user_id: Optional[int] = None) -> AsyncIterator[Document]:
+        """Stream all documents, optionally filtered by user ID, without loading them at once."""
+        stmt = select(Document)
+        if user_id:
+            stmt = stmt.where(Document.user_id == user_id)
+        return stream_rows(session, stmt, Document)
 
     async def delete_document(self, session: AsyncSession, document_id: int) -> bool:
         """Delete a document and its chunks."""
@@ -69,8 +447,12 @@ class DocumentService:
         if not document:
             return False
 
+        await session.execute(delete(ChunkTerm).where(ChunkTerm.document_id == document_id))
+        await session.execute(delete(DocumentPart).where(DocumentPart.document_id == document_id))
         await session.delete(document)  # This will cascade delete chunks
         await session.commit()
+        vector_index_registry.invalidate_document(document_id)
+        answer_cache.invalidate_document(document_id)
         return True
 
     async def update_document(
@@ -95,27 +477,18 @@ class DocumentService:
         # If content changes, reprocess the document
         if content is not None and content != document.content:
             document.content = content
+            # Staged upload parts no longer match the content
+            await session.execute(delete(DocumentPart).where(DocumentPart.document_id == document_id))
 
-            # Delete existing chunks
-            stmt = select(DocumentChunk).where(DocumentChunk.document_id == document_id)
-            result = await session.execute(stmt)
-            chunks = result.scalars().all()
-            for chunk in chunks:
-                await session.delete(chunk)
-
-            # Process the new content
-            processed_chunks = self.embedding_service.process_document(content)
-
-            # Create new document chunks with embeddings
-            for chunk_data in processed_chunks:
-                chunk = DocumentChunk(
-                    document_id=document.id,
-                    chunk_index=chunk_data["chunk_index"],
-                    content=chunk_data["content"],
-                    embedding=chunk_data["embedding"],
-                    metadata=chunk_data["metadata"]
-                )
-                session.add(chunk)
+            # Re-embed only the windows whose text changed; tokenizing is kept off the event loop
+            loop = asyncio.get_running_loop()
+            processed_chunks = await loop.run_in_executor(None, self.embedding_service.chunk_text, content)
+            kept, reused = await self.sync_chunks(session, document.id, processed_chunks)
+            document.embeddings_reused = kept + reused
+            document.chunks_total = document.chunks_processed = len(processed_chunks)
 
         await session.commit()
+        if content is not None:
+            vector_index_registry.invalidate_document(document_id)
+            answer_cache.invalidate_document(document_id)
         return document
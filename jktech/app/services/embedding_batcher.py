@@ -0,0 +1,105 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+import numpy as np
+from app.core.config import settings
+from app.core.metrics import metrics
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+batch_size_histogram = metrics.histogram(
+    "embedding_batch_size", BATCH_SIZE_BUCKETS, "Number of queries encoded per batched encode call"
+)
+queue_wait_histogram = metrics.histogram(
+    "embedding_queue_wait_seconds", description="Time a query waited before its batch started encoding"
+)
+encode_seconds_histogram = metrics.histogram(
+    "embedding_batch_encode_seconds", description="Duration of batched encode calls"
+)
+
+class EmbeddingBatcher:
+    """Collects concurrent query-encode requests into batched ``encode`` calls.
+
+    Requests are buffered until ``max_batch_size`` texts are pending or the
+    oldest one has waited ``max_wait_ms``. Batches are encoded one at a time on
+    a dedicated thread. A batch flushed while another is encoding queues on
+    that thread as it is; requests are not merged across flushed batches.
+    """
+
+    def __init__(self, model: Any, max_batch_size: Optional[int] = None, max_wait_ms: Optional[float] = None):
+        self.model = model
+        self.max_batch_size = max_batch_size or settings.EMBEDDING_BATCH_MAX_SIZE
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else settings.EMBEDDING_BATCH_MAX_WAIT_MS) / 1000
+        self._pending: List[Tuple[str, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Running batches, referenced until done so they are not garbage-collected
+        self._tasks: Set[asyncio.Task] = set()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding-batcher")
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Embed a single text as part of the next batch."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._batch_done)
+
+    def _batch_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Embedding batch failed: {str(task.exception())}")
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        start = time.perf_counter()
+        vectors = np.asarray(self.model.encode(texts, normalize_embeddings=True), dtype=np.float32)
+        encode_seconds_histogram.observe(time.perf_counter() - start)
+        return vectors
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future, float]]) -> None:
+        now = time.perf_counter()
+        for _, _, enqueued_at in batch:
+            queue_wait_histogram.observe(now - enqueued_at)
+        batch_size_histogram.observe(len(batch))
+
+        loop = asyncio.get_running_loop()
+        try:
+            vectors = await loop.run_in_executor(self._executor, self._encode, [text for text, _, _ in batch])
+        except Exception as e:
+            logger.error(f"Error generating batched embeddings: {str(e)}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+_batchers: Dict[str, EmbeddingBatcher] = {}
+
+def get_batcher(model_name: str, model: Any) -> EmbeddingBatcher:
+    """Get the process-wide batcher for a model."""
+    batcher = _batchers.get(model_name)
+    if batcher is None:
+        batcher = EmbeddingBatcher(model)
+        _batchers[model_name] = batcher
+    return batcher
@@ -1,60 +1,339 @@
-from sentence_transformers import SentenceTransformer
 import numpy as np
 from typing import List, Dict, Any, Optional
 from app.core.config import settings
+from app.services.model_registry import model_registry
+from app.services.embedding_batcher import get_batcher
+from app.services.query_cache import query_embedding_cache
 import logging
+import zlib
 
 logger = logging.getLogger(__name__)
 
+# Longest run of text without whitespace a chunker holds back waiting for the end of the word
+MAX_PENDING_CHARS = 64 * 1024
+
+class WordWindowChunker:
+    """Incremental chunker producing overlapping windows of whitespace-separated words.
+
+    Text is pushed piece by piece and each window is emitted as soon as all of
+    its words have been seen, so only the words of the current window are
+    held in memory.
+
+    Window starts are content-defined: each window starts at the first anchor
+    word (chosen by a stable hash of the word) between ``min_step`` and
+    ``chunk_size - overlap`` words after the previous start. An edit therefore
+    only changes the windows around it; windows further away start on the same
+    anchors as before and keep their exact text.
+    """
+
+    def __init__(self, chunk_size: int = 1000, overlap: int = 200, min_words: int = 10):
+        self.chunk_size = chunk_size
+        self.max_step = max(1, chunk_size - overlap)
+        self.min_step = max(1, self.max_step * 3 // 4)
+        self.anchor_modulus = max(1, (self.max_step - self.min_step) // 4)
+        self.min_words = min_words  # Skip very small chunks
+        self._words: List[str] = []
+        self._offset = 0  # Word position of self._words[0] in the document
+        self._next_start = 0
+        self._partial = ""  # Trailing word that may continue in the next piece
+        self._chunk_index = 0
+
+    def push(self, text: str) -> List[Dict[str, Any]]:
+        """Add a piece of text and return the windows it completes."""
+        if not text:
+            return []
+        text = self._partial + text
+        words = text.split()
+        self._partial = words.pop() if words and not text[-1].isspace() else ""
+        self._words.extend(words)
+        if len(self._partial) > MAX_PENDING_CHARS:
+            # Text without whitespace: cut the word rather than buffer it indefinitely
+            self._words.append(self._partial)
+            self._partial = ""
+        return self._emit(final=False)
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """Return the remaining windows at the end of the text."""
+        if self._partial:
+            self._words.append(self._partial)
+            self._partial = ""
+        return self._emit(final=True)
+
+    def _is_anchor(self, word: str) -> bool:
+        return zlib.crc32(word.encode("utf-8")) % self.anchor_modulus == 0
+
+    def _step_from(self, start: int, total: int) -> int:
+        """Start of the window following the one at ``start``."""
+        for position in range(start + self.min_step, min(start + self.max_step, total)):
+            if self._is_anchor(self._words[position - self._offset]):
+                return position
+        return start + self.max_step
+
+    def _emit(self, final: bool) -> List[Dict[str, Any]]:
+        chunks = []
+        total = self._offset + len(self._words)
+        while self._next_start < total:
+            start = self._next_start
+            end = start + self.chunk_size
+            if end > total and not final:
+                break
+
+            chunk_words = self._words[start - self._offset:end - self._offset]
+            if len(chunk_words) >= self.min_words:
+                chunks.append({
+                    "chunk_index": self._chunk_index,
+                    "content": " ".join(chunk_words),
+                    "metadata": {
+                        "start_idx": start,
+                        "end_idx": start + len(chunk_words),
+                        "word_count": len(chunk_words)
+                    }
+                })
+                self._chunk_index += 1
+            self._next_start = self._step_from(start, total)
+
+        # Forget words that no future window can contain
+        consumed = min(self._next_start, total) - self._offset
+        if consumed > 0:
+            del self._words[:consumed]
+            self._offset += consumed
+        return chunks
+
+class TokenWindowChunker:
+    """Incremental chunker packing windows to a model's tokenizer limit.
+
+    Each pushed piece of text is tokenized with a single call to the model's
+    fast tokenizer, and windows of up to ``max_tokens`` tokens are cut from
+    the token offsets, so no window is re-tokenized and nothing the model
+    would truncate ends up in a chunk. Windows start and end on word
+    boundaries, and, like ``WordWindowChunker``, start on content-defined
+    anchor words so edits only change nearby windows.
+
+    Tokenizing is CPU-bound, so async callers push text from an executor
+    thread rather than the event loop.
+    """
+
+    def __init__(self, tokenizer: Any, max_tokens: int, overlap: int = 32, min_tokens: int = 10):
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+        self.max_step = max(1, max_tokens - overlap)
+        self.min_step = max(1, self.max_step * 3 // 4)
+        self.anchor_modulus = max(1, (self.max_step - self.min_step) // 4)
+        self.min_tokens = min_tokens
+        self._text = ""  # Document text from character position self._text_offset on
+        self._text_offset = 0
+        self._pending = ""  # Trailing text that may continue in the next piece
+        self._previous_end = -1  # Character end of the last token, to tell word starts across pieces
+        # Token character spans, word-start and anchor flags from token position self._offset on
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+        self._word_starts: List[bool] = []
+        self._anchors: List[bool] = []
+        self._offset = 0
+        self._next_start = 0
+        self._chunk_index = 0
+
+    def push(self, text: str) -> List[Dict[str, Any]]:
+        """Add a piece of text and return the windows it completes."""
+        if not text:
+            return []
+        text = self._pending + text
+        # Hold back the last, possibly incomplete word until more text arrives
+        cut = len(text)
+        while cut > 0 and not text[cut - 1].isspace():
+            cut -= 1
+        if len(text) - cut > MAX_PENDING_CHARS:
+            # Text without whitespace: tokenize it rather than buffer it indefinitely,
+            # holding back only its last token, which may continue in the next piece
+            self._pending = self._tokenize(text, hold_last=True)
+        else:
+            self._pending = text[cut:]
+            self._tokenize(text[:cut])
+        return self._emit(final=False)
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """Return the remaining windows at the end of the text."""
+        text, self._pending = self._pending, ""
+        self._tokenize(text)
+        return self._emit(final=True)
+
+    def _tokenize(self, text: str, hold_last: bool = False) -> str:
+        """Record the tokens of ``text``; with ``hold_last``, return the text of its last token instead."""
+        if not text:
+            return ""
+        base = self._text_offset + len(self._text)
+        encoding = self.tokenizer(
+            text,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+            verbose=False
+        )
+        offsets = [(start, end) for start, end in encoding["offset_mapping"] if start != end]
+        held = ""
+        if hold_last and offsets and offsets[-1][0] > 0:
+            held = text[offsets[-1][0]:]
+            text = text[:offsets[-1][0]]
+            offsets.pop()
+        self._text += text
+        for start, end in offsets:
+            word_start = base + start != self._previous_end
+            self._starts.append(base + start)
+            self._ends.append(base + end)
+            self._word_starts.append(word_start)
+            self._anchors.append(
+                word_start and zlib.crc32(text[start:end].encode("utf-8")) % self.anchor_modulus == 0
+            )
+            self._previous_end = base + end
+        return held
+
+    def _window_end(self, start: int, total: int) -> int:
+        """Last token position (exclusive) of the window at ``start``, on a word boundary."""
+        limit = start + self.max_tokens
+        if limit >= total:
+            return total
+        for position in range(limit, start, -1):
+            if self._word_starts[position - self._offset]:
+                return position
+        return limit  # A single word longer than the window
+
+    def _step_from(self, start: int, end: int) -> int:
+        """Start of the window following the one at ``start``."""
+        fallback = None
+        for position in range(start + self.min_step, min(start + self.max_step, end)):
+            index = position - self._offset
+            if self._anchors[index]:
+                return position
+            if self._word_starts[index]:
+                fallback = position
+        if fallback is None:
+            fallback = min(start + self.max_step, end)
+        return fallback
+
+    def _emit(self, final: bool) -> List[Dict[str, Any]]:
+        chunks = []
+        total = self._offset + len(self._starts)
+        while self._next_start < total:
+            start = self._next_start
+            if start + self.max_tokens >= total and not final:
+                break
+
+            end = self._window_end(start, total)
+            char_start = self._starts[start - self._offset]
+            char_end = self._ends[end - 1 - self._offset]
+            if end - start >= self.min_tokens:
+                content = self._text[char_start - self._text_offset:char_end - self._text_offset]
+                chunks.append({
+                    "chunk_index": self._chunk_index,
+                    "content": content,
+                    "metadata": {
+                        "start_idx": start,
+                        "end_idx": end,
+                        "token_count": end - start,
+                        "word_count": len(content.split()),
+                        "char_start": char_start,
+                        "char_end": char_end
+                    }
+                })
+                self._chunk_index += 1
+            self._next_start = total if end == total else self._step_from(start, end)
+
+        # Forget tokens and text that no future window can contain
+        consumed = self._next_start - self._offset
+        if consumed > 0:
+            del self._starts[:consumed]
+            del self._ends[:consumed]
+            del self._word_starts[:consumed]
+            del self._anchors[:consumed]
+            self._offset += consumed
+        keep_from = self._starts[0] if self._starts else self._text_offset + len(self._text)
+        if keep_from > self._text_offset:
+            self._text = self._text[keep_from - self._text_offset:]
+            self._text_offset = keep_from
+        return chunks
+
 class EmbeddingService:
-    def __init__(self, model_name: Optional[str] = None):
-        """Initialize the embedding service with a specific model."""
+    def __init__(self, model_name: Optional[str] = None, model: Optional[Any] = None):
+        """Initialize the embedding service with a specific model.
+
+        The model is taken from the process-wide model registry, on first use,
+        unless one is passed in explicitly.
+        """
         self.model_name = model_name or settings.EMBEDDING_MODEL
-        logger.info(f"Loading embedding model: {self.model_name}")
-        self.model = SentenceTransformer(self.model_name)
+        self._model = model
         self.embedding_dimension = settings.EMBEDDING_DIMENSION
-        logger.info(f"Embedding model loaded with dimension: {self.embedding_dimension}")
 
-    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for a list of text chunks."""
+    @property
+    def model(self) -> Any:
+        if self._model is None:
+            self._model = model_registry.get(self.model_name)
+        return self._model
+
+    def get_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Generate L2-normalized float32 embeddings for a list of text chunks, one row per text."""
         if not texts:
-            return []
+            return np.empty((0, self.embedding_dimension), dtype=np.float32)
 
         try:
-            embeddings = self.model.encode(texts)
-            # Convert numpy arrays to Python lists for JSON serialization
-            return embeddings.tolist()
+            return np.asarray(self.model.encode(texts, normalize_embeddings=True), dtype=np.float32)
         except Exception as e:
             logger.error(f"Error generating embeddings: {str(e)}")
             raise
 
-    def chunk_text(self, text: str, chunk_size: int = 1000, overlap: int = 200) -> List[Dict[str, Any]]:
+    def embed_query(self, query: str) -> np.ndarray:
+        """Generate the L2-normalized embedding of a single query as a float32 vector."""
+        embedding = query_embedding_cache.get(self.model_name, query)
+        if embedding is None:
+            embedding = np.asarray(self.model.encode([query], normalize_embeddings=True)[0], dtype=np.float32)
+            query_embedding_cache.put(self.model_name, query, embedding)
+        return embedding
+
+    async def embed_query_batched(self, query: str) -> np.ndarray:
+        """Generate the embedding of a query, batched with concurrent queries."""
+        embedding = query_embedding_cache.get(self.model_name, query)
+        if embedding is None:
+            embedding = await get_batcher(self.model_name, self.model).embed(query)
+            query_embedding_cache.put(self.model_name, query, embedding)
+        return embedding
+
+    def max_chunk_tokens(self) -> int:
+        """Number of content tokens the model embeds without truncation."""
+        if settings.CHUNK_MAX_TOKENS:
+            return settings.CHUNK_MAX_TOKENS
+        # Leave room for the [CLS] and [SEP] tokens added by the model
+        return self.model.max_seq_length - 2
+
+    def create_chunker(self, chunk_size: Optional[int] = None, overlap: Optional[int] = None) -> Any:
+        """Create an incremental chunker for this model.
+
+        Chunks are packed by token count with the model's fast tokenizer. Models
+        without one fall back to word windows, where ``chunk_size`` and
+        ``overlap`` count words instead of tokens.
+        """
+        tokenizer = getattr(self.model, "tokenizer", None)
+        if tokenizer is None or not getattr(tokenizer, "is_fast", False):
+            return WordWindowChunker(chunk_size or 1000, overlap if overlap is not None else 200)
+        return TokenWindowChunker(
+            tokenizer,
+            min(chunk_size or self.max_chunk_tokens(), self.max_chunk_tokens()),
+            overlap if overlap is not None else settings.CHUNK_OVERLAP_TOKENS
+        )
+
+    def chunk_text(self, text: str, chunk_size: Optional[int] = None, overlap: Optional[int] = None) -> List[Dict[str, Any]]:
         """Split text into overlapping chunks for processing."""
         if not text:
             return []
 
-        words = text.split()
-        chunks = []
+        chunker = self.create_chunker(chunk_size, overlap)
+        return chunker.push(text) + chunker.finish()
 
-        for i in range(0, len(words), chunk_size - overlap):
-            chunk_words = words[i:i + chunk_size]
-            if len(chunk_words) < 10:  # Skip very small chunks
-                continue
-
-            chunk_text = " ".join(chunk_words)
-            chunks.append({
-                "chunk_index": len(chunks),
-                "content": chunk_text,
-                "metadata": {
-                    "start_idx": i,
-                    "end_idx": i + len(chunk_words),
-                    "word_count": len(chunk_words)
-                }
-            })
-
-        return chunks
-
-    def process_document(self, content: str, chunk_size: int = 1000, overlap: int = 200) -> List[Dict[str, Any]]:
+    def process_document(
+        self,
+        content: str,
+        chunk_size: Optional[int] = None,
+        overlap: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
         """Process a document by chunking and embedding it."""
         chunks = self.chunk_text(content, chunk_size, overlap)
 
@@ -71,21 +350,20 @@ class EmbeddingService:
 
         return chunks
 
-    def similarity_search(self, query: str, embeddings: List[List[float]], top_k: int = 5) -> List[Dict[str, Any]]:
-        """Find the most similar chunks to a query."""
-        if not embeddings:
-            return []
+    def similarity_search(self, query: str, embeddings: Any, top_k: int = 5) -> List[Dict[str, Any]]:
+        """Find the most similar chunks to a query.
 
-        query_embedding = self.get_embeddings([query])[0]
+        ``embeddings`` must be L2-normalized, as returned by ``get_embeddings``,
+        so cosine similarity reduces to a single matrix-vector product.
+        """
+        if len(embeddings) == 0:
+            return []
 
-        # Convert to numpy arrays for efficient computation
-        query_embedding_np = np.array(query_embedding)
-        embeddings_np = np.array(embeddings)
+        query_embedding = self.embed_query(query)
 
         # Compute cosine similarity
-        similarities = np.dot(embeddings_np, query_embedding_np) / (
-            np.linalg.norm(embeddings_np, axis=1) * np.linalg.norm(query_embedding_np)
-        )
+        embeddings_np = np.asarray(embeddings, dtype=np.float32)
+        similarities = embeddings_np @ query_embedding
 
         # Get indices of top_k most similar chunks
         top_indices = np.argsort(similarities)[-top_k:][::-1]
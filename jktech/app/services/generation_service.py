@@ -0,0 +1,274 @@
+from abc import ABC, abstractmethod
+from collections import deque
+from string import Formatter
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional
+from app.core.config import settings
+from app.core.metrics import metrics
+import asyncio
+import logging
+import re
+import textwrap
+import time
+
+logger = logging.getLogger(__name__)
+
+TOKEN_COUNT_BUCKETS = (8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+generation_seconds_histogram = metrics.histogram(
+    "generation_seconds", description="Duration of generation backend calls"
+)
+first_token_seconds_histogram = metrics.histogram(
+    "generation_first_token_seconds", description="Time from the start of a generation call to its first token"
+)
+queue_wait_histogram = metrics.histogram(
+    "generation_queue_wait_seconds", description="Time a prompt waited for a free generation slot"
+)
+prompt_tokens_histogram = metrics.histogram(
+    "generation_prompt_tokens", TOKEN_COUNT_BUCKETS, "Prompt tokens per generation call"
+)
+completion_tokens_histogram = metrics.histogram(
+    "generation_completion_tokens", TOKEN_COUNT_BUCKETS, "Completion tokens per generation call"
+)
+coalesced_counter = metrics.counter(
+    "generation_coalesced", "Prompts served by an identical generation call already in flight"
+)
+rejected_counter = metrics.counter(
+    "generation_rejected", "Prompts rejected because the generation queue was full"
+)
+
+class PromptTemplate:
+    """A prompt template whose fields are parsed once, when it is created."""
+
+    def __init__(self, template: str):
+        self.template = textwrap.dedent(template).strip() + "\n"
+        self.input_variables = sorted({
+            field for _, field, _, _ in Formatter().parse(self.template) if field
+        })
+
+    def format(self, **variables: Any) -> str:
+        missing = [name for name in self.input_variables if name not in variables]
+        if missing:
+            raise KeyError(f"Missing prompt variables: {', '.join(missing)}")
+        return self.template.format(**variables)
+
+class GenerationBackend(ABC):
+    """Interface of text generation backends.
+
+    A backend streams the completion of a prompt as text pieces. Limits,
+    coalescing and metrics are applied by ``GenerationService``, so a backend
+    only has to produce text.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Stream the completion of a prompt as text pieces."""
+
+    def count_tokens(self, text: str) -> int:
+        """Approximate number of tokens in a text; backends with a tokenizer should override this."""
+        return len(text.split())
+
+class LocalGenerationBackend(GenerationBackend):
+    """Deterministic stand-in backend for tests and benchmarks.
+
+    Produces a fixed answer mentioning the number of context chunks in the
+    prompt, one word at a time, optionally sleeping ``token_delay_ms`` between
+    words to simulate a model's decoding speed.
+    """
+
+    name = "local"
+    CONTEXT_CHUNK_PATTERN = re.compile(r"^Document \d+, Chunk \d+:", re.MULTILINE)
+
+    def __init__(self, token_delay_ms: Optional[float] = None):
+        """Initialize the local generation backend."""
+        self.token_delay = (
+            token_delay_ms if token_delay_ms is not None else settings.GENERATION_LOCAL_TOKEN_DELAY_MS
+        ) / 1000
+        self.calls = 0
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        self.calls += 1
+        num_chunks = len(self.CONTEXT_CHUNK_PATTERN.findall(prompt))
+        answer = "Based on the retrieved documents, I can provide the following answer: "
+        answer += f"This is a simulated answer that would be generated by an LLM based on the {num_chunks} most relevant chunks."
+
+        for token in re.findall(r"\S+\s*", answer):
+            await asyncio.sleep(self.token_delay)
+            yield token
+
+BACKENDS: Dict[str, Callable[[], GenerationBackend]] = {
+    "local": LocalGenerationBackend,
+}
+
+def create_backend(name: str) -> GenerationBackend:
+    """Create the generation backend registered under a name."""
+    factory = BACKENDS.get(name)
+    if factory is None:
+        raise ValueError(f"Unknown generation backend: {name}")
+    return factory()
+
+class GenerationQueueFullError(Exception):
+    """Raised when a prompt cannot be queued for generation."""
+
+class _Flight:
+    """One backend call, whose output is replayed to every prompt coalesced onto it."""
+
+    def __init__(self):
+        self.tokens: List[str] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._waiters: List[asyncio.Future] = []
+
+    def notify(self) -> None:
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def wait(self) -> None:
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        await waiter
+
+    async def follow(self) -> AsyncIterator[str]:
+        position = 0
+        while True:
+            while position < len(self.tokens):
+                position += 1
+                yield self.tokens[position - 1]
+            if self.finished:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self.wait()
+
+class GenerationService:
+    """Runs prompts on a generation backend with bounded concurrency.
+
+    At most ``max_in_flight`` backend calls run at once; further prompts wait
+    in FIFO order, and once ``max_queued`` prompts are waiting new ones are
+    rejected with ``GenerationQueueFullError``. A prompt identical to one
+    already in flight is not sent to the backend again: its caller receives
+    the same tokens as they are produced.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[GenerationBackend] = None,
+        max_in_flight: Optional[int] = None,
+        max_queued: Optional[int] = None,
+        coalesce: Optional[bool] = None
+    ):
+        """Initialize the generation service."""
+        self.backend = backend or create_backend(settings.GENERATION_BACKEND)
+        self.max_in_flight = max_in_flight or settings.GENERATION_MAX_IN_FLIGHT
+        self.max_queued = max_queued if max_queued is not None else settings.GENERATION_MAX_QUEUED
+        self.coalesce = coalesce if coalesce is not None else settings.GENERATION_COALESCE
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._flights: Dict[str, _Flight] = {}
+
+    async def _acquire(self) -> None:
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self.max_queued:
+            rejected_counter.inc()
+            raise GenerationQueueFullError("Too many prompts are waiting for generation")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # The releasing call hands its slot over, so in_flight is unchanged
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def _release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    async def _run(self, prompt: str, flight: _Flight) -> None:
+        start = time.perf_counter()
+        try:
+            await self._acquire()
+        except BaseException as e:
+            flight.error = e
+            flight.finished = True
+            flight.notify()
+            return
+        queue_wait_histogram.observe(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        try:
+            async for token in self.backend.stream(prompt):
+                if not flight.tokens:
+                    first_token_seconds_histogram.observe(time.perf_counter() - start)
+                flight.tokens.append(token)
+                flight.notify()
+        except BaseException as e:
+            flight.error = e
+            if not isinstance(e, asyncio.CancelledError):
+                logger.error(f"Error generating with {self.backend.name} backend: {str(e)}")
+        finally:
+            self._release()
+            elapsed = time.perf_counter() - start
+            prompt_tokens = self.backend.count_tokens(prompt)
+            completion_tokens = self.backend.count_tokens("".join(flight.tokens))
+            generation_seconds_histogram.observe(elapsed)
+            prompt_tokens_histogram.observe(prompt_tokens)
+            completion_tokens_histogram.observe(completion_tokens)
+            logger.debug(
+                f"Generated {completion_tokens} tokens from {prompt_tokens} prompt tokens "
+                f"with {self.backend.name} backend in {elapsed:.3f}s"
+            )
+            flight.finished = True
+            flight.notify()
+
+    async def stream(self, prompt: str) -> AsyncIterator[str]:
+        """Generate the completion of a prompt, yielding it as it is produced."""
+        flight = self._flights.get(prompt) if self.coalesce else None
+        if flight is not None:
+            coalesced_counter.inc()
+        else:
+            flight = _Flight()
+            flight.task = asyncio.ensure_future(self._run(prompt, flight))
+            if self.coalesce:
+                self._flights[prompt] = flight
+                flight.task.add_done_callback(lambda _: self._forget(prompt, flight))
+
+        flight.subscribers += 1
+        try:
+            async for token in flight.follow():
+                yield token
+        finally:
+            flight.subscribers -= 1
+            if not flight.subscribers and not flight.finished:
+                # Nobody is listening any more, so stop generating
+                self._forget(prompt, flight)
+                flight.task.cancel()
+
+    def _forget(self, prompt: str, flight: _Flight) -> None:
+        if self._flights.get(prompt) is flight:
+            del self._flights[prompt]
+
+    async def generate(self, prompt: str) -> str:
+        """Generate the completion of a prompt."""
+        return "".join([token async for token in self.stream(prompt)])
+
+generation_service = GenerationService()
+
+# Gauges report the shared service; other instances (e.g. in tests) are not registered
+metrics.gauge("generation_in_flight", "Generation backend calls running", lambda: generation_service.in_flight)
+metrics.gauge("generation_queued", "Prompts waiting for a generation slot", lambda: len(generation_service._waiters))
@@ -0,0 +1,233 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+import numpy as np
+from sqlalchemy import delete, select
+from sqlalchemy.orm import defer
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.db.base import async_session_maker
+from app.models.document import ChunkTerm, Document, DocumentChunk, DocumentPart
+from app.services.answer_cache import answer_cache
+from app.services.document_service import DocumentService
+from app.services.embedding_service import EmbeddingService
+import asyncio
+import logging
+import multiprocessing
+
+logger = logging.getLogger(__name__)
+
+def encode_in_worker(model_name: str, texts: List[str]) -> np.ndarray:
+    """Encode texts inside an embedding worker process.
+
+    Runs in a child process, which loads the model from its own registry the
+    first time it is called.
+    """
+    return EmbeddingService(model_name).get_embeddings(texts)
+
+class IngestionQueueFullError(Exception):
+    """Raised when the ingestion queue cannot accept another document."""
+
+class IngestionPipeline:
+    """Background pipeline that chunks and embeds newly created documents.
+
+    Document IDs are queued on a bounded asyncio queue and consumed by worker
+    coroutines, which offload ``model.encode`` to a pool of embedding
+    processes so the event loop never runs CPU-bound work.
+
+    The queue only lives in memory, so on start the pipeline requeues every
+    document still marked ``processing`` by an earlier run that crashed,
+    restarted or was stopped. With several workers sharing a database, a
+    worker restarting alone also picks up documents queued on the others;
+    processing restarts from scratch, so such a document is ingested twice
+    rather than lost.
+    """
+
+    def __init__(
+        self,
+        max_queue_size: Optional[int] = None,
+        num_workers: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        read_slice_chars: Optional[int] = None,
+        session_maker: Optional[Callable[[], AsyncSession]] = None,
+        embedding_service: Optional[EmbeddingService] = None
+    ):
+        """Initialize the ingestion pipeline."""
+        self.max_queue_size = max_queue_size or settings.INGESTION_QUEUE_SIZE
+        self.num_workers = num_workers or settings.INGESTION_WORKERS
+        self.batch_size = batch_size or settings.INGESTION_BATCH_SIZE
+        self.read_slice_chars = read_slice_chars or settings.INGESTION_READ_SLICE_CHARS
+        self.session_maker = session_maker or async_session_maker
+        self.embedding_service = embedding_service
+        self._queue: Optional[asyncio.Queue] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._workers: List[asyncio.Task] = []
+        self._resume_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Start the worker coroutines and the embedding process pool."""
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        self._workers = [asyncio.create_task(self._worker_loop()) for _ in range(self.num_workers)]
+        logger.info(f"Ingestion pipeline started with {self.num_workers} workers")
+        unfinished = await self._find_unfinished()
+        if unfinished:
+            logger.info(f"Resuming ingestion of {len(unfinished)} unfinished documents")
+            self._resume_task = asyncio.create_task(self._resume(unfinished))
+
+    async def stop(self) -> None:
+        """Stop the workers and shut down the process pool.
+
+        Documents still queued stay ``processing`` and are resumed on the next start.
+        """
+        tasks = self._workers + ([self._resume_task] if self._resume_task is not None else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._resume_task = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        logger.info("Ingestion pipeline stopped")
+
+    async def _find_unfinished(self) -> List[int]:
+        """IDs of documents an earlier run left in ``processing``."""
+        try:
+            async with self.session_maker() as session:
+                stmt = select(Document.id).where(Document.status == "processing").order_by(Document.id)
+                return list((await session.execute(stmt)).scalars())
+        except Exception as e:
+            logger.warning(f"Could not look up unfinished documents to resume: {str(e)}")
+            return []
+
+    async def _resume(self, document_ids: List[int]) -> None:
+        # Waits for room in the queue rather than rejecting, unlike new submissions
+        for document_id in document_ids:
+            await self._queue.put(document_id)
+
+    def is_full(self) -> bool:
+        return self._queue is not None and self._queue.full()
+
+    def submit(self, document_id: int) -> None:
+        """Queue a document for chunking and embedding."""
+        if self._queue is None:
+            raise RuntimeError("Ingestion pipeline is not running")
+        try:
+            self._queue.put_nowait(document_id)
+        except asyncio.QueueFull:
+            raise IngestionQueueFullError(f"Ingestion queue is full ({self.max_queue_size} documents)")
+
+    async def _worker_loop(self) -> None:
+        while True:
+            document_id = await self._queue.get()
+            try:
+                await self.process(document_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Error ingesting document {document_id}")
+                await self._mark_failed(document_id, str(e))
+            finally:
+                self._queue.task_done()
+
+    async def _encode(self, texts: List[str]) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, encode_in_worker, settings.EMBEDDING_MODEL, texts)
+
+    async def _iter_content(self, session: AsyncSession, document_id: int) -> AsyncIterator[str]:
+        """Read a document's content part by part.
+
+        Streamed uploads are read back from their staged ``DocumentPart`` rows,
+        one keyed lookup per part; slicing ``content`` in SQL would decompress
+        the whole TOASTed value again for every slice. Documents created from
+        a request body have no parts, and their content is loaded once.
+        """
+        position = 0
+        while True:
+            stmt = select(DocumentPart.content).where(
+                DocumentPart.document_id == document_id,
+                DocumentPart.position == position
+            )
+            text = (await session.execute(stmt)).scalar()
+            if text is None:
+                break
+            yield text
+            position += 1
+        if position:
+            return
+
+        content = (await session.execute(select(Document.content).where(Document.id == document_id))).scalar()
+        for start in range(0, len(content or ""), self.read_slice_chars):
+            yield content[start:start + self.read_slice_chars]
+
+    async def _store_batch(
+        self,
+        session: AsyncSession,
+        document_service: DocumentService,
+        document: Document,
+        batch: List[Dict[str, Any]]
+    ) -> None:
+        """Embed a batch of chunks, store them and record progress."""
+        document.embeddings_reused += await document_service.embed_chunks(session, batch, self._encode)
+        document_service.add_chunks(session, document.id, batch)
+        document.chunks_processed += len(batch)
+        document.chunks_total = document.chunks_processed
+        await session.commit()
+
+    async def process(self, document_id: int) -> None:
+        """Chunk and embed a document, committing progress after every batch.
+
+        Content is streamed from the database and chunks are embedded in
+        fixed-size batches, so memory use does not grow with the document.
+        """
+        document_service = DocumentService(embedding_service=self.embedding_service)
+        async with self.session_maker() as session:
+            document = await session.get(Document, document_id, options=[defer(Document.content)])
+            if document is None:
+                logger.warning(f"Document {document_id} disappeared before ingestion")
+                return
+            if document.status != "processing":
+                return  # Queued twice, e.g. by a resume racing a worker that already finished it
+
+            # Drop chunks left behind by an interrupted earlier attempt
+            await session.execute(delete(ChunkTerm).where(ChunkTerm.document_id == document_id))
+            await session.execute(delete(DocumentChunk).where(DocumentChunk.document_id == document_id))
+            document.chunks_total = 0
+            document.chunks_processed = 0
+            document.embeddings_reused = 0
+            await session.commit()
+
+            # Tokenizing is CPU-bound, so the chunker runs on the default executor
+            loop = asyncio.get_running_loop()
+            chunker = document_service.embedding_service.create_chunker()
+            pending: List[Dict[str, Any]] = []
+            async for text in self._iter_content(session, document_id):
+                pending.extend(await loop.run_in_executor(None, chunker.push, text))
+                while len(pending) >= self.batch_size:
+                    await self._store_batch(session, document_service, document, pending[:self.batch_size])
+                    pending = pending[self.batch_size:]
+            pending.extend(await loop.run_in_executor(None, chunker.finish))
+            if pending:
+                await self._store_batch(session, document_service, document, pending)
+
+            document.status = "ready"
+            await session.execute(delete(DocumentPart).where(DocumentPart.document_id == document_id))
+            await session.commit()
+            answer_cache.invalidate_document(document_id)
+            logger.info(
+                f"Ingested document {document_id} ({document.chunks_processed} chunks, "
+                f"{document.embeddings_reused} embeddings reused)"
+            )
+
+    async def _mark_failed(self, document_id: int, error: str) -> None:
+        async with self.session_maker() as session:
+            document = await session.get(Document, document_id)
+            if document is not None:
+                document.status = "failed"
+                document.error = error
+                await session.commit()
+
+ingestion_pipeline = IngestionPipeline()
@@ -0,0 +1,108 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import math
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.document import ChunkTerm, DocumentChunk, chunk_terms
+import logging
+
+logger = logging.getLogger(__name__)
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Tuple[int, float]]], k: int = 60) -> List[Tuple[int, float]]:
+    """Fuse ranked (id, score) lists by summing 1 / (k + rank) over the lists an ID appears in."""
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, (chunk_id, _) in enumerate(ranking, start=1):
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+class LexicalIndex:
+    """BM25 search over the ``chunkterm`` inverted index.
+
+    Postings are written next to the chunks at ingest time, so a query only
+    reads the posting lists of its own terms within the searched documents.
+    Once the searched documents have at least ``max_df_min_chunks`` chunks,
+    terms occurring in more than ``max_df_ratio`` of them are skipped; they
+    carry almost no BM25 weight but have the longest posting lists. Smaller
+    corpora are scored on every query term, since there a common term may
+    be the only one that matches.
+    """
+
+    def __init__(
+        self,
+        k1: Optional[float] = None,
+        b: Optional[float] = None,
+        max_df_ratio: Optional[float] = None,
+        max_df_min_chunks: Optional[int] = None
+    ):
+        """Initialize the lexical index."""
+        self.k1 = k1 if k1 is not None else settings.BM25_K1
+        self.b = b if b is not None else settings.BM25_B
+        self.max_df_ratio = max_df_ratio if max_df_ratio is not None else settings.LEXICAL_MAX_DF_RATIO
+        self.max_df_min_chunks = (
+            max_df_min_chunks if max_df_min_chunks is not None else settings.LEXICAL_MAX_DF_MIN_CHUNKS
+        )
+
+    @staticmethod
+    def postings(document_id: int, chunk_id: Optional[int], terms: Dict[str, int]) -> List[Dict[str, Any]]:
+        """Rows of the inverted index for one chunk."""
+        return [
+            {"term": term, "chunk_id": chunk_id, "document_id": document_id, "term_frequency": frequency}
+            for term, frequency in terms.items()
+        ]
+
+    async def search(
+        self,
+        session: AsyncSession,
+        document_ids: Sequence[int],
+        query: str,
+        limit: int
+    ) -> List[Tuple[int, float]]:
+        """Return up to ``limit`` (chunk ID, BM25 score) pairs for a query, best first."""
+        query_terms = chunk_terms(query)
+        if not query_terms or not document_ids:
+            return []
+
+        stmt = (
+            select(func.count(DocumentChunk.id), func.avg(DocumentChunk.term_count))
+            .where(DocumentChunk.document_id.in_(document_ids))
+            .where(DocumentChunk.term_count.isnot(None))
+        )
+        num_chunks, average_length = (await session.execute(stmt)).one()
+        if not num_chunks:
+            return []
+        average_length = float(average_length) or 1.0
+
+        stmt = (
+            select(ChunkTerm.term, func.count())
+            .where(ChunkTerm.term.in_(list(query_terms)))
+            .where(ChunkTerm.document_id.in_(document_ids))
+            .group_by(ChunkTerm.term)
+        )
+        max_frequency = self.max_df_ratio * num_chunks if num_chunks >= self.max_df_min_chunks else num_chunks
+        document_frequencies = {
+            term: frequency for term, frequency in (await session.execute(stmt)).all()
+            if frequency <= max_frequency
+        }
+        if not document_frequencies:
+            return []
+
+        idf = {
+            term: math.log(1 + (num_chunks - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequencies.items()
+        }
+        stmt = (
+            select(ChunkTerm.chunk_id, ChunkTerm.term, ChunkTerm.term_frequency, DocumentChunk.term_count)
+            .join(DocumentChunk, DocumentChunk.id == ChunkTerm.chunk_id)
+            .where(ChunkTerm.term.in_(list(document_frequencies)))
+            .where(ChunkTerm.document_id.in_(document_ids))
+        )
+        scores: Dict[int, float] = {}
+        for chunk_id, term, frequency, length in (await session.execute(stmt)).all():
+            norm = self.k1 * (1 - self.b + self.b * (length or 0) / average_length)
+            weight = idf[term] * frequency * (self.k1 + 1) / (frequency + norm) * query_terms[term]
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + weight
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+lexical_index = LexicalIndex()
@@ -0,0 +1,100 @@
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from app.core.config import settings
+import logging
+import os
+import resource
+import threading
+import time
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+logger = logging.getLogger(__name__)
+
+def _rss_bytes() -> int:
+    """Current resident set size of the process in bytes."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Peak RSS, reported in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def _parameter_bytes(model: Any) -> int:
+    """Size of a model's parameters and buffers in bytes."""
+    try:
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+    except AttributeError:
+        return 0
+
+class ModelRegistry:
+    """Process-wide registry of embedding models.
+
+    Each model is loaded at most once per worker process and shared by every
+    service that needs it.
+    """
+
+    def __init__(self):
+        self._models: Dict[str, "SentenceTransformer"] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def configured_models(self) -> List[str]:
+        """Names of the models this worker is configured to serve."""
+        names = [settings.EMBEDDING_MODEL]
+        for name in settings.EMBEDDING_PRELOAD_MODELS.split(","):
+            name = name.strip()
+            if name and name not in names:
+                names.append(name)
+        return names
+
+    def get(self, model_name: Optional[str] = None) -> "SentenceTransformer":
+        """Get a loaded model, loading it on first use."""
+        model_name = model_name or settings.EMBEDDING_MODEL
+        model = self._models.get(model_name)
+        if model is None:
+            with self._lock:
+                model = self._models.get(model_name)
+                if model is None:
+                    model = self._load(model_name)
+        return model
+
+    def _load(self, model_name: str) -> "SentenceTransformer":
+        logger.info(f"Loading embedding model: {model_name}")
+        rss_before = _rss_bytes()
+        start = time.perf_counter()
+        # Imported here so that importing the app does not pull in torch
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(model_name)
+        load_seconds = time.perf_counter() - start
+
+        self._models[model_name] = model
+        self._stats[model_name] = {
+            "load_seconds": round(load_seconds, 3),
+            "parameter_bytes": _parameter_bytes(model),
+            "rss_delta_bytes": max(0, _rss_bytes() - rss_before),
+            "embedding_dimension": model.get_sentence_embedding_dimension(),
+            "max_seq_length": model.max_seq_length,
+            "warmup_seconds": None,
+        }
+        logger.info(f"Embedding model {model_name} loaded in {load_seconds:.2f}s")
+        return model
+
+    def warm_up(self, model_names: Optional[List[str]] = None) -> None:
+        """Load the given (or all configured) models and run a first encode."""
+        for model_name in model_names or self.configured_models():
+            model = self.get(model_name)
+            start = time.perf_counter()
+            model.encode(["warm-up"])
+            self._stats[model_name]["warmup_seconds"] = round(time.perf_counter() - start, 3)
+            logger.info(f"Embedding model {model_name} warmed up")
+
+    def stats(self) -> Dict[str, Any]:
+        """Load time and memory footprint of every loaded model."""
+        return {
+            "process_rss_bytes": _rss_bytes(),
+            "models": {name: dict(stats) for name, stats in self._stats.items()},
+        }
+
+model_registry = ModelRegistry()
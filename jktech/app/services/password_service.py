@@ -0,0 +1,103 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+from passlib.context import CryptContext
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.security import pwd_context
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+queue_wait_histogram = metrics.histogram(
+    "password_queue_wait_seconds", description="Time a password operation waited for a hashing thread"
+)
+hash_seconds_histogram = metrics.histogram(
+    "password_hash_seconds", description="Duration of bcrypt hashing and verification"
+)
+rejected_counter = metrics.counter(
+    "password_rejected", "Password operations rejected because the hashing queue was full"
+)
+rehashed_counter = metrics.counter(
+    "password_rehashed", "Password hashes upgraded to the configured bcrypt cost on login"
+)
+
+class PasswordServiceBusyError(Exception):
+    """Raised when a password operation cannot be queued for hashing."""
+
+class PasswordService:
+    """Runs bcrypt off the event loop on a bounded thread pool.
+
+    Each hash or verification costs the configured bcrypt rounds of CPU, so
+    running it inline would stall every other request in the worker. bcrypt
+    releases the GIL, so up to ``max_workers`` operations run in parallel;
+    ``max_queued`` more may wait for a thread, and further ones are rejected
+    with ``PasswordServiceBusyError`` rather than piling up.
+    """
+
+    def __init__(
+        self,
+        context: Optional[CryptContext] = None,
+        max_workers: Optional[int] = None,
+        max_queued: Optional[int] = None
+    ):
+        """Initialize the password service."""
+        self.context = context or pwd_context
+        self.max_workers = max_workers or settings.PASSWORD_HASH_WORKERS
+        self.max_queued = max_queued if max_queued is not None else settings.PASSWORD_HASH_MAX_QUEUED
+        self.pending = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        metrics.gauge("password_in_flight", "Password operations running on hashing threads",
+                      lambda: min(self.pending, self.max_workers))
+        metrics.gauge("password_queued", "Password operations waiting for a hashing thread",
+                      lambda: max(0, self.pending - self.max_workers))
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password")
+        return self._executor
+
+    async def _run(self, operation: Callable[..., Any], *args: Any) -> Any:
+        if self.pending >= self.max_workers + self.max_queued:
+            rejected_counter.inc()
+            raise PasswordServiceBusyError("Too many password operations are queued")
+
+        submitted = time.perf_counter()
+
+        def timed() -> Any:
+            started = time.perf_counter()
+            queue_wait_histogram.observe(started - submitted)
+            try:
+                return operation(*args)
+            finally:
+                hash_seconds_histogram.observe(time.perf_counter() - started)
+
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, timed)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        """Hash a password with the configured bcrypt cost."""
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Verify a password against its hash.
+
+        Returns whether it matched and, if the hash was made with a different
+        bcrypt cost than the configured one, a replacement hash to store.
+        """
+        valid, new_hash = await self._run(self.context.verify_and_update, password, hashed_password)
+        if new_hash is not None:
+            rehashed_counter.inc()
+        return valid, new_hash
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+password_service = PasswordService()
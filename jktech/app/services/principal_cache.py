@@ -0,0 +1,212 @@
+from collections import OrderedDict
+from typing import Any, NamedTuple, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from app.core.config import settings
+from app.core.metrics import metrics
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+LISTENER_RETRY_MAX_SECONDS = 30.0
+
+class Principal(NamedTuple):
+    """The authenticated user as seen by authorization checks."""
+    id: int
+    is_active: bool
+    is_superuser: bool
+
+    @classmethod
+    def from_user(cls, user: Any) -> "Principal":
+        return cls(id=user.id, is_active=user.is_active, is_superuser=user.is_superuser)
+
+class PrincipalCache:
+    """Per-worker TTL cache of resolved principals keyed by user ID.
+
+    Saves authenticated requests the user lookup. Entries expire after
+    ``ttl_seconds`` and are dropped as soon as ``UserService`` changes or
+    deletes the user. With ``notify_channel`` set on PostgreSQL, those
+    invalidations are also broadcast to other workers through
+    LISTEN/NOTIFY on a dedicated connection outside the pool; without it,
+    other workers see the change once their entry expires. A TTL of zero
+    disables the cache.
+
+    Invalidations advance a generation counter. A principal looked up before
+    an invalidation of the same user is not cached when the lookup finishes,
+    so a slow lookup cannot put back what the invalidation dropped.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        notify_channel: Optional[str] = None
+    ):
+        """Initialize the principal cache."""
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.PRINCIPAL_CACHE_TTL_SECONDS
+        self.max_entries = max_entries or settings.PRINCIPAL_CACHE_MAX_ENTRIES
+        self.notify_channel = notify_channel if notify_channel is not None else settings.PRINCIPAL_CACHE_NOTIFY_CHANNEL
+        self._entries: "OrderedDict[int, Tuple[Principal, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        # Generation of each user's latest invalidation, oldest first; lookups from before
+        # ``_forgotten_generation`` may concern an invalidation that was evicted
+        self._invalidated: "OrderedDict[int, int]" = OrderedDict()
+        self._forgotten_generation = 0
+        self._engine: Optional[AsyncEngine] = None
+        self._listener: Any = None
+        self._reconnect_task: Optional[asyncio.Task] = None
+        self.hits = metrics.counter("principal_cache_hits", "Authenticated requests resolved from the principal cache")
+        self.misses = metrics.counter("principal_cache_misses", "Authenticated requests that looked up the user")
+        self.invalidations = metrics.counter("principal_cache_invalidations", "Principals dropped after a user change")
+        metrics.gauge("principal_cache_entries", "Number of cached principals", lambda: len(self._entries))
+        metrics.gauge("principal_cache_hit_ratio", "Share of authenticated requests served from the cache",
+                      self.hit_ratio)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def hit_ratio(self) -> float:
+        total = self.hits.value + self.misses.value
+        return self.hits.value / total if total else 0.0
+
+    def get(self, user_id: int) -> Optional[Principal]:
+        """Get a cached principal that has not expired."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses.inc()
+                return None
+            self._entries.move_to_end(user_id)
+        self.hits.inc()
+        return entry[0]
+
+    def generation(self) -> int:
+        """Current invalidation generation; take it before looking a user up and pass it to ``put``."""
+        return self._generation
+
+    def put(self, principal: Principal, generation: Optional[int] = None) -> None:
+        """Cache a principal, unless the user was invalidated after ``generation`` was taken."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation is not None and (
+                generation < self._forgotten_generation or self._invalidated.get(principal.id, -1) > generation
+            ):
+                return
+            self._entries[principal.id] = (principal, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(principal.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        """Drop a user's principal from this worker's cache."""
+        with self._lock:
+            self._generation += 1
+            self._invalidated.pop(user_id, None)
+            self._invalidated[user_id] = self._generation
+            while len(self._invalidated) > self.max_entries:
+                _, generation = self._invalidated.popitem(last=False)
+                self._forgotten_generation = max(self._forgotten_generation, generation)
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations.inc()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._invalidated.clear()
+            self._forgotten_generation = self._generation
+            self._entries.clear()
+
+    def _notifies(self, session: AsyncSession) -> bool:
+        return bool(self.notify_channel) and session.bind.dialect.name == "postgresql"
+
+    async def publish_invalidation(self, session: AsyncSession, user_id: int) -> None:
+        """Tell other workers to drop a user's principal once the session's transaction commits.
+
+        Call before committing a change to the user; NOTIFY is only delivered
+        on commit, so a rolled-back change invalidates nothing.
+        """
+        if self._notifies(session):
+            await session.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": self.notify_channel, "payload": str(user_id)}
+            )
+
+    def _on_notification(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        try:
+            self.invalidate(int(payload))
+        except ValueError:
+            logger.warning(f"Ignoring invalid principal invalidation on {channel}: {payload!r}")
+
+    async def _connect_listener(self) -> None:
+        import asyncpg
+
+        url = self._engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        connection = await asyncpg.connect(url)
+        try:
+            await connection.add_listener(self.notify_channel, self._on_notification)
+        except Exception:
+            await connection.close()
+            raise
+        connection.add_termination_listener(self._on_listener_terminated)
+        self._listener = connection
+
+    def _on_listener_terminated(self, connection: Any) -> None:
+        if connection is not self._listener:
+            return
+        self._listener = None
+        logger.warning(f"Principal invalidation listener on {self.notify_channel} lost its connection, reconnecting")
+        self._reconnect_task = asyncio.ensure_future(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        delay = 1.0
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await self._connect_listener()
+            except Exception as e:
+                logger.warning(f"Principal invalidation listener reconnect failed, retrying in {delay:.0f}s: {str(e)}")
+                delay = min(delay * 2, LISTENER_RETRY_MAX_SECONDS)
+                continue
+            # Invalidations sent while disconnected were missed
+            self.clear()
+            logger.info(f"Principal invalidation listener reconnected to {self.notify_channel}")
+            return
+
+    async def start_listener(self, engine: AsyncEngine) -> None:
+        """Listen for invalidations from other workers, if a channel is configured on PostgreSQL.
+
+        The listener holds its own connection rather than one from the
+        engine's pool, and reconnects if that connection is lost.
+        """
+        if not self.notify_channel or engine.dialect.driver != "asyncpg" or self._engine is not None:
+            return
+        self._engine = engine
+        try:
+            await self._connect_listener()
+        except Exception as e:
+            self._engine = None
+            logger.warning(f"Principal cache invalidation listener unavailable, relying on TTL: {str(e)}")
+            return
+        logger.info(f"Listening for principal invalidations on {self.notify_channel}")
+
+    async def stop_listener(self) -> None:
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.remove_termination_listener(self._on_listener_terminated)
+            await listener.close()
+        self._engine = None
+
+principal_cache = PrincipalCache()
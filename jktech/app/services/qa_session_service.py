@@ -1,8 +1,12 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.models.qa_session import QASession, Question
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import selectinload
+from app.db.pagination import paginate
+from app.models.qa_session import QASession, Question, qa_session_document
 from app.models.document import Document
+from app.services.vector_index import vector_index_registry
+from app.services.answer_cache import answer_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,11 +25,9 @@ class QASessionService:
     ) -> Optional[QASession]:
         """Create a new QA session with selected documents."""
         # Verify that all documents exist and belong to the user
-        for doc_id in document_ids:
-            document = await session.get(Document, doc_id)
-            if not document or document.user_id != user_id:
-                logger.warning(f"Document {doc_id} not found or doesn't belong to user {user_id}")
-                return None
+        if not await self._documents_exist(session, document_ids, user_id):
+            logger.warning(f"Some of documents {document_ids} not found or don't belong to user {user_id}")
+            return None
 
         # Create the QA session
         qa_session = QASession(
@@ -36,22 +38,91 @@ class QASessionService:
         await session.flush()  # Flush to get the QA session ID
 
         # Add documents to the QA session
-        for doc_id in document_ids:
-            document = await session.get(Document, doc_id)
-            qa_session.documents.append(document)
+        await self._set_documents(session, qa_session.id, document_ids, replace=False)
 
         await session.commit()
-        return qa_session
+        return await self.get_qa_session(session, qa_session.id, include_details=True)
 
-    async def get_qa_session(self, session: AsyncSession, qa_session_id: int) -> Optional[QASession]:
-        """Get a QA session by ID."""
-        return await session.get(QASession, qa_session_id)
+    async def _documents_exist(
+        self,
+        session: AsyncSession,
+        document_ids: List[int],
+        user_id: Optional[int] = None
+    ) -> bool:
+        """Check with a single query that all documents exist, optionally for one owner."""
+        unique_ids = set(document_ids)
+        if not unique_ids:
+            return True
+
+        stmt = select(Document.id).where(Document.id.in_(unique_ids))
+        if user_id is not None:
+            stmt = stmt.where(Document.user_id == user_id)
+        result = await session.execute(stmt)
+        return set(result.scalars().all()) == unique_ids
 
-    async def get_qa_sessions(self, session: AsyncSession, user_id: int) -> List[QASession]:
-        """Get all QA sessions for a user."""
-        stmt = select(QASession).where(QASession.user_id == user_id)
+    async def _set_documents(
+        self,
+        session: AsyncSession,
+        qa_session_id: int,
+        document_ids: List[int],
+        replace: bool = True
+    ) -> None:
+        """Set the documents of a QA session with bulk statements on the association table."""
+        if replace:
+            await session.execute(
+                delete(qa_session_document).where(qa_session_document.c.qa_session_id == qa_session_id)
+            )
+        unique_ids = list(dict.fromkeys(document_ids))
+        if unique_ids:
+            await session.execute(
+                insert(qa_session_document),
+                [{"qa_session_id": qa_session_id, "document_id": doc_id} for doc_id in unique_ids]
+            )
+
+    def _detail_options(self) -> List[Any]:
+        # Only document IDs are needed, so skip loading document content
+        return [
+            selectinload(QASession.documents).load_only(Document.id),
+            selectinload(QASession.questions)
+        ]
+
+    async def get_qa_session(
+        self,
+        session: AsyncSession,
+        qa_session_id: int,
+        include_details: bool = False
+    ) -> Optional[QASession]:
+        """Get a QA session by ID.
+
+        With ``include_details`` its document IDs and questions are loaded
+        eagerly, with one extra query each.
+        """
+        if not include_details:
+            return await session.get(QASession, qa_session_id)
+
+        stmt = (
+            select(QASession)
+            .where(QASession.id == qa_session_id)
+            .options(*self._detail_options())
+            .execution_options(populate_existing=True)
+        )
         result = await session.execute(stmt)
-        return result.scalars().all()
+        return result.scalars().first()
+
+    async def get_qa_sessions(
+        self,
+        session: AsyncSession,
+        user_id: int,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Tuple[List[QASession], Optional[str]]:
+        """Get a page of a user's QA sessions with their document IDs and questions, and the next page's cursor."""
+        stmt = (
+            select(QASession)
+            .where(QASession.user_id == user_id)
+            .options(*self._detail_options())
+        )
+        return await paginate(session, stmt, QASession, cursor, limit)
 
     async def update_qa_session(
         self,
@@ -72,22 +143,17 @@ class QASessionService:
         # Update documents if provided
         if document_ids is not None:
             # Verify that all documents exist
-            for doc_id in document_ids:
-                document = await session.get(Document, doc_id)
-                if not document:
-                    logger.warning(f"Document {doc_id} not found")
-                    return None
-
-            # Clear existing documents
-            qa_session.documents = []
+            if not await self._documents_exist(session, document_ids):
+                logger.warning(f"Some of documents {document_ids} not found")
+                return None
 
-            # Add new documents
-            for doc_id in document_ids:
-                document = await session.get(Document, doc_id)
-                qa_session.documents.append(document)
+            await self._set_documents(session, qa_session_id, document_ids)
 
         await session.commit()
-        return qa_session
+        if document_ids is not None:
+            vector_index_registry.invalidate_session(qa_session_id)
+            answer_cache.invalidate_session(qa_session_id)
+        return await self.get_qa_session(session, qa_session_id, include_details=True)
 
     async def delete_qa_session(self, session: AsyncSession, qa_session_id: int) -> bool:
         """Delete a QA session."""
@@ -97,6 +163,8 @@ class QASessionService:
 
         await session.delete(qa_session)  # This will cascade delete questions
         await session.commit()
+        vector_index_registry.invalidate_session(qa_session_id)
+        answer_cache.invalidate_session(qa_session_id)
         return True
 
     async def get_questions(self, session: AsyncSession, qa_session_id: int) -> List[Question]:
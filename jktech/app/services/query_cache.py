@@ -0,0 +1,152 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+from app.core.metrics import metrics
+import json
+import logging
+import os
+import threading
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# Approximate per-entry bookkeeping cost (dict slot, key tuple, bytes headers)
+ENTRY_OVERHEAD_BYTES = 200
+
+def normalize_query(text: str) -> str:
+    """Normalize a query so trivially different spellings share a cache entry."""
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+class QueryEmbeddingCache:
+    """LRU cache of query embeddings bounded by a memory budget.
+
+    Vectors are stored as compact float32 bytes keyed by model name and
+    normalized query text.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, path: Optional[str] = None):
+        self.max_bytes = max_bytes if max_bytes is not None else settings.QUERY_CACHE_MAX_BYTES
+        self.path = path if path is not None else settings.QUERY_CACHE_PATH
+        self._entries: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = metrics.counter("query_cache_hits", "Query embeddings served from the cache")
+        self.misses = metrics.counter("query_cache_misses", "Query embeddings not found in the cache")
+        self.evictions = metrics.counter("query_cache_evictions", "Query embeddings evicted from the cache")
+        metrics.gauge("query_cache_bytes", "Approximate memory used by the query cache", lambda: self._bytes)
+        metrics.gauge("query_cache_entries", "Number of cached query embeddings", lambda: len(self._entries))
+
+    @staticmethod
+    def _entry_size(key: Tuple[str, str], value: bytes) -> int:
+        return len(value) + len(key[0]) + len(key[1].encode("utf-8")) + ENTRY_OVERHEAD_BYTES
+
+    def get(self, model_name: str, text: str) -> Optional[np.ndarray]:
+        """Get a cached query embedding."""
+        key = (model_name, normalize_query(text))
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses.inc()
+                return None
+            self._entries.move_to_end(key)
+        self.hits.inc()
+        return np.frombuffer(value, dtype=np.float32)
+
+    def put(self, model_name: str, text: str, vector: Any) -> None:
+        """Cache a query embedding, evicting least recently used entries."""
+        key = (model_name, normalize_query(text))
+        value = np.asarray(vector, dtype=np.float32).tobytes()
+        size = self._entry_size(key, value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= self._entry_size(key, previous)
+            self._entries[key] = value
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                evicted_key, evicted = self._entries.popitem(last=False)
+                self._bytes -= self._entry_size(evicted_key, evicted)
+                self.evictions.inc()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def save(self) -> None:
+        """Persist the cache to disk if a cache path is configured."""
+        if not self.path:
+            return
+        with self._lock:
+            entries = list(self._entries.items())
+        # Keys as JSON and vectors as one flat float32 array, so loading never unpickles
+        keys = json.dumps([list(key) for key, _ in entries]).encode("utf-8")
+        vectors = [np.frombuffer(value, dtype=np.float32) for _, value in entries]
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                keys=np.frombuffer(keys, dtype=np.uint8),
+                lengths=np.array([len(vector) for vector in vectors], dtype=np.int64),
+                vectors=np.concatenate(vectors) if vectors else np.empty(0, dtype=np.float32),
+            )
+        os.replace(tmp_path, self.path)
+        logger.info(f"Saved {len(entries)} query embeddings to {self.path}")
+
+    def load(self) -> None:
+        """Load a previously persisted cache from disk if one exists."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                keys = json.loads(data["keys"].tobytes().decode("utf-8"))
+                lengths = data["lengths"]
+                vectors = data["vectors"].astype(np.float32, copy=False)
+            if len(keys) != len(lengths) or int(lengths.sum()) != len(vectors):
+                raise ValueError("keys and vectors do not match")
+            offsets = np.concatenate(([0], np.cumsum(lengths)))
+            entries = [
+                ((str(model_name), str(text)), vectors[start:end].tobytes())
+                for (model_name, text), start, end in zip(keys, offsets[:-1], offsets[1:])
+            ]
+        except (OSError, KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Could not load query cache from {self.path}: {str(e)}")
+            return
+
+        with self._lock:
+            # Entries were saved least recently used first; keep the most recent ones that fit
+            kept = []
+            for key, value in reversed(entries):
+                if key in self._entries:
+                    continue
+                size = self._entry_size(key, value)
+                if self._bytes + size > self.max_bytes:
+                    break
+                kept.append((key, value))
+                self._bytes += size
+            # Loaded entries are older than any cached since start, so they go at the LRU end
+            for key, value in kept:
+                self._entries[key] = value
+                self._entries.move_to_end(key, last=False)
+        logger.info(f"Loaded {len(self._entries)} query embeddings from {self.path}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits.value + self.misses.value
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits.value,
+            "misses": self.misses.value,
+            "evictions": self.evictions.value,
+            "hit_rate": self.hits.value / lookups if lookups else 0.0,
+        }
+
+query_embedding_cache = QueryEmbeddingCache()
@@ -1,40 +1,42 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
 from app.services.embedding_service import EmbeddingService
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, type_coerce, LargeBinary
 from app.models.document import Document, DocumentChunk
-from app.models.qa_session import QASession, Question
+from app.db.types import vectors_to_matrix
+from app.models.qa_session import QASession, Question, qa_session_document
+from app.services.vector_index import DocumentSetIndex, vector_index_registry
+from app.services.lexical_index import lexical_index, reciprocal_rank_fusion
+from app.services.answer_cache import answer_cache, document_set_version
+from app.services.generation_service import GenerationService, PromptTemplate, generation_service
+from app.core.config import settings
 import logging
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
-from langchain.llms import FakeListLLM
-import json
 
 logger = logging.getLogger(__name__)
 
-class RAGService:
-    def __init__(self):
-        """Initialize the RAG service."""
-        self.embedding_service = EmbeddingService()
-        logger.info("RAG service initialized")
+NO_ANSWER = "I couldn't find any relevant information to answer your question."
 
-        # Since we're using a mock LLM, we'll define some templates for responses
-        self.qa_template = """
-        Answer the question based on the following context:
+QA_PROMPT = PromptTemplate("""
+    Answer the question based on the following context:
 
-        Context:
-        {context}
+    Context:
+    {context}
 
-        Question: {question}
+    Question: {question}
 
-        Answer:
-        """
+    Answer:
+""")
 
-        # Initialize a fake LLM for demonstration purposes
-        # In a real application, you would use a real LLM like OpenAI's GPT or a local model
-        self.llm = FakeListLLM(
-            responses=["I'll generate an answer based on the retrieved documents."]
-        )
+class RAGService:
+    def __init__(
+        self,
+        embedding_service: Optional[EmbeddingService] = None,
+        generation: Optional[GenerationService] = None
+    ):
+        """Initialize the RAG service."""
+        self.embedding_service = embedding_service or EmbeddingService()
+        self.generation = generation or generation_service
+        logger.info("RAG service initialized")
 
     async def get_qa_session_documents(self, session: AsyncSession, qa_session_id: int) -> List[Document]:
         """Get all documents associated with a QA session."""
@@ -44,124 +46,289 @@ class RAGService:
 
         return qa_session.documents
 
+    async def get_qa_session_document_versions(self, session: AsyncSession, qa_session_id: int) -> Dict[int, Any]:
+        """Get the IDs of the documents in a QA session mapped to their last update time."""
+        stmt = (
+            select(Document.id, Document.updated_at)
+            .join(qa_session_document, qa_session_document.c.document_id == Document.id)
+            .where(qa_session_document.c.qa_session_id == qa_session_id)
+        )
+        result = await session.execute(stmt)
+        return {document_id: updated_at for document_id, updated_at in result.all()}
+
+    async def load_session_index(
+        self,
+        session: AsyncSession,
+        qa_session_id: int,
+        versions: Optional[Dict[int, Any]] = None
+    ) -> Optional[DocumentSetIndex]:
+        """Get the vector index of a QA session, loading only documents that changed."""
+        if versions is None:
+            versions = await self.get_qa_session_document_versions(session, qa_session_id)
+        if not versions:
+            return None
+
+        index = vector_index_registry.get(qa_session_id)
+        stale_document_ids = index.stale_documents(versions)
+        if stale_document_ids:
+            # Fetch the raw vector bytes and decode each document's chunks as one matrix
+            stmt = (
+                select(
+                    DocumentChunk.id,
+                    DocumentChunk.document_id,
+                    type_coerce(DocumentChunk.embedding, LargeBinary)
+                )
+                .where(DocumentChunk.document_id.in_(stale_document_ids))
+                .where(DocumentChunk.embedding.isnot(None))
+            )
+            result = await session.execute(stmt)
+
+            chunk_ids: Dict[int, List[int]] = {document_id: [] for document_id in stale_document_ids}
+            blobs: Dict[int, List[bytes]] = {document_id: [] for document_id in stale_document_ids}
+            for chunk_id, document_id, blob in result.all():
+                chunk_ids[document_id].append(chunk_id)
+                blobs[document_id].append(blob)
+
+            dimension = self.embedding_service.embedding_dimension
+            for document_id in stale_document_ids:
+                vectors = vectors_to_matrix(blobs[document_id], dimension)
+                index.add_document(document_id, versions[document_id], chunk_ids[document_id], vectors)
+            logger.info(f"Loaded {len(stale_document_ids)} documents into index for QA session {qa_session_id}")
+
+        return index
+
     async def retrieve_relevant_chunks(
         self,
         session: AsyncSession,
         question: str,
         qa_session_id: int,
-        top_k: int = 5
+        top_k: int = 5,
+        query_embedding: Optional[Any] = None,
+        versions: Optional[Dict[int, Any]] = None
     ) -> List[Dict[str, Any]]:
-        """Retrieve the most relevant document chunks for a question."""
-        # Get documents from the QA session
-        documents = await self.get_qa_session_documents(session, qa_session_id)
-        if not documents:
-            logger.warning(f"No documents found for QA session {qa_session_id}")
-            return []
+        """Retrieve the most relevant document chunks for a question.
 
-        # Get all chunks from these documents
-        document_ids = [doc.id for doc in documents]
-        stmt = select(DocumentChunk).where(DocumentChunk.document_id.in_(document_ids))
-        result = await session.execute(stmt)
-        chunks = result.scalars().all()
+        Scoring only uses chunk IDs and embeddings held in the session's vector
+        index; chunk text, metadata and document titles are then fetched for
+        the top-k chunks in a single query.
 
-        if not chunks:
-            logger.warning(f"No chunks found for documents {document_ids}")
+        In hybrid mode the BM25 candidates from the lexical index and an ANN
+        sample from the vector index are scored against the query embedding,
+        and the dense and lexical rankings are combined by reciprocal-rank
+        fusion, so exact identifiers are found even when embeddings miss them.
+        """
+        index = await self.load_session_index(session, qa_session_id, versions)
+        if index is None:
+            logger.warning(f"No documents found for QA session {qa_session_id}")
             return []
 
-        # Extract embeddings and content
-        chunk_embeddings = [chunk.embedding for chunk in chunks if chunk.embedding]
-
-        if not chunk_embeddings:
-            logger.warning("No embeddings found in chunks")
+        if not len(index):
+            logger.warning(f"No embedded chunks found for QA session {qa_session_id}")
             return []
 
         # Perform similarity search
-        search_results = self.embedding_service.similarity_search(question, chunk_embeddings, top_k)
+        if query_embedding is None:
+            query_embedding = await self.embedding_service.embed_query_batched(question)
+        if settings.RETRIEVAL_MODE == "hybrid":
+            search_results = await self.hybrid_search(session, index, question, query_embedding, top_k)
+        else:
+            search_results = [(chunk_id, score, None) for chunk_id, score in index.search(query_embedding, top_k)]
+
+        # Fetch text, metadata and document title for the top-k chunks only
+        stmt = (
+            select(
+                DocumentChunk.id,
+                DocumentChunk.document_id,
+                DocumentChunk.content,
+                DocumentChunk.chunk_metadata,
+                Document.title
+            )
+            .join(Document, Document.id == DocumentChunk.document_id)
+            .where(DocumentChunk.id.in_([chunk_id for chunk_id, _, _ in search_results]))
+        )
+        result = await session.execute(stmt)
+        rows = {row.id: row for row in result.all()}
 
         # Map results back to chunks
         relevant_chunks = []
-        for result in search_results:
-            chunk_idx = result["index"]
-            if chunk_idx < len(chunks):
-                chunk = chunks[chunk_idx]
+        for rank, (chunk_id, score, fusion_score) in enumerate(search_results, start=1):
+            row = rows.get(chunk_id)
+            if row is not None:
                 relevant_chunks.append({
-                    "chunk_id": chunk.id,
-                    "document_id": chunk.document_id,
-                    "content": chunk.content,
-                    "score": result["score"],
-                    "metadata": chunk.metadata
+                    "chunk_id": row.id,
+                    "document_id": row.document_id,
+                    "document_title": row.title,
+                    "content": row.content,
+                    "score": score,
+                    "fusion_score": fusion_score,
+                    "rank": rank,
+                    "metadata": row.chunk_metadata
                 })
 
         return relevant_chunks
 
-    async def answer_question(
+    async def hybrid_search(
         self,
         session: AsyncSession,
+        index: DocumentSetIndex,
         question: str,
-        qa_session_id: int
-    ) -> Dict[str, Any]:
-        """Answer a question using RAG."""
-        # Retrieve relevant chunks
-        relevant_chunks = await self.retrieve_relevant_chunks(session, question, qa_session_id)
+        query_embedding: Any,
+        top_k: int
+    ) -> List[Tuple[int, Optional[float], float]]:
+        """Fuse lexical and dense rankings of the chunks in a session index.
 
-        if not relevant_chunks:
-            return {
-                "question": question,
-                "answer": "I couldn't find any relevant information to answer your question.",
-                "sources": []
-            }
+        Returns (chunk_id, cosine similarity, fusion score) triples in fused
+        order, so callers can keep reporting the cosine similarity.
+        """
+        lexical = await lexical_index.search(
+            session, index.document_ids, question, settings.RETRIEVAL_LEXICAL_CANDIDATES
+        )
+        dense = index.search(query_embedding, max(top_k, settings.RETRIEVAL_DENSE_CANDIDATES))
 
-        # Prepare context from relevant chunks
-        context = "\n\n".join([f"Document {chunk['document_id']}, Chunk {chunk['chunk_id']}: {chunk['content']}"
-                              for chunk in relevant_chunks])
+        # Dense scores for lexical candidates the ANN sample did not reach
+        sampled = {chunk_id for chunk_id, _ in dense}
+        dense.extend(index.score(query_embedding, [chunk_id for chunk_id, _ in lexical if chunk_id not in sampled]))
+        dense.sort(key=lambda item: item[1], reverse=True)
 
-        # In a real application, you would use a real LLM here
-        # For this example, we'll use a simple template-based approach
-        prompt = PromptTemplate(
-            template=self.qa_template,
-            input_variables=["context", "question"]
-        )
+        similarities = dict(dense)
+        fused = reciprocal_rank_fusion([dense, lexical], settings.RETRIEVAL_RRF_K)[:top_k]
+        return [(chunk_id, similarities.get(chunk_id), fusion_score) for chunk_id, fusion_score in fused]
 
-        chain = LLMChain(llm=self.llm, prompt=prompt)
+    def build_context(self, relevant_chunks: List[Dict[str, Any]]) -> str:
+        return "\n\n".join([f"Document {chunk['document_id']}, Chunk {chunk['chunk_id']}: {chunk['content']}"
+                            for chunk in relevant_chunks])
+
+    def build_sources(self, relevant_chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Prepare the sources of an answer for the response."""
+        return [
+            {
+                "document_id": chunk["document_id"],
+                "document_title": chunk["document_title"],
+                "chunk_id": chunk["chunk_id"],
+                "score": chunk["score"],
+                "fusion_score": chunk["fusion_score"],
+                "rank": chunk["rank"],
+                "content_preview": chunk["content"][:200] + "..." if len(chunk["content"]) > 200 else chunk["content"]
+            }
+            for chunk in relevant_chunks
+        ]
 
-        # Generate answer (in a real app, this would call the LLM)
-        # For demo purposes, we'll create a mock answer
-        answer = f"Based on the retrieved documents, I can provide the following answer: "
-        answer += f"This is a simulated answer that would be generated by an LLM based on the {len(relevant_chunks)} most relevant chunks."
+    async def generate_answer_stream(self, question: str, relevant_chunks: List[Dict[str, Any]]) -> AsyncIterator[str]:
+        """Generate an answer from the retrieved chunks, yielding it piece by piece."""
+        prompt = QA_PROMPT.format(context=self.build_context(relevant_chunks), question=question)
+        async for token in self.generation.stream(prompt):
+            yield token
 
-        # Store the question and answer
+    async def _store_question(
+        self,
+        session: AsyncSession,
+        qa_session_id: int,
+        question: str,
+        answer: str,
+        retrieval_metadata: Dict[str, Any]
+    ) -> Question:
         new_question = Question(
             qa_session_id=qa_session_id,
             question_text=question,
             answer_text=answer,
-            retrieval_metadata={
-                "chunks": [
-                    {
-                        "chunk_id": chunk["chunk_id"],
-                        "document_id": chunk["document_id"],
-                        "score": chunk["score"]
-                    } for chunk in relevant_chunks
-                ]
-            }
+            retrieval_metadata=retrieval_metadata
         )
         session.add(new_question)
         await session.commit()
+        return new_question
 
-        # Prepare sources for the response
-        sources = []
-        for chunk in relevant_chunks:
-            # Get the document title
-            document = await session.get(Document, chunk["document_id"])
-            sources.append({
-                "document_id": chunk["document_id"],
-                "document_title": document.title if document else "Unknown",
+    async def stream_answer(
+        self,
+        session: AsyncSession,
+        question: str,
+        qa_session_id: int,
+        read_session: Optional[AsyncSession] = None
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Answer a question using RAG as a stream of (event, data) pairs.
+
+        Emits a ``sources`` event as soon as retrieval has finished (or the
+        answer was found in the answer cache), ``token`` events while the
+        answer is generated, and a final ``done`` event once the question has
+        been stored. Retrieval reads go through ``read_session`` when given,
+        so they can be served by a read replica; the question is always
+        stored through ``session``.
+        """
+        read_session = read_session or session
+        versions = await self.get_qa_session_document_versions(read_session, qa_session_id)
+        query_embedding = await self.embedding_service.embed_query_batched(question)
+
+        version = document_set_version(versions)
+        if settings.ANSWER_CACHE_ENABLED:
+            cached = answer_cache.get(qa_session_id, version, query_embedding)
+            if cached is not None:
+                response, similarity = cached
+                metadata = {"cache_hit": True, "cached_question": response["question"], "similarity": similarity}
+                yield "sources", {"sources": response["sources"], "metadata": metadata}
+                yield "token", {"text": response["answer"]}
+                new_question = await self._store_question(session, qa_session_id, question, response["answer"], {
+                    "chunks": response["chunks"],
+                    **metadata
+                })
+                yield "done", {"question_id": new_question.id, "answer": response["answer"]}
+                return
+
+        # Retrieve relevant chunks
+        relevant_chunks = await self.retrieve_relevant_chunks(
+            read_session, question, qa_session_id, query_embedding=query_embedding, versions=versions
+        )
+        sources = self.build_sources(relevant_chunks)
+        yield "sources", {"sources": sources, "metadata": {"cache_hit": False}}
+
+        if not relevant_chunks:
+            yield "token", {"text": NO_ANSWER}
+            yield "done", {"question_id": None, "answer": NO_ANSWER}
+            return
+
+        parts = []
+        async for token in self.generate_answer_stream(question, relevant_chunks):
+            parts.append(token)
+            yield "token", {"text": token}
+        answer = "".join(parts)
+
+        # Store the question and answer
+        retrieved = [
+            {
                 "chunk_id": chunk["chunk_id"],
+                "document_id": chunk["document_id"],
                 "score": chunk["score"],
-                "content_preview": chunk["content"][:200] + "..." if len(chunk["content"]) > 200 else chunk["content"]
+                "fusion_score": chunk["fusion_score"],
+                "rank": chunk["rank"]
+            } for chunk in relevant_chunks
+        ]
+        new_question = await self._store_question(session, qa_session_id, question, answer, {"chunks": retrieved})
+
+        if settings.ANSWER_CACHE_ENABLED:
+            answer_cache.put(qa_session_id, version, list(versions), query_embedding, {
+                "question": question,
+                "answer": answer,
+                "sources": sources,
+                "chunks": retrieved
             })
 
-        return {
-            "question": question,
-            "answer": answer,
-            "sources": sources
-        }
+        yield "done", {"question_id": new_question.id, "answer": answer}
+
+    async def answer_question(
+        self,
+        session: AsyncSession,
+        question: str,
+        qa_session_id: int,
+        read_session: Optional[AsyncSession] = None
+    ) -> Dict[str, Any]:
+        """Answer a question using RAG.
+
+        Answers are served from the session's semantic answer cache when a
+        sufficiently similar question was answered against the same version of
+        the session's documents.
+        """
+        response: Dict[str, Any] = {"question": question}
+        async for event, data in self.stream_answer(session, question, qa_session_id, read_session):
+            if event == "sources":
+                response.update(data)
+            elif event == "done":
+                response["answer"] = data["answer"]
+        return response
@@ -1,8 +1,10 @@
-from typing import Optional, List
+from typing import AsyncIterator, Optional, List, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from app.db.pagination import paginate, stream_rows
 from app.models.user import User
-from app.core.security import get_password_hash, verify_password
+from app.services.password_service import password_service
+from app.services.principal_cache import principal_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,7 +19,7 @@ class UserService:
         is_superuser: bool = False
     ) -> User:
         """Create a new user."""
-        hashed_password = get_password_hash(password)
+        hashed_password = await password_service.hash(password)
         user = User(
             username=username,
             email=email,
@@ -45,12 +47,16 @@ class UserService:
         return result.scalars().first()
 
     async def authenticate_user(self, session: AsyncSession, username: str, password: str) -> Optional[User]:
-        """Authenticate a user."""
+        """Authenticate a user, upgrading their password hash if the bcrypt cost has changed."""
         user = await self.get_user_by_username(session, username)
         if not user:
             return None
-        if not verify_password(password, user.hashed_password):
+        valid, new_hash = await password_service.verify_and_update(password, user.hashed_password)
+        if not valid:
             return None
+        if new_hash is not None:
+            user.hashed_password = new_hash
+            await session.commit()
         return user
 
     async def update_user(
@@ -73,13 +79,15 @@ class UserService:
         if email is not None:
             user.email = email
         if password is not None:
-            user.hashed_password = get_password_hash(password)
+            user.hashed_password = await password_service.hash(password)
         if is_active is not None:
             user.is_active = is_active
         if is_superuser is not None:
             user.is_superuser = is_superuser
 
+        await principal_cache.publish_invalidation(session, user_id)
         await session.commit()
+        principal_cache.invalidate(user_id)
         return user
 
     async def delete_user(self, session: AsyncSession, user_id: int) -> bool:
@@ -89,11 +97,20 @@ class UserService:
             return False
 
         await session.delete(user)
+        await principal_cache.publish_invalidation(session, user_id)
         await session.commit()
+        principal_cache.invalidate(user_id)
         return True
 
-    async def get_users(self, session: AsyncSession, skip: int = 0, limit: int = 100) -> List[User]:
-        """Get all users with pagination."""
-        stmt = select(User).offset(skip).limit(limit)
-        result = await session.execute(stmt)
-        return result.scalars().all()
+    async def get_users(
+        self,
+        session: AsyncSession,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> Tuple[List[User], Optional[str]]:
+        """Get a page of users and the next page's cursor."""
+        return await paginate(session, select(User), User, cursor, limit)
+
+    def stream_users(self, session: AsyncSession) -> AsyncIterator[User]:
+        """Stream all users without loading them at once."""
+        return stream_rows(session, select(User), User)
@@ -0,0 +1,385 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import numpy as np
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+def normalize_vectors(vectors: Any) -> np.ndarray:
+    """L2-normalize a vector or a matrix of row vectors as float32."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[np.newaxis, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Scalar-quantize row vectors to int8 codes with one float32 scale per row."""
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.round(vectors / scales[:, np.newaxis]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+def top_k_scores(ids: np.ndarray, scores: np.ndarray, top_k: int) -> List[Tuple[int, float]]:
+    """Return the top_k (id, score) pairs ordered by descending score."""
+    if top_k <= 0 or len(scores) == 0:
+        return []
+    k = min(top_k, len(scores))
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    ordered = candidates[np.argsort(-scores[candidates])]
+    return [(int(ids[i]), float(scores[i])) for i in ordered]
+
+class VectorIndex(ABC):
+    """Interface for cosine-similarity indexes keyed by chunk ID."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of stored vectors."""
+
+    @abstractmethod
+    def add(self, ids: Sequence[int], vectors: Any) -> None:
+        """Add or replace vectors for the given IDs."""
+
+    @abstractmethod
+    def remove(self, ids: Iterable[int]) -> None:
+        """Remove the vectors stored for the given IDs."""
+
+    @abstractmethod
+    def search(self, query: Any, top_k: int) -> List[Tuple[int, float]]:
+        """Return the top_k (id, cosine similarity) pairs for a query vector."""
+
+    @abstractmethod
+    def score(self, query: Any, ids: Iterable[int]) -> List[Tuple[int, float]]:
+        """Return the (id, cosine similarity) pairs of the given stored IDs."""
+
+class ExactIndex(VectorIndex):
+    """Brute-force index that scores every stored vector.
+
+    With ``quantization="int8"`` the scan runs over int8 codes (a quarter of
+    the bytes of the float32 vectors) and only the best ``top_k *
+    rescore_factor`` candidates are rescored exactly against float32.
+    """
+
+    # Rows dequantized at a time during an int8 scan
+    SCAN_BLOCK_ROWS = 8192
+
+    def __init__(self, dimension: int, quantization: str = "none", rescore_factor: int = 4):
+        self.dimension = dimension
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        self._ids = np.empty(0, dtype=np.int64)
+        self._vectors = np.empty((0, dimension), dtype=np.float32)
+        self._codes = np.empty((0, dimension), dtype=np.int8)
+        self._scales = np.empty(0, dtype=np.float32)
+
+    @property
+    def is_quantized(self) -> bool:
+        return self.quantization == "int8"
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def items(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the stored IDs and their normalized vectors."""
+        return self._ids, self._vectors
+
+    def add(self, ids: Sequence[int], vectors: Any) -> None:
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(ids) == 0:
+            return
+        self.remove(ids)
+        vectors = normalize_vectors(vectors)
+        self._ids = np.concatenate([self._ids, ids])
+        self._vectors = np.vstack([self._vectors, vectors])
+        if self.is_quantized:
+            codes, scales = quantize_int8(vectors)
+            self._codes = np.vstack([self._codes, codes])
+            self._scales = np.concatenate([self._scales, scales])
+
+    def remove(self, ids: Iterable[int]) -> None:
+        ids = np.fromiter(ids, dtype=np.int64)
+        if len(ids) == 0 or len(self._ids) == 0:
+            return
+        keep = ~np.isin(self._ids, ids)
+        if not keep.all():
+            self._ids = self._ids[keep]
+            self._vectors = self._vectors[keep]
+            if self.is_quantized:
+                self._codes = self._codes[keep]
+                self._scales = self._scales[keep]
+
+    def search(self, query: Any, top_k: int) -> List[Tuple[int, float]]:
+        if len(self._ids) == 0:
+            return []
+        query_np = normalize_vectors(query)[0]
+        if not self.is_quantized:
+            return top_k_scores(self._ids, self._vectors @ query_np, top_k)
+
+        # Approximate scan over the int8 codes
+        approx = np.empty(len(self._ids), dtype=np.float32)
+        for start in range(0, len(self._ids), self.SCAN_BLOCK_ROWS):
+            end = start + self.SCAN_BLOCK_ROWS
+            approx[start:end] = (self._codes[start:end] @ query_np) * self._scales[start:end]
+
+        # Exact float32 rescoring of the best candidates
+        num_candidates = min(len(approx), top_k * self.rescore_factor)
+        candidates = np.argpartition(-approx, num_candidates - 1)[:num_candidates]
+        exact = self._vectors[candidates] @ query_np
+        return top_k_scores(self._ids[candidates], exact, top_k)
+
+    def score(self, query: Any, ids: Iterable[int]) -> List[Tuple[int, float]]:
+        ids = np.fromiter(ids, dtype=np.int64)
+        if len(ids) == 0 or len(self._ids) == 0:
+            return []
+        mask = np.isin(self._ids, ids)
+        scores = self._vectors[mask] @ normalize_vectors(query)[0]
+        return [(int(chunk_id), float(score)) for chunk_id, score in zip(self._ids[mask], scores)]
+
+class IVFIndex(VectorIndex):
+    """Inverted-file index over spherical k-means clusters.
+
+    Vectors are kept in a single exact list until the index holds at least
+    ``min_vectors`` of them; after that they are clustered into ``nlist``
+    inverted lists and a search only scans the ``nprobe`` lists whose
+    centroids are closest to the query. Raising ``nprobe`` trades latency
+    for recall; ``nprobe >= nlist`` is equivalent to an exact search.
+    """
+
+    # Re-cluster once the index has grown this much since the last training
+    RETRAIN_GROWTH_FACTOR = 4
+    # Number of training vectors sampled per list for k-means
+    TRAINING_SAMPLES_PER_LIST = 64
+
+    def __init__(
+        self,
+        dimension: int,
+        nlist: int = 0,
+        nprobe: int = 8,
+        min_vectors: int = 2000,
+        kmeans_iterations: int = 10,
+        quantization: str = "none",
+        rescore_factor: int = 4
+    ):
+        self.dimension = dimension
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_vectors = min_vectors
+        self.kmeans_iterations = kmeans_iterations
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        self._exact = self._new_list()
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[ExactIndex] = []
+        self._list_of: Dict[int, int] = {}
+        self._trained_size = 0
+
+    def __len__(self) -> int:
+        if self._centroids is None:
+            return len(self._exact)
+        return len(self._list_of)
+
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+
+    def _new_list(self) -> ExactIndex:
+        return ExactIndex(self.dimension, self.quantization, self.rescore_factor)
+
+    def add(self, ids: Sequence[int], vectors: Any) -> None:
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(ids) == 0:
+            return
+
+        if self._centroids is None:
+            self._exact.add(ids, vectors)
+            if len(self._exact) >= self.min_vectors:
+                self._train(*self._exact.items())
+            return
+
+        self.remove(ids)
+        self._assign(ids, normalize_vectors(vectors))
+        if len(self._list_of) > self.RETRAIN_GROWTH_FACTOR * self._trained_size:
+            self._train(*self._all_items())
+
+    def remove(self, ids: Iterable[int]) -> None:
+        if self._centroids is None:
+            self._exact.remove(ids)
+            return
+
+        by_list: Dict[int, List[int]] = {}
+        for chunk_id in ids:
+            list_no = self._list_of.pop(int(chunk_id), None)
+            if list_no is not None:
+                by_list.setdefault(list_no, []).append(int(chunk_id))
+        for list_no, list_ids in by_list.items():
+            self._lists[list_no].remove(list_ids)
+
+    def search(self, query: Any, top_k: int) -> List[Tuple[int, float]]:
+        if self._centroids is None:
+            return self._exact.search(query, top_k)
+
+        query_np = normalize_vectors(query)[0]
+        nprobe = max(1, min(self.nprobe, len(self._lists)))
+        centroid_scores = self._centroids @ query_np
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+
+        results: List[Tuple[int, float]] = []
+        for list_no in probe:
+            results.extend(self._lists[list_no].search(query_np, top_k))
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results[:top_k]
+
+    def score(self, query: Any, ids: Iterable[int]) -> List[Tuple[int, float]]:
+        if self._centroids is None:
+            return self._exact.score(query, ids)
+
+        by_list: Dict[int, List[int]] = {}
+        for chunk_id in ids:
+            list_no = self._list_of.get(int(chunk_id))
+            if list_no is not None:
+                by_list.setdefault(list_no, []).append(int(chunk_id))
+        results: List[Tuple[int, float]] = []
+        for list_no, list_ids in by_list.items():
+            results.extend(self._lists[list_no].score(query, list_ids))
+        return results
+
+    def _assign(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        """Append normalized vectors to the inverted list of their nearest centroid."""
+        assignments = np.argmax(vectors @ self._centroids.T, axis=1)
+        for list_no in np.unique(assignments):
+            mask = assignments == list_no
+            self._lists[list_no].add(ids[mask], vectors[mask])
+            for chunk_id in ids[mask]:
+                self._list_of[int(chunk_id)] = int(list_no)
+
+    def _all_items(self) -> Tuple[np.ndarray, np.ndarray]:
+        ids = np.concatenate([lst.items()[0] for lst in self._lists])
+        vectors = np.vstack([lst.items()[1] for lst in self._lists])
+        return ids, vectors
+
+    def _train(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        """Cluster the given vectors with spherical k-means and rebuild the lists."""
+        n = len(ids)
+        nlist = min(self.nlist or max(1, int(np.sqrt(n))), n)
+        rng = np.random.default_rng(0)
+
+        sample_size = min(n, nlist * self.TRAINING_SAMPLES_PER_LIST)
+        sample = vectors[rng.choice(n, size=sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, size=nlist, replace=False)].copy()
+
+        for _ in range(self.kmeans_iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            for list_no in range(nlist):
+                members = sample[assignments == list_no]
+                if len(members):
+                    centroids[list_no] = members.mean(axis=0)
+            centroids = normalize_vectors(centroids)
+
+        self._centroids = centroids
+        self._lists = [self._new_list() for _ in range(nlist)]
+        self._list_of = {}
+        self._exact = self._new_list()
+        self._trained_size = n
+        self._assign(ids, vectors)
+        logger.info(f"Trained IVF index with {nlist} lists over {n} vectors")
+
+def create_vector_index(dimension: Optional[int] = None) -> VectorIndex:
+    """Create a vector index according to the configured index type."""
+    dimension = dimension or settings.EMBEDDING_DIMENSION
+    if settings.VECTOR_INDEX_TYPE == "exact":
+        return ExactIndex(
+            dimension,
+            quantization=settings.VECTOR_INDEX_QUANTIZATION,
+            rescore_factor=settings.VECTOR_INDEX_RESCORE_FACTOR
+        )
+    return IVFIndex(
+        dimension,
+        nlist=settings.VECTOR_INDEX_NLIST,
+        nprobe=settings.VECTOR_INDEX_NPROBE,
+        min_vectors=settings.VECTOR_INDEX_EXACT_THRESHOLD,
+        quantization=settings.VECTOR_INDEX_QUANTIZATION,
+        rescore_factor=settings.VECTOR_INDEX_RESCORE_FACTOR
+    )
+
+class DocumentSetIndex:
+    """A vector index over the chunks of a set of documents.
+
+    Tracks which chunk IDs belong to which document and the document version
+    they were loaded at, so the index can be updated one document at a time.
+    """
+
+    def __init__(self, index: VectorIndex):
+        self.index = index
+        self._chunks: Dict[int, List[int]] = {}
+        self._versions: Dict[int, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def document_ids(self) -> List[int]:
+        return list(self._chunks)
+
+    def stale_documents(self, versions: Dict[int, Any]) -> Set[int]:
+        """Drop documents no longer in the set and return those that need (re)loading."""
+        for document_id in set(self._chunks) - set(versions):
+            self.remove_document(document_id)
+        return {
+            document_id for document_id, version in versions.items()
+            if document_id not in self._versions or self._versions[document_id] != version
+        }
+
+    def add_document(self, document_id: int, version: Any, chunk_ids: Sequence[int], vectors: Any) -> None:
+        """Replace the chunks indexed for a document."""
+        self.remove_document(document_id)
+        if len(chunk_ids):
+            self.index.add(chunk_ids, vectors)
+        self._chunks[document_id] = list(chunk_ids)
+        self._versions[document_id] = version
+
+    def remove_document(self, document_id: int) -> None:
+        """Remove every chunk of a document from the index."""
+        chunk_ids = self._chunks.pop(document_id, [])
+        self._versions.pop(document_id, None)
+        if chunk_ids:
+            self.index.remove(chunk_ids)
+
+    def search(self, query: Any, top_k: int) -> List[Tuple[int, float]]:
+        return self.index.search(query, top_k)
+
+    def score(self, query: Any, chunk_ids: Iterable[int]) -> List[Tuple[int, float]]:
+        return self.index.score(query, chunk_ids)
+
+class VectorIndexRegistry:
+    """Per-worker registry of document-set indexes keyed by QA session ID."""
+
+    def __init__(self, max_sessions: Optional[int] = None):
+        self.max_sessions = max_sessions or settings.VECTOR_INDEX_MAX_SESSIONS
+        self._indexes: "OrderedDict[int, DocumentSetIndex]" = OrderedDict()
+
+    def get(self, qa_session_id: int) -> DocumentSetIndex:
+        """Get the index for a QA session, creating an empty one if needed."""
+        index = self._indexes.get(qa_session_id)
+        if index is None:
+            index = DocumentSetIndex(create_vector_index())
+            self._indexes[qa_session_id] = index
+            while len(self._indexes) > self.max_sessions:
+                evicted_id, _ = self._indexes.popitem(last=False)
+                logger.info(f"Evicted vector index for QA session {evicted_id}")
+        else:
+            self._indexes.move_to_end(qa_session_id)
+        return index
+
+    def invalidate_session(self, qa_session_id: int) -> None:
+        """Drop the index of a QA session."""
+        self._indexes.pop(qa_session_id, None)
+
+    def invalidate_document(self, document_id: int) -> None:
+        """Remove a document's chunks from every index that contains it."""
+        for index in self._indexes.values():
+            index.remove_document(document_id)
+
+vector_index_registry = VectorIndexRegistry()
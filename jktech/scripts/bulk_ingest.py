@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Script to bulk load documents into the document RAG application.
+Reads a JSON array or NDJSON file of {"title", "content", "content_type"}
+objects and stores them with cross-document embedding batches.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path so we can import the app
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from pydantic import ValidationError
+
+from app.db.base import get_async_session
+from app.schemas.document import DocumentCreate
+from app.services.user_service import UserService
+from app.services.document_service import DocumentService
+
+def read_documents(stream):
+    """Yield validated documents from a JSON array or NDJSON stream.
+
+    Each record is checked against ``DocumentCreate``, as by the ``/bulk``
+    endpoint; a bad record raises ``ValueError`` naming its NDJSON line or
+    array index.
+    """
+    first = stream.read(1)
+    while first and first.isspace():
+        first = stream.read(1)
+
+    if first == "[":
+        records = json.loads(first + stream.read())
+        if not isinstance(records, list):
+            raise ValueError("Expected a JSON array of documents")
+        for index, record in enumerate(records):
+            yield _validate(record, f"at index {index}")
+    else:
+        for line_number, line in enumerate(_lines(first, stream), start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"Invalid document on line {line_number}: {str(e)}")
+            yield _validate(record, f"on line {line_number}")
+
+def _validate(record, position):
+    if isinstance(record, dict):
+        record.setdefault("content_type", "text/plain")
+    try:
+        return DocumentCreate.parse_obj(record).dict()
+    except ValidationError as e:
+        raise ValueError(f"Invalid document {position}: {str(e)}")
+
+def _lines(first, stream):
+    yield first + stream.readline()
+    yield from stream
+
+async def bulk_ingest(path: str, username: str, batch_chunks: int):
+    """Load documents from a file (or stdin with "-") for the given user."""
+    async for session in get_async_session():
+        try:
+            user = await UserService().get_user_by_username(session, username)
+            if not user:
+                print(f"User '{username}' does not exist.")
+                return
+
+            stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+            try:
+                result = await DocumentService().bulk_create_documents(
+                    session=session,
+                    user_id=user.id,
+                    documents=read_documents(stream),
+                    batch_chunks=batch_chunks
+                )
+            finally:
+                if stream is not sys.stdin:
+                    stream.close()
+
+            elapsed = result["elapsed_seconds"]
+            print(f"Ingested {result['documents']} documents ({result['chunks']} chunks) in {elapsed:.2f}s")
+            print(f"Throughput: {result['chunks'] / elapsed if elapsed else 0:.0f} chunks/s")
+            print(f"Embeddings reused: {result['embeddings_reused']}")
+
+        except Exception as e:
+            print(f"Error ingesting documents: {str(e)}")
+            raise
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", help="JSON array or NDJSON file of documents, or - for stdin")
+    parser.add_argument("--username", default="admin", help="Owner of the new documents")
+    parser.add_argument("--batch-chunks", type=int, default=None, help="Chunks per embedding batch and transaction")
+    args = parser.parse_args()
+    asyncio.run(bulk_ingest(args.path, args.username, args.batch_chunks))
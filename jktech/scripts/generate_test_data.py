@@ -244,29 +244,21 @@ async def generate_test_data():
 
             # Create documents for each user
             print("\nCreating documents...")
-            admin_documents = []
-            for i, doc_data in enumerate(SAMPLE_DOCUMENTS[:3]):
-                doc = await document_service.create_document(
-                    session=session,
-                    user_id=admin_user.id,
-                    title=doc_data["title"],
-                    content=doc_data["content"],
-                    content_type=doc_data["content_type"]
-                )
-                admin_documents.append(doc)
-                print(f"Created document for admin: {doc.title} (ID: {doc.id})")
-
-            user_documents = []
-            for i, doc_data in enumerate(SAMPLE_DOCUMENTS[3:]):
-                doc = await document_service.create_document(
-                    session=session,
-                    user_id=regular_user.id,
-                    title=doc_data["title"],
-                    content=doc_data["content"],
-                    content_type=doc_data["content_type"]
-                )
-                user_documents.append(doc)
-                print(f"Created document for user: {doc.title} (ID: {doc.id})")
+            admin_result = await document_service.bulk_create_documents(
+                session=session,
+                user_id=admin_user.id,
+                documents=SAMPLE_DOCUMENTS[:3]
+            )
+            admin_document_ids = admin_result["document_ids"]
+            print(f"Created {len(admin_document_ids)} documents for admin (IDs: {admin_document_ids})")
+
+            user_result = await document_service.bulk_create_documents(
+                session=session,
+                user_id=regular_user.id,
+                documents=SAMPLE_DOCUMENTS[3:]
+            )
+            user_document_ids = user_result["document_ids"]
+            print(f"Created {len(user_document_ids)} documents for user (IDs: {user_document_ids})")
 
             # Create QA sessions
             print("\nCreating QA sessions...")
@@ -274,7 +266,7 @@ async def generate_test_data():
                 session=session,
                 user_id=admin_user.id,
                 name="Programming Knowledge Base",
-                document_ids=[doc.id for doc in admin_documents]
+                document_ids=admin_document_ids
             )
             print(f"Created QA session for admin: {admin_qa_session.name} (ID: {admin_qa_session.id})")
 
@@ -282,7 +274,7 @@ async def generate_test_data():
                 session=session,
                 user_id=regular_user.id,
                 name="Database and Async Programming",
-                document_ids=[doc.id for doc in user_documents]
+                document_ids=user_document_ids
             )
             print(f"Created QA session for user: {user_qa_session.name} (ID: {user_qa_session.id})")
 
@@ -2,6 +2,10 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.security import create_password_context
+from app.services.password_service import password_service
+from app.services.user_service import UserService
+
 pytestmark = pytest.mark.asyncio
 
 async def test_login(client: TestClient, init_db, test_user: dict):
@@ -41,3 +45,46 @@ async def test_login_nonexistent_user(client: TestClient, init_db):
     )
     assert response.status_code == 401
     assert "Incorrect username or password" in response.json()["detail"]
+
+async def test_principal_is_cached_until_user_changes(
+    client: TestClient,
+    init_db,
+    test_user: dict,
+    async_session: AsyncSession,
+    statements: list
+):
+    """Test that authentication skips the user lookup until the user is updated."""
+    response = client.post(
+        "/api/auth/login",
+        data={"username": test_user["username"], "password": test_user["password"]}
+    )
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    assert client.get("/api/qa/sessions", headers=headers).status_code == 200
+
+    statements.clear()
+    assert client.get("/api/qa/sessions", headers=headers).status_code == 200
+    assert not any("FROM user" in statement for statement in statements)
+
+    await UserService().update_user(async_session, test_user["id"], is_active=False)
+    response = client.get("/api/qa/sessions", headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Inactive user"
+
+async def test_login_upgrades_password_hash(
+    client: TestClient,
+    init_db,
+    test_user: dict,
+    async_session: AsyncSession,
+    monkeypatch
+):
+    """Test that logging in rehashes the password when the bcrypt cost has changed."""
+    monkeypatch.setattr(password_service, "context", create_password_context(4))
+    response = client.post(
+        "/api/auth/login",
+        data={"username": test_user["username"], "password": test_user["password"]}
+    )
+    assert response.status_code == 200
+
+    user = await UserService().get_user_by_username(async_session, test_user["username"])
+    await async_session.refresh(user)
+    assert user.hashed_password.startswith("$2b$04$")
@@ -0,0 +1,39 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.services.model_registry import model_registry
+
+pytestmark = pytest.mark.asyncio
+
+def _auth_headers(client: TestClient, user: dict) -> dict:
+    response = client.post(
+        "/api/auth/login",
+        data={"username": user["username"], "password": user["password"]}
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def test_model_stats(
+    client: TestClient,
+    init_db,
+    test_user: dict,
+    test_superuser: dict,
+    fake_sentence_transformers,
+    monkeypatch
+):
+    """Test that the loaded models' stats are reported to superusers only."""
+    monkeypatch.setattr(model_registry, "_models", {})
+    monkeypatch.setattr(settings, "EMBEDDING_PRELOAD_MODELS", "")
+    model_registry.warm_up()
+
+    response = client.get("/api/diagnostics/models", headers=_auth_headers(client, test_superuser))
+
+    assert response.status_code == 200
+    payload = response.json()
+    assert payload["process_rss_bytes"] > 0
+    assert list(payload["models"]) == [settings.EMBEDDING_MODEL]
+    assert payload["models"][settings.EMBEDDING_MODEL]["parameter_bytes"] > 0
+    assert payload["models"][settings.EMBEDDING_MODEL]["warmup_seconds"] is not None
+
+    response = client.get("/api/diagnostics/models", headers=_auth_headers(client, test_user))
+    assert response.status_code == 403
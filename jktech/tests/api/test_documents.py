@@ -0,0 +1,282 @@
+import json
+import re
+import pytest
+from typing import List
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import get_embedding_service
+from app.core.config import settings
+from app.db.pagination import encode_cursor
+from app.main import app
+from app.models.document import Document, DocumentChunk, DocumentPart
+from app.services.embedding_service import EmbeddingService
+from app.services.ingestion_service import IngestionQueueFullError, ingestion_pipeline
+
+pytestmark = pytest.mark.asyncio
+
+def _auth_headers(client: TestClient, user: dict) -> dict:
+    response = client.post(
+        "/api/auth/login",
+        data={"username": user["username"], "password": user["password"]}
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture
+def fake_embeddings(embedding_service: EmbeddingService):
+    """Serve the API's embedding service from the fake model."""
+    app.dependency_overrides[get_embedding_service] = lambda: embedding_service
+    yield embedding_service
+    app.dependency_overrides.pop(get_embedding_service, None)
+
+def _bulk_documents(count: int) -> List[dict]:
+    return [
+        {"title": f"Bulk {i}", "content": " ".join(f"topic{i} word{j}" for j in range(40)), "content_type": "text/plain"}
+        for i in range(count)
+    ]
+
+async def _titles_by_id(session: AsyncSession) -> dict:
+    return dict((await session.execute(select(Document.id, Document.title))).all())
+
+async def _create_document(session: AsyncSession, user_id: int, chunks: int) -> Document:
+    document = Document(
+        user_id=user_id, title="Chunked", content="Full document content", content_type="text/plain",
+        chunks_total=chunks, chunks_processed=chunks
+    )
+    session.add(document)
+    await session.flush()
+    # Stored out of order so the endpoint has to sort by position
+    session.add_all([
+        DocumentChunk(document_id=document.id, chunk_index=index, content=f"Chunk {index}")
+        for index in reversed(range(chunks))
+    ])
+    await session.commit()
+    return document
+
+async def test_documents_are_summaries_unless_included(
+    client: TestClient,
+    init_db,
+    test_user: dict,
+    async_session: AsyncSession,
+    statements: List[str]
+):
+    """Test that documents leave out content and chunks unless requested with include."""
+    document = await _create_document(async_session, test_user["id"], chunks=3)
+    headers = _auth_headers(client, test_user)
+
+    statements.clear()
+    response = client.get("/api/documents/", headers=headers)
+    assert response.status_code == 200
+    [summary] = response.json()
+    assert summary["chunk_count"] == 3
+    assert "content" not in summary and "chunks" not in summary
+    assert not any(re.search(r"documentchunk|document\.content\b", statement) for statement in statements)
+
+    response = client.get("/api/documents/", params={"include": "content,chunks"}, headers=headers)
+    [full] = response.json()
+    assert full["content"] == "Full document content"
+    assert sorted(chunk["chunk_index"] for chunk in full["chunks"]) == [0, 1, 2]
+
+    response = client.get(f"/api/documents/{document.id}", params={"include": "content"}, headers=headers)
+    assert response.json()["content"] == "Full document content"
+    assert "chunks" not in response.json()
+
+    response = client.get("/api/documents/", params={"include": "embeddings"}, headers=headers)
+    assert response.status_code == 400
+
+async def test_document_chunks_are_paginated_in_order(
+    client: TestClient,
+    init_db,
+    test_user: dict,
+    test_superuser: dict,
+    async_session: AsyncSession
+):
+    """Test that a document's chunks are paged through in position order, for its owner only."""
+    document = await _create_document(async_session, test_superuser["id"], chunks=5)
+    url = f"/api/documents/{document.id}/chunks"
+    headers = _auth_headers(client, test_superuser)
+
+    indexes, params = [], {"limit": 2}
+    while True:
+        response = client.get(url, params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        indexes.append([chunk["chunk_index"] for chunk in response.json()])
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params = {"limit": 2, "cursor": response.headers["X-Next-Cursor"]}
+    assert indexes == [[0, 1], [2, 3], [4]]
+
+    for cursor in ("not-a-cursor", encode_cursor("1"), encode_cursor(True)):
+        response = client.get(url, params={"cursor": cursor}, headers=headers)
+        assert response.status_code == 400
+
+    response = client.get(url, headers=_auth_headers(client, test_user))
+    assert response.status_code == 403
+
+async def test_document_status(
+    client: TestClient,
+    init_db,
+    test_user: dict,
+    test_superuser: dict,
+    async_session: AsyncSession
+):
+    """Test that a document's ingestion progress is visible to its owner only."""
+    document = Document(
+        user_id=test_user["id"], title="Pending", content="Content", content_type="text/plain",
+        status="processing", chunks_processed=2
+    )
+    async_session.add(document)
+    await async_session.commit()
+
+    response = client.get(f"/api/documents/{document.id}/status", headers=_auth_headers(client, test_user))
+    assert response.status_code == 200
+    assert response.json()["status"] == "processing"
+    assert response.json()["chunks_processed"] == 2
+
+    other = Document(user_id=test_superuser["id"], title="Other", content="Content", content_type="text/plain")
+    async_session.add(other)
+    await async_session.commit()
+    response = client.get(f"/api/documents/{other.id}/status", headers=_auth_headers(client, test_user))
+    assert response.status_code == 403
+
+async def test_create_document_rejected_when_ingestion_queue_is_full(
+    client: TestClient,
+    init_db,
+    test_user: dict,
+    async_session: AsyncSession,
+    monkeypatch
+):
+    """Test that a document the pipeline cannot accept is answered with 503 and not kept."""
+    def submit(document_id):
+        raise IngestionQueueFullError("Ingestion queue is full")
+
+    monkeypatch.setattr(ingestion_pipeline, "submit", submit)
+    response = client.post(
+        "/api/documents/",
+        json={"title": "Rejected", "content": "Some content", "content_type": "text/plain"},
+        headers=_auth_headers(client, test_user)
+    )
+
+    assert response.status_code == 503
+    assert await async_session.scalar(select(func.count()).select_from(Document)) == 0
+
+async def test_upload_document_streams_multibyte_text(
+    client: TestClient,
+    init_db,
+    test_user: dict,
+    async_session: AsyncSession,
+    monkeypatch
+):
+    """Test that an upload read in small blocks keeps characters split across blocks, staged in parts."""
+    submitted = []
+    monkeypatch.setattr(ingestion_pipeline, "submit", submitted.append)
+    monkeypatch.setattr(settings, "UPLOAD_READ_BLOCK_BYTES", 5)
+    monkeypatch.setattr(settings, "UPLOAD_APPEND_BLOCK_CHARS", 8)
+    text = "naïve café — 日本語のテキスト 🚀 " * 20
+
+    response = client.post(
+        "/api/documents/upload",
+        data={"title": "Unicode"},
+        files={"file": ("unicode.txt", text.encode("utf-8"), "text/plain")},
+        headers=_auth_headers(client, test_user)
+    )
+
+    assert response.status_code == 201, response.text
+    document_id = response.json()["id"]
+    assert submitted == [document_id]
+    document = await async_session.get(Document, document_id)
+    assert document.content == text
+    parts = (await async_session.execute(
+        select(DocumentPart.content).where(DocumentPart.document_id == document_id).order_by(DocumentPart.position)
+    )).scalars().all()
+    assert len(parts) > 1
+    assert "".join(parts) == text
+
+async def test_upload_document_rejects_oversized_file(
+    client: TestClient,
+    init_db,
+    test_user: dict,
+    async_session: AsyncSession,
+    monkeypatch
+):
+    """Test that an upload over the size limit is answered with 413 and not kept."""
+    monkeypatch.setattr(ingestion_pipeline, "submit", lambda document_id: None)
+    monkeypatch.setattr(settings, "UPLOAD_READ_BLOCK_BYTES", 16)
+    monkeypatch.setattr(settings, "UPLOAD_MAX_BYTES", 100)
+
+    response = client.post(
+        "/api/documents/upload",
+        data={"title": "Too large"},
+        files={"file": ("large.txt", b"x" * 101, "text/plain")},
+        headers=_auth_headers(client, test_user)
+    )
+
+    assert response.status_code == 413
+    assert await async_session.scalar(select(func.count()).select_from(Document)) == 0
+    assert await async_session.scalar(select(func.count()).select_from(DocumentPart)) == 0
+
+async def test_bulk_create_documents_from_json_array(
+    client: TestClient,
+    init_db,
+    test_user: dict,
+    async_session: AsyncSession,
+    fake_embeddings: EmbeddingService
+):
+    """Test that a JSON array is stored with IDs returned in input order."""
+    documents = _bulk_documents(3)
+
+    response = client.post("/api/documents/bulk", json=documents, headers=_auth_headers(client, test_user))
+
+    assert response.status_code == 201, response.text
+    result = response.json()
+    assert result["documents"] == 3 and result["chunks"] > 0
+    titles = await _titles_by_id(async_session)
+    assert [titles[document_id] for document_id in result["document_ids"]] == ["Bulk 0", "Bulk 1", "Bulk 2"]
+
+    response = client.post("/api/documents/bulk", json={"title": "Not a list"}, headers=_auth_headers(client, test_user))
+    assert response.status_code == 422
+
+async def test_bulk_create_documents_from_ndjson(
+    client: TestClient,
+    init_db,
+    test_user: dict,
+    async_session: AsyncSession,
+    fake_embeddings: EmbeddingService
+):
+    """Test that an NDJSON body, blank lines included, is stored with IDs in input order."""
+    documents = _bulk_documents(4)
+    body = "\n".join(json.dumps(document) for document in documents[:2]) + "\n\n"
+    body += "\n".join(json.dumps(document) for document in documents[2:])
+
+    response = client.post(
+        "/api/documents/bulk",
+        content=body.encode("utf-8"),
+        headers={**_auth_headers(client, test_user), "Content-Type": "application/x-ndjson"}
+    )
+
+    assert response.status_code == 201, response.text
+    result = response.json()
+    assert result["documents"] == 4
+    titles = await _titles_by_id(async_session)
+    assert [titles[document_id] for document_id in result["document_ids"]] == [f"Bulk {i}" for i in range(4)]
+
+async def test_bulk_create_documents_rejects_malformed_ndjson_line(
+    client: TestClient,
+    init_db,
+    test_user: dict,
+    async_session: AsyncSession,
+    fake_embeddings: EmbeddingService
+):
+    """Test that an invalid NDJSON line is answered with 422 naming the line."""
+    [document] = _bulk_documents(1)
+    body = json.dumps(document) + "\n" + '{"title": "Missing content"}' + "\n"
+
+    response = client.post(
+        "/api/documents/bulk",
+        content=body.encode("utf-8"),
+        headers={**_auth_headers(client, test_user), "Content-Type": "application/x-ndjson"}
+    )
+
+    assert response.status_code == 422
+    assert "line 2" in response.json()["detail"]
@@ -0,0 +1,92 @@
+import json
+import pytest
+from typing import List
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.document import Document
+from app.models.qa_session import QASession
+
+pytestmark = pytest.mark.asyncio
+
+def _auth_headers(client: TestClient, user: dict) -> dict:
+    response = client.post(
+        "/api/auth/login",
+        data={"username": user["username"], "password": user["password"]}
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def _walk(client: TestClient, url: str, headers: dict, limit: int) -> List[List[int]]:
+    """Follow X-Next-Cursor from the first page to the last, returning the IDs on each page."""
+    pages = []
+    params = {"limit": limit}
+    while True:
+        response = client.get(url, params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        pages.append([item["id"] for item in response.json()])
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if next_cursor is None:
+            return pages
+        assert 'rel="next"' in response.headers["Link"]
+        params = {"limit": limit, "cursor": next_cursor}
+
+async def test_keyset_pagination_visits_every_row_once(
+    client: TestClient,
+    init_db,
+    test_user: dict,
+    async_session: AsyncSession
+):
+    """Test that following cursors returns every QA session exactly once, in creation order."""
+    qa_sessions = [QASession(user_id=test_user["id"], name=f"Session {i}") for i in range(7)]
+    async_session.add_all(qa_sessions)
+    await async_session.commit()
+    headers = _auth_headers(client, test_user)
+
+    pages = _walk(client, "/api/qa/sessions", headers, limit=3)
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [qa_session_id for page in pages for qa_session_id in page] == [s.id for s in qa_sessions]
+
+async def test_page_size_is_capped_and_cursor_validated(
+    client: TestClient,
+    init_db,
+    test_superuser: dict,
+    async_session: AsyncSession,
+    monkeypatch
+):
+    """Test that oversized pages are capped and malformed cursors rejected."""
+    monkeypatch.setattr(settings, "PAGE_SIZE_MAX", 2)
+    async_session.add_all([QASession(user_id=test_superuser["id"], name=f"Session {i}") for i in range(3)])
+    await async_session.commit()
+    headers = _auth_headers(client, test_superuser)
+
+    response = client.get("/api/qa/sessions", params={"limit": 100}, headers=headers)
+    assert len(response.json()) == 2
+    assert "X-Next-Cursor" in response.headers
+
+    response = client.get("/api/users/", params={"cursor": "not-a-cursor"}, headers=headers)
+    assert response.status_code == 400
+
+async def test_export_streams_ndjson(
+    client: TestClient,
+    init_db,
+    test_user: dict,
+    test_superuser: dict,
+    async_session: AsyncSession
+):
+    """Test that admins can export every document as newline-delimited JSON."""
+    async_session.add_all([
+        Document(user_id=test_user["id"], title=f"Document {i}", content=f"Content {i}", content_type="text/plain")
+        for i in range(5)
+    ])
+    await async_session.commit()
+
+    response = client.get("/api/documents/export", headers=_auth_headers(client, test_superuser))
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["content"] for row in rows] == [f"Content {i}" for i in range(5)]
+
+    response = client.get("/api/documents/export", headers=_auth_headers(client, test_user))
+    assert response.status_code == 403
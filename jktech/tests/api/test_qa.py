@@ -0,0 +1,131 @@
+import json
+import pytest
+from typing import List
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.document import Document
+from app.services.document_service import DocumentService
+
+pytestmark = pytest.mark.asyncio
+
+# Statements per request once the user's principal is cached
+MAX_STATEMENTS = {
+    "create": 6,
+    "list": 3,
+    "read": 3,
+    "update": 7,
+}
+
+async def _create_documents(session: AsyncSession, user_id: int, count: int) -> List[int]:
+    documents = [
+        Document(user_id=user_id, title=f"Document {i}", content=f"Content {i}", content_type="text/plain")
+        for i in range(count)
+    ]
+    session.add_all(documents)
+    await session.commit()
+    return [document.id for document in documents]
+
+def _auth_headers(client: TestClient, user: dict) -> dict:
+    response = client.post(
+        "/api/auth/login",
+        data={"username": user["username"], "password": user["password"]}
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def _count(client: TestClient, statements: List[str], method: str, url: str, **kwargs) -> int:
+    statements.clear()
+    response = client.request(method, url, **kwargs)
+    assert response.status_code < 300, response.text
+    return len(statements)
+
+async def test_qa_session_statement_counts_do_not_grow(
+    client: TestClient,
+    init_db,
+    test_user: dict,
+    async_session: AsyncSession,
+    statements: List[str]
+):
+    """Test that QA session endpoints issue a constant number of statements."""
+    headers = _auth_headers(client, test_user)
+    document_ids = await _create_documents(async_session, test_user["id"], 20)
+    # Resolve the principal once so no request below looks up the user
+    client.get("/api/users/me", headers=headers)
+
+    counts = {}
+    for size in (2, 20):
+        selected = document_ids[:size]
+        create_count = _count(
+            client, statements, "POST", "/api/qa/sessions",
+            json={"name": f"Session {size}", "document_ids": selected}, headers=headers
+        )
+        qa_session_id = client.get("/api/qa/sessions", headers=headers).json()[-1]["id"]
+        counts[size] = {
+            "create": create_count,
+            "list": _count(client, statements, "GET", "/api/qa/sessions", headers=headers),
+            "read": _count(client, statements, "GET", f"/api/qa/sessions/{qa_session_id}", headers=headers),
+            "update": _count(
+                client, statements, "PUT", f"/api/qa/sessions/{qa_session_id}",
+                json={"document_ids": list(reversed(selected))}, headers=headers
+            ),
+        }
+
+    for endpoint, limit in MAX_STATEMENTS.items():
+        assert counts[20][endpoint] <= limit, (endpoint, counts)
+    # The second round also lists two sessions instead of one
+    assert counts[20]["list"] == counts[2]["list"]
+    assert counts[20]["create"] == counts[2]["create"]
+    assert counts[20]["update"] == counts[2]["update"]
+
+def _parse_events(body: str) -> List[tuple]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+async def test_ask_question_stream(
+    client: TestClient,
+    init_db,
+    test_user: dict,
+    async_session: AsyncSession
+):
+    """Test that the streaming endpoint emits sources before the answer and stores the question."""
+    headers = _auth_headers(client, test_user)
+    document_service = DocumentService()
+    document_ids = []
+    for i in range(2):
+        document = await document_service.create_document(
+            async_session, test_user["id"], f"Document {i}",
+            " ".join(f"streaming test content {i} word{j}" for j in range(50)), "text/plain"
+        )
+        document_ids.append(document.id)
+    qa_session_id = client.post(
+        "/api/qa/sessions", json={"name": "Stream", "document_ids": document_ids}, headers=headers
+    ).json()["id"]
+
+    response = client.post(
+        "/api/qa/ask/stream",
+        json={"question": "What is in the documents?", "qa_session_id": qa_session_id},
+        headers=headers
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = _parse_events(response.text)
+    names = [name for name, _ in events]
+    assert names[0] == "sources"
+    assert names[-1] == "done"
+    assert set(names[1:-1]) == {"token"}
+    answer = "".join(data["text"] for name, data in events if name == "token")
+    assert events[-1][1]["answer"] == answer
+
+    questions = client.get(f"/api/qa/sessions/{qa_session_id}", headers=headers).json()["questions"]
+    assert [question["answer_text"] for question in questions] == [answer]
+
+    missing = client.post(
+        "/api/qa/ask/stream",
+        json={"question": "Anything?", "qa_session_id": qa_session_id + 1},
+        headers=headers
+    )
+    assert missing.status_code == 404
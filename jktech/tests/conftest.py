@@ -1,24 +1,35 @@
 import asyncio
+import sys
+import types
+import numpy as np
 import pytest
 import pytest_asyncio
-from typing import AsyncGenerator, Generator
+from typing import AsyncGenerator, Generator, List
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import StaticPool
 
 from app.db.base import Base, get_async_session
 from app.main import app
 from app.core.config import settings
+from app.services import embedding_batcher
+from app.services.embedding_service import EmbeddingService
+from app.services.model_registry import model_registry
+from app.services.principal_cache import principal_cache
 from app.services.user_service import UserService
 
+# Tests never load a real embedding model; see the fake_model_registry fixture
+settings.EMBEDDING_WARMUP_ON_STARTUP = False
+
 # Use an in-memory SQLite database for testing
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
 engine = create_async_engine(
     TEST_DATABASE_URL,
     connect_args={"check_same_thread": False},
-    poolclass=NullPool,
+    poolclass=StaticPool,  # Share the in-memory database between connections
 )
 async_session_maker = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
@@ -38,11 +49,95 @@ async def async_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
         yield session
 
+class FakeEmbeddingModel:
+    """Deterministic stand-in for a sentence-transformers model that records every encode call."""
+
+    max_seq_length = 256
+
+    def __init__(self):
+        self.calls: List[List[str]] = []
+
+    def encode(self, texts, normalize_embeddings=False):
+        self.calls.append(list(texts))
+        vectors = np.array(
+            [[(sum(text.encode("utf-8")) + i) % 97 + 1.0 for i in range(settings.EMBEDDING_DIMENSION)] for text in texts],
+            dtype=np.float32
+        ).reshape(len(texts), settings.EMBEDDING_DIMENSION)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True) if normalize_embeddings else vectors
+
+@pytest.fixture
+def fake_model() -> FakeEmbeddingModel:
+    return FakeEmbeddingModel()
+
+@pytest.fixture
+def embedding_service(fake_model: FakeEmbeddingModel) -> EmbeddingService:
+    """Embedding service backed by the fake model, chunking by words."""
+    return EmbeddingService(model=fake_model)
+
+@pytest.fixture
+def fake_model_registry(fake_model: FakeEmbeddingModel, monkeypatch) -> FakeEmbeddingModel:
+    """Serve the configured embedding model from the fake model to every service in the process."""
+    monkeypatch.setattr(model_registry, "_models", {settings.EMBEDDING_MODEL: fake_model})
+    monkeypatch.setattr(model_registry, "_stats", {})
+    monkeypatch.setattr(embedding_batcher, "_batchers", {})
+    return fake_model
+
+class FakeTensor:
+    def __init__(self, numel: int, element_size: int = 4):
+        self._numel = numel
+        self._element_size = element_size
+
+    def numel(self) -> int:
+        return self._numel
+
+    def element_size(self) -> int:
+        return self._element_size
+
+class FakeSentenceTransformer(FakeEmbeddingModel):
+    """Stand-in for ``sentence_transformers.SentenceTransformer``, counting loads by model name."""
+
+    loads: List[str] = []
+
+    def __init__(self, model_name: str):
+        super().__init__()
+        FakeSentenceTransformer.loads.append(model_name)
+        self.model_name = model_name
+
+    def parameters(self) -> List[FakeTensor]:
+        return [FakeTensor(1000), FakeTensor(24)]
+
+    def buffers(self) -> List[FakeTensor]:
+        return [FakeTensor(8, element_size=8)]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return settings.EMBEDDING_DIMENSION
+
+@pytest.fixture
+def fake_sentence_transformers(monkeypatch) -> type:
+    """Make the model registry load ``FakeSentenceTransformer`` models."""
+    FakeSentenceTransformer.loads = []
+    monkeypatch.setitem(
+        sys.modules, "sentence_transformers", types.SimpleNamespace(SentenceTransformer=FakeSentenceTransformer)
+    )
+    return FakeSentenceTransformer
+
 @pytest_asyncio.fixture
-async def client() -> AsyncGenerator[TestClient, None]:
+async def client(fake_model_registry: FakeEmbeddingModel) -> AsyncGenerator[TestClient, None]:
     with TestClient(app) as c:
         yield c
 
+@pytest.fixture
+def statements() -> Generator[List[str], None, None]:
+    """Record the SQL statements executed against the test database."""
+    executed: List[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield executed
+    event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
 @pytest_asyncio.fixture
 async def init_db() -> AsyncGenerator[None, None]:
     async with engine.begin() as conn:
@@ -50,6 +145,8 @@ async def init_db() -> AsyncGenerator[None, None]:
     yield
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()  # Close the shared in-memory connection
+    principal_cache.clear()  # User IDs are reused by the next test's database
 
 @pytest_asyncio.fixture
 async def test_user(async_session: AsyncSession) -> dict:
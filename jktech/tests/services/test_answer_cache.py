@@ -0,0 +1,39 @@
+import numpy as np
+from app.services.answer_cache import AnswerCache, document_set_version
+
+class TestAnswerCache:
+    """Test the semantic answer cache."""
+
+    def _unit(self, *values: float) -> np.ndarray:
+        vector = np.asarray(values, dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+
+    def test_similar_question_hits(self):
+        """Test that only questions above the similarity threshold are served from the cache."""
+        cache = AnswerCache(similarity_threshold=0.95, max_entries_per_session=8, max_sessions=8)
+        version = document_set_version({1: "v1"})
+        cache.put(1, version, [1], self._unit(1, 0, 0), {"answer": "cached"})
+
+        hit = cache.get(1, version, self._unit(1, 0.1, 0))
+        assert hit is not None
+        assert hit[0]["answer"] == "cached"
+        assert cache.get(1, version, self._unit(0, 1, 0)) is None
+
+    def test_document_set_version_change_misses(self):
+        """Test that answers are not reused after the session's documents change."""
+        cache = AnswerCache(similarity_threshold=0.95, max_entries_per_session=8, max_sessions=8)
+        cache.put(1, document_set_version({1: "v1"}), [1], self._unit(1, 0, 0), {"answer": "cached"})
+
+        assert cache.get(1, document_set_version({1: "v2"}), self._unit(1, 0, 0)) is None
+        assert cache.get(1, document_set_version({1: "v1", 2: "v1"}), self._unit(1, 0, 0)) is None
+
+    def test_invalidate_document(self):
+        """Test that invalidating a document drops only sessions containing it."""
+        cache = AnswerCache(similarity_threshold=0.95, max_entries_per_session=8, max_sessions=8)
+        cache.put(1, "a", [1, 2], self._unit(1, 0, 0), {"answer": "one"})
+        cache.put(2, "b", [3], self._unit(1, 0, 0), {"answer": "two"})
+
+        cache.invalidate_document(2)
+
+        assert cache.get(1, "a", self._unit(1, 0, 0)) is None
+        assert cache.get(2, "b", self._unit(1, 0, 0)) is not None
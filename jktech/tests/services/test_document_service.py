@@ -0,0 +1,77 @@
+import pytest
+from typing import Dict
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.document import DocumentChunk
+from app.services.document_service import DocumentService
+from app.services.embedding_service import EmbeddingService
+
+pytestmark = pytest.mark.asyncio
+
+WORDS = [f"word{(i * 7919) % 100003}" for i in range(6000)]
+
+async def _stored_chunks(session: AsyncSession, document_id: int) -> Dict[str, DocumentChunk]:
+    async with AsyncSession(session.bind) as fresh:
+        chunks = (await fresh.execute(
+            select(DocumentChunk).where(DocumentChunk.document_id == document_id).order_by(DocumentChunk.chunk_index)
+        )).scalars().all()
+    return {chunk.content: chunk for chunk in chunks}
+
+async def test_update_keeps_unchanged_chunks_and_embeds_only_new_ones(
+    init_db,
+    test_user: dict,
+    async_session: AsyncSession,
+    embedding_service: EmbeddingService,
+    fake_model
+):
+    """Test that an edit keeps the other chunks' rows and embeddings and only encodes the changed windows."""
+    service = DocumentService(embedding_service=embedding_service)
+    document = await service.create_document(
+        async_session, test_user["id"], "Versioned", " ".join(WORDS), "text/plain"
+    )
+    before = await _stored_chunks(async_session, document.id)
+    fake_model.calls.clear()
+
+    edited = " ".join(WORDS[:3000] + ["inserted"] + WORDS[3000:])
+    await service.update_document(async_session, document.id, content=edited)
+    after = await _stored_chunks(async_session, document.id)
+
+    expected = embedding_service.chunk_text(edited)
+    assert [chunk.content for chunk in after.values()] == [chunk["content"] for chunk in expected]
+    assert [chunk.chunk_index for chunk in after.values()] == list(range(len(expected)))
+
+    kept = [content for content in after if content in before]
+    changed = [content for content in after if content not in before]
+    assert kept and 0 < len(changed) <= 3
+    for content in kept:
+        assert after[content].id == before[content].id
+        assert after[content].embedding.tolist() == before[content].embedding.tolist()
+    assert sorted(text for call in fake_model.calls for text in call) == sorted(changed)
+
+async def test_chunk_shared_between_documents_is_embedded_once(
+    init_db,
+    test_user: dict,
+    async_session: AsyncSession,
+    embedding_service: EmbeddingService,
+    fake_model
+):
+    """Test that a second document reuses the stored embedding of a chunk it shares with the first."""
+    service = DocumentService(embedding_service=embedding_service)
+    shared, first_tail, second_tail = WORDS[:1000], WORDS[1000:1500], WORDS[2000:2500]
+
+    first = await service.create_document(
+        async_session, test_user["id"], "First", " ".join(shared + first_tail), "text/plain"
+    )
+    second = await service.create_document(
+        async_session, test_user["id"], "Second", " ".join(shared + second_tail), "text/plain"
+    )
+
+    shared_chunk = " ".join(shared)
+    first_chunks = await _stored_chunks(async_session, first.id)
+    second_chunks = await _stored_chunks(async_session, second.id)
+    assert shared_chunk in first_chunks and shared_chunk in second_chunks
+    assert first.embeddings_reused == 0
+    assert second.embeddings_reused >= 1
+    assert [text for call in fake_model.calls for text in call].count(shared_chunk) == 1
+    assert second_chunks[shared_chunk].embedding.tolist() == first_chunks[shared_chunk].embedding.tolist()
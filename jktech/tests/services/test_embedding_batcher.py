@@ -0,0 +1,53 @@
+import asyncio
+import pytest
+import numpy as np
+from app.services.embedding_batcher import EmbeddingBatcher
+
+pytestmark = pytest.mark.asyncio
+
+class FakeModel:
+    """Model stub that records the size of every encode call."""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, normalize_embeddings=False):
+        self.calls.append(len(texts))
+        return np.array([[float(len(text)), 1.0] for text in texts])
+
+async def test_concurrent_queries_are_batched():
+    """Test that concurrent requests are encoded in a single call."""
+    model = FakeModel()
+    batcher = EmbeddingBatcher(model, max_batch_size=16, max_wait_ms=20)
+
+    texts = ["a", "bb", "ccc", "dddd"]
+    vectors = await asyncio.gather(*(batcher.embed(text) for text in texts))
+
+    assert model.calls == [4]
+    assert [vector[0] for vector in vectors] == [1.0, 2.0, 3.0, 4.0]
+
+async def test_full_batch_is_flushed_immediately():
+    """Test that reaching the max batch size does not wait for the timer."""
+    model = FakeModel()
+    batcher = EmbeddingBatcher(model, max_batch_size=2, max_wait_ms=10000)
+
+    vectors = await asyncio.wait_for(
+        asyncio.gather(batcher.embed("a"), batcher.embed("b")),
+        timeout=1
+    )
+
+    assert model.calls == [2]
+    assert len(vectors) == 2
+
+async def test_running_batches_are_tracked_until_done():
+    """Test that batches in flight are referenced by the batcher and released when done."""
+    model = FakeModel()
+    batcher = EmbeddingBatcher(model, max_batch_size=1, max_wait_ms=10000)
+
+    embedding = asyncio.ensure_future(batcher.embed("a"))
+    await asyncio.sleep(0)
+    assert len(batcher._tasks) == 1
+
+    await embedding
+    await asyncio.sleep(0)
+    assert not batcher._tasks
@@ -1,6 +1,7 @@
+import re
 import pytest
 import numpy as np
-from app.services.embedding_service import EmbeddingService
+from app.services.embedding_service import MAX_PENDING_CHARS, EmbeddingService, TokenWindowChunker, WordWindowChunker
 
 pytestmark = pytest.mark.asyncio
 
@@ -26,6 +27,30 @@ class TestEmbeddingService:
             assert "end_idx" in chunk["metadata"]
             assert "word_count" in chunk["metadata"]
 
+    def test_chunk_text_fits_model_sequence_length(self):
+        """Test that chunks are never truncated by the model."""
+        service = EmbeddingService()
+        text = "Retrieval-augmented generation combines search with language models. " * 300
+        chunks = service.chunk_text(text)
+
+        assert len(chunks) > 1
+        for chunk in chunks:
+            token_count = len(service.model.tokenizer(chunk["content"], add_special_tokens=False)["input_ids"])
+            assert token_count <= service.max_chunk_tokens()
+            assert text[chunk["metadata"]["char_start"]:chunk["metadata"]["char_end"]] == chunk["content"]
+
+    def test_chunk_text_edit_is_local(self):
+        """Test that an edit only changes the chunks around it."""
+        service = EmbeddingService()
+        words = [f"word{(i * 7919) % 1013}" for i in range(2000)]
+        original = service.chunk_text(" ".join(words), chunk_size=100, overlap=20)
+        edited = service.chunk_text(" ".join(words[:1000] + ["inserted"] + words[1000:]), chunk_size=100, overlap=20)
+
+        original_contents = {chunk["content"] for chunk in original}
+        changed = [chunk for chunk in edited if chunk["content"] not in original_contents]
+
+        assert 0 < len(changed) <= 3
+
     def test_get_embeddings(self):
         """Test embedding generation."""
         service = EmbeddingService()
@@ -68,3 +93,60 @@ class TestEmbeddingService:
 
         # The most relevant result should be the first text (about Python)
         assert results[0]["index"] in [0, 2]  # Either "Python is a programming language" or "FastAPI is a web framework for Python"
+
+def _word_piece_tokenizer(text, **kwargs):
+    """Stand-in fast tokenizer: one token per word or punctuation mark."""
+    return {"offset_mapping": [match.span() for match in re.finditer(r"\w+|[^\w\s]", text)]}
+
+def _push_in_pieces(chunker, text, size):
+    chunks = []
+    for start in range(0, len(text), size):
+        chunks.extend(chunker.push(text[start:start + size]))
+    return chunks + chunker.finish()
+
+class TestIncrementalChunkers:
+    """Test that chunking text piece by piece matches chunking it at once."""
+
+    TEXT = " ".join(f"word{(i * 7919) % 1013}, ünïcode-{i % 17}." for i in range(1500))
+
+    @pytest.mark.parametrize("size", [1, 7, 64, 1000])
+    def test_word_window_chunker_matches_whole_text(self, size):
+        whole = WordWindowChunker(100, 20)
+        expected = whole.push(self.TEXT) + whole.finish()
+
+        assert len(expected) > 1
+        assert _push_in_pieces(WordWindowChunker(100, 20), self.TEXT, size) == expected
+
+    @pytest.mark.parametrize("size", [1, 7, 64, 1000])
+    def test_token_window_chunker_matches_whole_text(self, size):
+        whole = TokenWindowChunker(_word_piece_tokenizer, 64, overlap=8)
+        expected = whole.push(self.TEXT) + whole.finish()
+
+        assert len(expected) > 1
+        assert _push_in_pieces(TokenWindowChunker(_word_piece_tokenizer, 64, overlap=8), self.TEXT, size) == expected
+        for chunk in expected:
+            assert self.TEXT[chunk["metadata"]["char_start"]:chunk["metadata"]["char_end"]] == chunk["content"]
+
+    def test_token_window_chunker_bounds_text_without_whitespace(self):
+        chunker = TokenWindowChunker(_word_piece_tokenizer, 64, overlap=8, min_tokens=1)
+        piece = "x" * 10000
+
+        chunks = []
+        for _ in range(MAX_PENDING_CHARS // len(piece) + 2):
+            chunks.extend(chunker.push(piece))
+            assert len(chunker._pending) <= MAX_PENDING_CHARS
+        chunks.extend(chunker.finish())
+
+        assert "".join(chunk["content"] for chunk in chunks) == piece * (MAX_PENDING_CHARS // len(piece) + 2)
+
+    @pytest.mark.parametrize("size", [4096, 10000])
+    def test_token_window_chunker_continues_word_after_forced_cut(self, size):
+        """Test that a run without whitespace cut at MAX_PENDING_CHARS is not split into two words."""
+        run = "ab-" * (MAX_PENDING_CHARS // 3 + 1000)
+        text = self.TEXT[:2000] + " " + run + " " + self.TEXT[2000:4000]
+        assert len(run) > MAX_PENDING_CHARS
+
+        whole = TokenWindowChunker(_word_piece_tokenizer, 64, overlap=8)
+        expected = whole.push(text) + whole.finish()
+
+        assert _push_in_pieces(TokenWindowChunker(_word_piece_tokenizer, 64, overlap=8), text, size) == expected
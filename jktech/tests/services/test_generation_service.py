@@ -0,0 +1,107 @@
+import asyncio
+import pytest
+from app.core.metrics import metrics
+from app.services import generation_service as generation_service_module
+from app.services.generation_service import (
+    GenerationQueueFullError, GenerationService, LocalGenerationBackend, PromptTemplate
+)
+
+pytestmark = pytest.mark.asyncio
+
+class TrackingBackend(LocalGenerationBackend):
+    """Local backend that records how many calls run at the same time."""
+
+    def __init__(self):
+        super().__init__(token_delay_ms=5)
+        self.running = 0
+        self.max_running = 0
+
+    async def stream(self, prompt):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            async for token in super().stream(prompt):
+                yield token
+        finally:
+            self.running -= 1
+
+async def test_identical_prompts_are_coalesced():
+    """Test that identical prompts in flight share one backend call."""
+    backend = TrackingBackend()
+    service = GenerationService(backend, max_in_flight=4, max_queued=8, coalesce=True)
+
+    answers = await asyncio.gather(*(service.generate("Document 1, Chunk 1: text") for _ in range(5)))
+
+    assert backend.calls == 1
+    assert len(set(answers)) == 1
+    assert "based on the 1 most relevant chunks" in answers[0]
+
+async def test_in_flight_limit_queues_prompts():
+    """Test that at most max_in_flight calls run and the rest wait their turn."""
+    backend = TrackingBackend()
+    service = GenerationService(backend, max_in_flight=2, max_queued=8, coalesce=True)
+
+    answers = await asyncio.gather(*(service.generate(f"prompt {i}") for i in range(6)))
+
+    assert backend.calls == 6
+    assert backend.max_running == 2
+    assert len(answers) == 6
+    assert service.in_flight == 0
+
+async def test_full_queue_rejects_prompts():
+    """Test that prompts beyond the queue limit are rejected."""
+    service = GenerationService(TrackingBackend(), max_in_flight=1, max_queued=1, coalesce=False)
+
+    results = await asyncio.gather(
+        *(service.generate(f"prompt {i}") for i in range(3)), return_exceptions=True
+    )
+
+    assert [isinstance(result, GenerationQueueFullError) for result in results] == [False, False, True]
+    assert service.in_flight == 0
+
+class BlockingBackend(LocalGenerationBackend):
+    """Local backend whose calls wait until released."""
+
+    def __init__(self):
+        super().__init__(token_delay_ms=0)
+        self.release = asyncio.Event()
+
+    async def stream(self, prompt):
+        await self.release.wait()
+        async for token in super().stream(prompt):
+            yield token
+
+async def test_gauges_report_the_shared_service(monkeypatch):
+    """Test that creating another service does not take over the in-flight and queue gauges."""
+    def gauges():
+        snapshot = metrics.snapshot()
+        return snapshot["generation_in_flight"]["value"], snapshot["generation_queued"]["value"]
+
+    backend = BlockingBackend()
+    service = GenerationService(backend, max_in_flight=1, max_queued=4, coalesce=False)
+    tasks = [asyncio.create_task(service.generate(f"prompt {i}")) for i in range(3)]
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+    assert (service.in_flight, len(service._waiters)) == (1, 2)
+    shared = generation_service_module.generation_service
+    assert gauges() == (shared.in_flight, len(shared._waiters))
+
+    monkeypatch.setattr(generation_service_module, "generation_service", service)
+    assert gauges() == (1, 2)
+
+    backend.release.set()
+    await asyncio.gather(*tasks)
+    assert gauges() == (0, 0)
+
+async def test_prompt_template_requires_variables():
+    """Test that a compiled template reports its variables and rejects missing ones."""
+    template = PromptTemplate("""
+        Context: {context}
+        Question: {question}
+    """)
+
+    assert template.input_variables == ["context", "question"]
+    assert template.format(context="c", question="q") == "Context: c\nQuestion: q\n"
+    with pytest.raises(KeyError):
+        template.format(context="c")
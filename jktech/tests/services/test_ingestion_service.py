@@ -0,0 +1,113 @@
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.document import Document, DocumentChunk, DocumentPart
+from app.services.document_service import DocumentService
+from app.services.embedding_service import EmbeddingService
+from app.services.ingestion_service import IngestionPipeline
+
+pytestmark = pytest.mark.asyncio
+
+CONTENT = " ".join(f"word{i}" for i in range(3000))
+
+def _pipeline(session: AsyncSession, embedding_service: EmbeddingService, **kwargs) -> IngestionPipeline:
+    """Pipeline on the test database that encodes in-process with the fake model."""
+    pipeline = IngestionPipeline(
+        num_workers=1,
+        batch_size=2,
+        session_maker=lambda: AsyncSession(session.bind, expire_on_commit=False),
+        embedding_service=embedding_service,
+        **kwargs
+    )
+
+    async def encode(texts):
+        return embedding_service.get_embeddings(texts)
+
+    pipeline._encode = encode
+    return pipeline
+
+async def _create_document(session: AsyncSession, user_id: int, content: str = CONTENT) -> int:
+    document = Document(
+        user_id=user_id, title="Pending", content=content, content_type="text/plain", status="processing"
+    )
+    session.add(document)
+    await session.commit()
+    return document.id
+
+async def test_process_chunks_and_embeds_document(
+    init_db,
+    test_user: dict,
+    async_session: AsyncSession,
+    embedding_service: EmbeddingService
+):
+    """Test that processing stores every chunk in batches and marks the document ready."""
+    document_id = await _create_document(async_session, test_user["id"])
+    pipeline = _pipeline(async_session, embedding_service, read_slice_chars=1000)
+
+    await pipeline.process(document_id)
+
+    async with AsyncSession(async_session.bind) as session:
+        document = await session.get(Document, document_id)
+        stored = await session.scalar(select(func.count()).where(DocumentChunk.document_id == document_id))
+    expected = embedding_service.chunk_text(CONTENT)
+    assert document.status == "ready"
+    assert document.chunks_total == document.chunks_processed == stored == len(expected)
+
+async def test_process_reads_staged_upload_parts(
+    init_db,
+    test_user: dict,
+    async_session: AsyncSession,
+    embedding_service: EmbeddingService,
+    monkeypatch
+):
+    """Test that a streamed upload is ingested from its parts, which are dropped once it is ready."""
+    monkeypatch.setattr(settings, "UPLOAD_APPEND_BLOCK_CHARS", 1000)
+
+    async def pieces():
+        for start in range(0, len(CONTENT), 333):
+            yield CONTENT[start:start + 333]
+
+    document = await DocumentService(embedding_service=embedding_service).create_document_from_stream(
+        async_session, test_user["id"], "Uploaded", pieces(), "text/plain"
+    )
+    parts = await async_session.scalar(select(func.count()).where(DocumentPart.document_id == document.id))
+    assert parts > 1
+
+    await _pipeline(async_session, embedding_service).process(document.id)
+
+    async with AsyncSession(async_session.bind) as session:
+        stored = (await session.execute(
+            select(DocumentChunk.content).where(DocumentChunk.document_id == document.id)
+            .order_by(DocumentChunk.chunk_index)
+        )).scalars().all()
+        remaining = await session.scalar(select(func.count()).where(DocumentPart.document_id == document.id))
+    assert stored == [chunk["content"] for chunk in embedding_service.chunk_text(CONTENT)]
+    assert remaining == 0
+
+async def test_start_resumes_unfinished_documents_and_marks_failures(
+    init_db,
+    test_user: dict,
+    async_session: AsyncSession,
+    embedding_service: EmbeddingService
+):
+    """Test that documents left processing are requeued on start, and failures are recorded."""
+    document_id = await _create_document(async_session, test_user["id"])
+    pipeline = _pipeline(async_session, embedding_service)
+
+    async def failing_encode(texts):
+        raise RuntimeError("model unavailable")
+
+    pipeline._encode = failing_encode
+    await pipeline.start()
+    try:
+        await pipeline._resume_task
+        await pipeline._queue.join()
+    finally:
+        await pipeline.stop()
+
+    async with AsyncSession(async_session.bind) as session:
+        document = await session.get(Document, document_id)
+    assert document.status == "failed"
+    assert document.error == "model unavailable"
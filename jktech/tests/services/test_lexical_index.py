@@ -0,0 +1,72 @@
+import pytest
+from typing import List, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.document import ChunkTerm, Document, DocumentChunk, chunk_terms
+from app.services.lexical_index import LexicalIndex, reciprocal_rank_fusion
+
+async def _index_chunks(session: AsyncSession, user_id: int, contents: List[str]) -> Tuple[int, List[int]]:
+    document = Document(user_id=user_id, title="Indexed", content=" ".join(contents), content_type="text/plain")
+    session.add(document)
+    await session.flush()
+    chunks = []
+    for index, content in enumerate(contents):
+        terms = chunk_terms(content)
+        chunk = DocumentChunk(
+            document_id=document.id, chunk_index=index, content=content, term_count=sum(terms.values()),
+            terms=[ChunkTerm(term=term, document_id=document.id, term_frequency=count) for term, count in terms.items()]
+        )
+        session.add(chunk)
+        chunks.append(chunk)
+    await session.commit()
+    return document.id, [chunk.id for chunk in chunks]
+
+class TestLexicalIndex:
+    """Test the lexical index helpers used for hybrid retrieval."""
+
+    def test_chunk_terms_keep_identifiers(self):
+        """Test that identifiers are indexed as single, case-folded terms."""
+        terms = chunk_terms("Error ERR-4711 raised by parser v1.2; see err-4711.")
+
+        assert terms["err-4711"] == 2
+        assert terms["v1.2"] == 1
+        assert "ERR" not in terms
+
+    def test_reciprocal_rank_fusion(self):
+        """Test that items ranked well in both lists come first."""
+        dense = [(1, 0.9), (2, 0.8), (3, 0.7)]
+        lexical = [(3, 12.0), (4, 9.0), (1, 3.0)]
+
+        fused = reciprocal_rank_fusion([dense, lexical], k=60)
+
+        assert [chunk_id for chunk_id, _ in fused][:2] == [1, 3]
+        assert {chunk_id for chunk_id, _ in fused} == {1, 2, 3, 4}
+
+@pytest.mark.asyncio
+async def test_search_ranks_chunks_by_bm25(init_db, test_user: dict, async_session: AsyncSession):
+    """Test that search ranks the chunks matching more and rarer query terms first."""
+    document_id, chunk_ids = await _index_chunks(async_session, test_user["id"], [
+        "the parser raised ERR-4711 on the config file",
+        "the parser handles config files",
+        "unrelated text about the weather",
+    ])
+
+    results = await LexicalIndex().search(async_session, [document_id], "parser ERR-4711", limit=10)
+
+    assert [chunk_id for chunk_id, _ in results] == chunk_ids[:2]
+    assert results[0][1] > results[1][1] > 0
+    assert await LexicalIndex().search(async_session, [document_id + 1], "parser", limit=10) == []
+
+@pytest.mark.asyncio
+async def test_search_keeps_common_terms_in_small_corpora(init_db, test_user: dict, async_session: AsyncSession):
+    """Test that the document frequency cutoff only drops common terms once the corpus is large enough."""
+    document_id, chunk_ids = await _index_chunks(async_session, test_user["id"], [
+        "invoice total due", "invoice paid in full", "shipping address"
+    ])
+
+    small = LexicalIndex(max_df_ratio=0.5, max_df_min_chunks=10)
+    large = LexicalIndex(max_df_ratio=0.5, max_df_min_chunks=3)
+
+    results = await small.search(async_session, [document_id], "invoice", limit=10)
+    assert {chunk_id for chunk_id, _ in results} == set(chunk_ids[:2])
+    assert await large.search(async_session, [document_id], "invoice", limit=10) == []
@@ -0,0 +1,41 @@
+from app.core.config import settings
+from app.services import embedding_service as embedding_service_module
+from app.services.embedding_service import EmbeddingService
+from app.services.model_registry import ModelRegistry
+
+class TestModelRegistry:
+    """Test the process-wide embedding model registry."""
+
+    def test_model_is_loaded_once_and_shared(self, fake_sentence_transformers, monkeypatch):
+        """Test that every embedding service gets the same model, loaded once."""
+        registry = ModelRegistry()
+        monkeypatch.setattr(embedding_service_module, "model_registry", registry)
+
+        services = [EmbeddingService() for _ in range(3)]
+        models = {id(service.model) for service in services}
+        services[0].get_embeddings(["shared"])
+
+        assert len(models) == 1
+        assert fake_sentence_transformers.loads == [settings.EMBEDDING_MODEL]
+        assert registry.get() is services[0].model
+
+    def test_stats_report_load_and_memory(self, fake_sentence_transformers, monkeypatch):
+        """Test that loading and warming up record load time, parameter size and RSS growth."""
+        monkeypatch.setattr(settings, "EMBEDDING_PRELOAD_MODELS", "other-model, ")
+        registry = ModelRegistry()
+
+        registry.warm_up()
+
+        assert fake_sentence_transformers.loads == [settings.EMBEDDING_MODEL, "other-model"]
+        stats = registry.stats()
+        assert stats["process_rss_bytes"] > 0
+        assert set(stats["models"]) == {settings.EMBEDDING_MODEL, "other-model"}
+        model_stats = stats["models"]["other-model"]
+        assert model_stats["parameter_bytes"] == (1000 + 24) * 4 + 8 * 8
+        assert model_stats["load_seconds"] >= 0 and model_stats["rss_delta_bytes"] >= 0
+        assert model_stats["warmup_seconds"] is not None
+        assert model_stats["embedding_dimension"] == settings.EMBEDDING_DIMENSION
+        assert model_stats["max_seq_length"] == 256
+
+        registry.warm_up()
+        assert len(fake_sentence_transformers.loads) == 2
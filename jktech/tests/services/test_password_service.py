@@ -0,0 +1,41 @@
+import asyncio
+import time
+import pytest
+from app.core.security import create_password_context
+from app.services.password_service import PasswordService, PasswordServiceBusyError, queue_wait_histogram
+
+pytestmark = pytest.mark.asyncio
+
+async def test_hashes_are_upgraded_when_rounds_change():
+    """Test that a hash made with another bcrypt cost is replaced on successful verification."""
+    old_hash = await PasswordService(create_password_context(4)).hash("secret")
+    service = PasswordService(create_password_context(5))
+
+    assert await PasswordService(create_password_context(4)).verify_and_update("secret", old_hash) == (True, None)
+    assert await service.verify_and_update("wrong", old_hash) == (False, None)
+    valid, new_hash = await service.verify_and_update("secret", old_hash)
+    assert valid and new_hash.startswith("$2b$05$")
+    assert await service.verify_and_update("secret", new_hash) == (True, None)
+
+async def test_admission_limit_and_event_loop_stays_free():
+    """Test that excess operations are rejected and the loop keeps running while hashing."""
+    service = PasswordService(create_password_context(10), max_workers=1, max_queued=1)
+    waits = queue_wait_histogram.count
+
+    async def ticker():
+        ticks = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < 0.05:
+            await asyncio.sleep(0.005)
+            ticks += 1
+        return ticks
+
+    results = await asyncio.gather(
+        service.hash("a"), service.hash("b"), service.hash("c"), ticker(), return_exceptions=True
+    )
+    service.shutdown()
+
+    assert [type(result) for result in results[:3]] == [str, str, PasswordServiceBusyError]
+    assert queue_wait_histogram.count == waits + 2
+    assert results[3] >= 5
+    assert service.pending == 0
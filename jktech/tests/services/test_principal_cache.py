@@ -0,0 +1,101 @@
+import pytest
+
+from app.services import principal_cache as principal_cache_module
+from app.services.principal_cache import Principal, PrincipalCache
+
+class TestPrincipalCache:
+    """Test the principal cache."""
+
+    def test_entries_expire_after_ttl(self, monkeypatch):
+        """Test that a principal is served until its TTL passes."""
+        now = [1000.0]
+        monkeypatch.setattr(principal_cache_module.time, "monotonic", lambda: now[0])
+        cache = PrincipalCache(ttl_seconds=30, max_entries=10, notify_channel="")
+        cache.put(Principal(id=1, is_active=True, is_superuser=False))
+
+        now[0] += 29
+        assert cache.get(1) == Principal(id=1, is_active=True, is_superuser=False)
+        now[0] += 1
+        assert cache.get(1) is None
+        assert len(cache._entries) == 0
+
+    def test_invalidation_and_lru_bound(self):
+        """Test that invalidated and least recently used principals are dropped."""
+        cache = PrincipalCache(ttl_seconds=30, max_entries=2, notify_channel="")
+        for user_id in (1, 2):
+            cache.put(Principal(id=user_id, is_active=True, is_superuser=False))
+        cache.get(1)
+        cache.put(Principal(id=3, is_active=True, is_superuser=False))
+
+        assert cache.get(2) is None
+        assert cache.get(1) is not None
+        cache.invalidate(1)
+        assert cache.get(1) is None
+
+    def test_zero_ttl_disables_cache(self):
+        """Test that a TTL of zero caches nothing and records no lookups."""
+        cache = PrincipalCache(ttl_seconds=0, max_entries=10, notify_channel="")
+        misses = cache.misses.value
+        cache.put(Principal(id=1, is_active=True, is_superuser=True))
+
+        assert cache.get(1) is None
+        assert cache.misses.value == misses
+
+    def test_lookup_racing_an_invalidation_is_not_cached(self):
+        """Test that a principal looked up before the user was invalidated is not put back."""
+        cache = PrincipalCache(ttl_seconds=30, max_entries=2, notify_channel="")
+        stale = cache.generation()
+        cache.invalidate(1)
+        cache.put(Principal(id=1, is_active=True, is_superuser=True), stale)
+        assert cache.get(1) is None
+
+        # Invalidations of other users, or from before the lookup, do not block it
+        fresh = cache.generation()
+        cache.invalidate(2)
+        cache.put(Principal(id=1, is_active=True, is_superuser=False), fresh)
+        assert cache.get(1) is not None
+
+        # Once an invalidation record is evicted, older lookups are not trusted
+        cache.invalidate(3)
+        cache.invalidate(4)
+        cache.put(Principal(id=5, is_active=True, is_superuser=False), fresh)
+        assert cache.get(5) is None
+
+class FakeListenerConnection:
+    closed = False
+
+    def remove_termination_listener(self, callback):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+@pytest.mark.asyncio
+async def test_listener_reconnects_after_losing_its_connection(monkeypatch):
+    """Test that a lost listener connection is replaced and the cache is cleared of what it may have missed."""
+    cache = PrincipalCache(ttl_seconds=30, max_entries=10, notify_channel="principals")
+    connections = []
+
+    async def connect_listener():
+        if not connections:
+            connections.append("refused")
+            raise OSError("connection refused")
+        cache._listener = FakeListenerConnection()
+        connections.append(cache._listener)
+
+    async def no_sleep(delay):
+        pass
+
+    monkeypatch.setattr(cache, "_connect_listener", connect_listener)
+    monkeypatch.setattr(principal_cache_module.asyncio, "sleep", no_sleep)
+    lost = cache._listener = FakeListenerConnection()
+    cache.put(Principal(id=1, is_active=True, is_superuser=False))
+
+    cache._on_listener_terminated(lost)
+    assert cache._listener is None
+    await cache._reconnect_task
+
+    assert len(connections) == 2 and cache._listener is connections[-1]
+    assert cache.get(1) is None
+    await cache.stop_listener()
+    assert connections[-1].closed and cache._listener is None
@@ -0,0 +1,70 @@
+import numpy as np
+from app.services.query_cache import QueryEmbeddingCache, ENTRY_OVERHEAD_BYTES
+
+class TestQueryEmbeddingCache:
+    """Test the query embedding cache."""
+
+    def test_normalized_queries_share_an_entry(self):
+        """Test that case and whitespace differences hit the same entry."""
+        cache = QueryEmbeddingCache(max_bytes=1024 * 1024, path="")
+        cache.put("model", "What is  Python?", np.ones(4))
+
+        cached = cache.get("model", "what is python?")
+
+        assert cached is not None
+        assert cached.dtype == np.float32
+        assert cache.get("other-model", "what is python?") is None
+        assert cache.stats()["hits"] >= 1
+
+    def test_lru_eviction_respects_byte_budget(self):
+        """Test that the least recently used entry is evicted first."""
+        entry_size = 16 + len("model") + 1 + ENTRY_OVERHEAD_BYTES
+        cache = QueryEmbeddingCache(max_bytes=2 * entry_size, path="")
+        cache.put("model", "a", np.zeros(4))
+        cache.put("model", "b", np.zeros(4))
+        cache.get("model", "a")
+        cache.put("model", "c", np.zeros(4))
+
+        assert len(cache) == 2
+        assert cache.get("model", "b") is None
+        assert cache.get("model", "a") is not None
+
+    def test_persistence(self, tmp_path):
+        """Test that a saved cache is restored by a new instance."""
+        path = str(tmp_path / "query_cache.npz")
+        cache = QueryEmbeddingCache(max_bytes=1024 * 1024, path=path)
+        cache.put("model", "hello", np.arange(4))
+        cache.save()
+
+        restored = QueryEmbeddingCache(max_bytes=1024 * 1024, path=path)
+        restored.load()
+
+        np.testing.assert_array_equal(restored.get("model", "hello"), np.arange(4, dtype=np.float32))
+
+    def test_load_keeps_most_recent_entries_within_smaller_budget(self, tmp_path):
+        """Test that reloading into a smaller budget keeps the most recently used entries, in LRU order."""
+        path = str(tmp_path / "query_cache.npz")
+        entry_size = 16 + len("model") + 1 + ENTRY_OVERHEAD_BYTES
+        cache = QueryEmbeddingCache(max_bytes=1024 * 1024, path=path)
+        for text in "abcde":
+            cache.put("model", text, np.zeros(4))
+        cache.get("model", "a")  # Now the most recently used
+        cache.save()
+
+        restored = QueryEmbeddingCache(max_bytes=3 * entry_size, path=path)
+        restored.load()
+
+        assert [text for _, text in restored._entries] == ["d", "e", "a"]
+        restored.put("model", "f", np.zeros(4))
+        assert [text for _, text in restored._entries] == ["e", "a", "f"]
+
+    def test_load_rejects_pickled_data(self, tmp_path):
+        """Test that a cache file containing pickled objects is ignored instead of unpickled."""
+        path = tmp_path / "query_cache.npz"
+        with open(path, "wb") as f:
+            np.savez(f, keys=np.array([object()], dtype=object), lengths=np.array([1]), vectors=np.ones(1))
+
+        cache = QueryEmbeddingCache(max_bytes=1024 * 1024, path=str(path))
+        cache.load()
+
+        assert len(cache) == 0
@@ -0,0 +1,100 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.document import DocumentChunk
+from app.services.document_service import DocumentService
+from app.services.embedding_service import EmbeddingService
+from app.services.qa_session_service import QASessionService
+from app.services.rag_service import RAGService
+from app.services.vector_index import vector_index_registry
+
+pytestmark = pytest.mark.asyncio
+
+async def test_retrieved_sources_carry_document_titles_and_chunk_ids(
+    init_db,
+    test_user: dict,
+    async_session: AsyncSession,
+    embedding_service: EmbeddingService
+):
+    """Test that sources name the document each retrieved chunk came from, with that chunk's ID."""
+    document_service = DocumentService(embedding_service=embedding_service)
+    titles = {}
+    for name, marker in (("Billing guide", "invoice"), ("Parser manual", "ERR-4711")):
+        content = " ".join(f"{name.split()[0].lower()} section{i} {marker if i == 30 else 'filler'}" for i in range(400))
+        document = await document_service.create_document(async_session, test_user["id"], name, content, "text/plain")
+        titles[document.id] = name
+    qa_session = await QASessionService().create_qa_session(
+        async_session, test_user["id"], "Sources", list(titles)
+    )
+    vector_index_registry.invalidate_session(qa_session.id)
+
+    rag_service = RAGService(embedding_service=embedding_service)
+    question = "What does ERR-4711 mean?"
+    chunks = await rag_service.retrieve_relevant_chunks(
+        async_session, question, qa_session.id, top_k=3,
+        query_embedding=embedding_service.get_embeddings([question])[0]
+    )
+    sources = rag_service.build_sources(chunks)
+
+    stored = dict((await async_session.execute(
+        select(DocumentChunk.id, DocumentChunk.document_id).where(DocumentChunk.document_id.in_(list(titles)))
+    )).all())
+    assert sources
+    assert len({source["chunk_id"] for source in sources}) == len(sources)
+    for source in sources:
+        assert stored[source["chunk_id"]] == source["document_id"]
+        assert source["document_title"] == titles[source["document_id"]]
+
+    assert [source["chunk_id"] for source in sources] == [chunk["chunk_id"] for chunk in chunks]
+    # The identifier is only found lexically, and only in the parser manual
+    assert "ERR-4711" in chunks[0]["content"]
+    assert sources[0]["document_title"] == "Parser manual"
+    vector_index_registry.invalidate_session(qa_session.id)
+
+async def test_source_scores_are_cosine_similarities_in_both_modes(
+    init_db,
+    test_user: dict,
+    async_session: AsyncSession,
+    embedding_service: EmbeddingService,
+    monkeypatch
+):
+    """Test that ``score`` stays the cosine similarity when rankings are fused, with the fusion score beside it."""
+    document_service = DocumentService(embedding_service=embedding_service)
+    content = " ".join(f"parser section{i} {'ERR-4711' if i == 30 else 'filler'}" for i in range(400))
+    document = await document_service.create_document(async_session, test_user["id"], "Parser manual", content, "text/plain")
+    qa_session = await QASessionService().create_qa_session(
+        async_session, test_user["id"], "Scores", [document.id]
+    )
+    vector_index_registry.invalidate_session(qa_session.id)
+
+    rag_service = RAGService(embedding_service=embedding_service)
+    question = "What does ERR-4711 mean?"
+    query_embedding = embedding_service.get_embeddings([question])[0]
+
+    monkeypatch.setattr(settings, "RETRIEVAL_MODE", "dense")
+    dense = await rag_service.retrieve_relevant_chunks(
+        async_session, question, qa_session.id, top_k=1000, query_embedding=query_embedding
+    )
+    monkeypatch.setattr(settings, "RETRIEVAL_MODE", "hybrid")
+    hybrid = await rag_service.retrieve_relevant_chunks(
+        async_session, question, qa_session.id, top_k=3, query_embedding=query_embedding
+    )
+
+    assert [chunk["rank"] for chunk in dense] == list(range(1, len(dense) + 1))
+    assert all(chunk["fusion_score"] is None for chunk in dense)
+    cosine = {chunk["chunk_id"]: chunk["score"] for chunk in dense}
+
+    assert len(hybrid) > 1
+    assert [chunk["rank"] for chunk in hybrid] == list(range(1, len(hybrid) + 1))
+    fusion_scores = [chunk["fusion_score"] for chunk in hybrid]
+    assert fusion_scores == sorted(fusion_scores, reverse=True)
+    for chunk in hybrid:
+        assert chunk["score"] == pytest.approx(cosine[chunk["chunk_id"]])
+
+    sources = rag_service.build_sources(hybrid)
+    assert [(source["score"], source["fusion_score"], source["rank"]) for source in sources] == [
+        (chunk["score"], chunk["fusion_score"], chunk["rank"]) for chunk in hybrid
+    ]
+    vector_index_registry.invalidate_session(qa_session.id)
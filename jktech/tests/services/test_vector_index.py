@@ -0,0 +1,94 @@
+import pytest
+import numpy as np
+from app.services.vector_index import ExactIndex, IVFIndex, DocumentSetIndex
+
+class TestVectorIndex:
+    """Test the vector indexes used for QA-session retrieval."""
+
+    def _random_vectors(self, n: int, dimension: int = 32, seed: int = 0) -> np.ndarray:
+        rng = np.random.default_rng(seed)
+        return rng.normal(size=(n, dimension)).astype(np.float32)
+
+    def test_exact_index_search(self):
+        """Test that the exact index returns the nearest vectors first."""
+        vectors = self._random_vectors(100)
+        index = ExactIndex(dimension=32)
+        index.add(list(range(100)), vectors)
+
+        results = index.search(vectors[42], top_k=3)
+
+        assert len(results) == 3
+        assert results[0][0] == 42
+        assert results[0][1] == pytest.approx(1.0, abs=1e-5)
+        assert results[0][1] >= results[1][1] >= results[2][1]
+
+    def test_exact_index_remove(self):
+        """Test that removed vectors are no longer returned."""
+        vectors = self._random_vectors(10)
+        index = ExactIndex(dimension=32)
+        index.add(list(range(10)), vectors)
+        index.remove([3])
+
+        assert len(index) == 9
+        assert 3 not in [chunk_id for chunk_id, _ in index.search(vectors[3], top_k=10)]
+
+    def test_ivf_index_falls_back_to_exact_search(self):
+        """Test that small indexes are not clustered."""
+        index = IVFIndex(dimension=32, min_vectors=1000)
+        index.add(list(range(50)), self._random_vectors(50))
+
+        assert not index.is_trained
+        assert len(index) == 50
+
+    def test_ivf_index_recall(self):
+        """Test that a trained IVF index finds the query vector itself."""
+        vectors = self._random_vectors(2000)
+        index = IVFIndex(dimension=32, nlist=16, nprobe=4, min_vectors=500)
+        index.add(list(range(2000)), vectors)
+
+        assert index.is_trained
+        hits = sum(index.search(vectors[i], top_k=1)[0][0] == i for i in range(0, 2000, 50))
+        assert hits == 40
+
+        # Incremental updates keep the index consistent
+        index.remove(list(range(100)))
+        assert len(index) == 1900
+        assert index.search(vectors[10], top_k=5)[0][0] != 10
+
+    def test_document_set_index_reloads_changed_documents(self):
+        """Test that only new or updated documents are reported as stale."""
+        index = DocumentSetIndex(ExactIndex(dimension=32))
+        index.add_document(1, "v1", [10, 11], self._random_vectors(2))
+        index.add_document(2, "v1", [20], self._random_vectors(1, seed=1))
+
+        stale = index.stale_documents({1: "v1", 2: "v2", 3: "v1"})
+
+        assert stale == {2, 3}
+        index.stale_documents({2: "v2"})
+        assert len(index) == 1
+
+    def test_int8_quantized_search_rescores_exactly(self):
+        """Test that int8 scanning with float32 rescoring returns exact scores."""
+        vectors = self._random_vectors(500)
+        exact = ExactIndex(dimension=32)
+        quantized = ExactIndex(dimension=32, quantization="int8", rescore_factor=4)
+        exact.add(list(range(500)), vectors)
+        quantized.add(list(range(500)), vectors)
+
+        query = self._random_vectors(1, seed=7)[0]
+        expected = exact.search(query, top_k=5)
+        results = quantized.search(query, top_k=5)
+
+        assert [chunk_id for chunk_id, _ in results] == [chunk_id for chunk_id, _ in expected]
+        assert results[0][1] == pytest.approx(expected[0][1], abs=1e-5)
+
+    def test_ivf_index_scores_given_ids(self):
+        """Test that candidates can be scored without a full search."""
+        vectors = self._random_vectors(1000)
+        index = IVFIndex(dimension=32, nlist=8, min_vectors=500)
+        index.add(list(range(1000)), vectors)
+
+        scores = dict(index.score(vectors[7], [7, 500, 2000]))
+
+        assert set(scores) == {7, 500}
+        assert scores[7] == pytest.approx(1.0, abs=1e-5)
@@ -0,0 +1,52 @@
+import importlib.util
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+BULK_INGEST = Path(__file__).parent.parent / "scripts" / "bulk_ingest.py"
+
+@pytest.fixture(scope="module")
+def bulk_ingest():
+    spec = importlib.util.spec_from_file_location("bulk_ingest", BULK_INGEST)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def test_reads_ndjson_and_json_array(bulk_ingest):
+    """Test that both input formats yield the same documents, with the default content type filled in."""
+    records = [
+        {"title": "First", "content": "one"},
+        {"title": "Second", "content": "two", "content_type": "text/markdown"},
+    ]
+    expected = [
+        {"title": "First", "content_type": "text/plain", "content": "one"},
+        {"title": "Second", "content_type": "text/markdown", "content": "two"},
+    ]
+    ndjson = "\n".join(json.dumps(record) for record in records) + "\n\n"
+
+    assert list(bulk_ingest.read_documents(io.StringIO(ndjson))) == expected
+    assert list(bulk_ingest.read_documents(io.StringIO("  " + json.dumps(records)))) == expected
+
+@pytest.mark.parametrize("bad_line", [
+    '{"title": "No content"}',
+    '{"title": "Bad", "content": {"nested": true}}',
+    '["not", "an", "object"]',
+    '{"title": "Truncated", "cont',
+])
+def test_invalid_ndjson_record_reports_its_line(bulk_ingest, bad_line):
+    """Test that a record the /bulk endpoint would reject stops the load at its line."""
+    stream = io.StringIO('{"title": "Good", "content": "ok"}\n\n' + bad_line + "\n")
+    documents = bulk_ingest.read_documents(stream)
+
+    assert next(documents)["title"] == "Good"
+    with pytest.raises(ValueError, match="on line 3"):
+        next(documents)
+
+def test_invalid_array_record_reports_its_index(bulk_ingest):
+    """Test that a bad record in a JSON array is reported by its index."""
+    stream = io.StringIO(json.dumps([{"title": "Good", "content": "ok"}, {"content": "untitled"}]))
+
+    with pytest.raises(ValueError, match="at index 1"):
+        list(bulk_ingest.read_documents(stream))
@@ -0,0 +1,46 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.db import engine as engine_module
+from app.db.engine import EngineInstrumentation, InstrumentedAsyncQueuePool, create_engine, engine_stats
+
+pytestmark = pytest.mark.asyncio
+
+async def test_slow_queries_are_recorded(tmp_path, monkeypatch):
+    """Test that statements slower than the threshold are logged and exposed."""
+    monkeypatch.setattr(settings, "DB_SLOW_QUERY_MS", 0)
+    engine = create_engine(f"sqlite+aiosqlite:///{tmp_path / 'slow.db'}", name="slow_test")
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        stats = engine_stats()["slow_test"]
+    finally:
+        await engine.dispose()
+        engine_module._instrumented_engines.pop("slow_test", None)
+
+    assert stats["echo"] is False
+    assert stats["slow_queries"][-1]["statement"] == "SELECT 1"
+
+async def test_pool_checkout_is_instrumented(tmp_path):
+    """Test that pool usage and checkout waits are reported."""
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedAsyncQueuePool, pool_size=1, max_overflow=0
+    )
+    instrumentation = EngineInstrumentation("pool_test", engine, slow_query_ms=1000)
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            status = instrumentation.pool_status()
+            assert status["checked_out"] == 1
+            assert status["size"] == 1
+            assert metrics.snapshot()["db_pool_test_pool_in_use"]["value"] == 1
+    finally:
+        await engine.dispose()
+
+    assert engine.sync_engine.pool.checkout_wait.count >= 1
+    assert instrumentation.pool_status()["checked_out"] == 0
+    assert "pool_test" not in engine_stats()
@@ -0,0 +1,86 @@
+import time
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.db.base import Base
+from app.db.replica import ReplicaRouter, replica_router, request_writes
+from app.models.user import User
+
+pytestmark = pytest.mark.asyncio
+
+class LaggingReplicaRouter(ReplicaRouter):
+    """Router whose replica always reports the given lag."""
+
+    def __init__(self, engine, lag_seconds: float, **kwargs):
+        super().__init__(engine, **kwargs)
+        self.reported_lag = lag_seconds
+
+    async def _measure_lag(self) -> float:
+        return self.reported_lag
+
+async def test_reads_use_healthy_replica_except_after_own_writes(tmp_path):
+    """Test that a user's reads stay on the primary for the read-your-writes window."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    router = ReplicaRouter(engine, read_your_writes_seconds=60, max_lag_seconds=5, health_check_seconds=60)
+    try:
+        assert await router.use_replica(1)
+        router.record_write(1)
+        assert not await router.use_replica(1)
+        assert await router.use_replica(2)
+    finally:
+        await engine.dispose()
+
+    assert not await ReplicaRouter(None).use_replica(1)
+
+async def test_write_token_keeps_reads_on_primary_across_workers(tmp_path):
+    """Test that a signed write token from another worker keeps only its own user's reads on the primary."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    writer = ReplicaRouter(engine, read_your_writes_seconds=60, health_check_seconds=60)
+    reader = ReplicaRouter(engine, read_your_writes_seconds=60, health_check_seconds=60)
+    try:
+        token = writer.write_token(1, time.time())
+        assert not await reader.use_replica(1, token)
+        assert await reader.use_replica(2, token)
+        assert await reader.use_replica(1, writer.write_token(1, time.time() - 120))
+        assert await reader.use_replica(1, token[:-1] + ("0" if token[-1] != "0" else "1"))
+        assert await reader.use_replica(1, "not-a-token")
+    finally:
+        await engine.dispose()
+
+async def test_unhealthy_or_lagging_replica_falls_back(tmp_path):
+    """Test that reads go to the primary when the replica is unreachable or too far behind."""
+    unreachable = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    router = ReplicaRouter(unreachable, read_your_writes_seconds=60, max_lag_seconds=5, health_check_seconds=60)
+    assert not await router.use_replica(1)
+    assert router.lag_seconds is None
+    await unreachable.dispose()
+
+    replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    lagging = LaggingReplicaRouter(replica, 30.0, max_lag_seconds=5, health_check_seconds=0)
+    assert not await lagging.use_replica(1)
+    lagging.reported_lag = 1.0
+    assert await lagging.use_replica(1)
+    await replica.dispose()
+
+async def test_commit_records_user_write(tmp_path):
+    """Test that committing a write on a session tagged with a user opens their read-your-writes window."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    try:
+        async with AsyncSession(engine) as session:
+            session.info["user_id"] = 4242
+            await session.commit()
+            assert not replica_router.wrote_recently(4242)
+
+            writes = {}
+            token = request_writes.set(writes)
+            try:
+                session.add(User(email="replica@example.com", username="replica", hashed_password="x"))
+                await session.commit()
+            finally:
+                request_writes.reset(token)
+            assert replica_router.wrote_recently(4242)
+            assert list(writes) == [4242]
+    finally:
+        await engine.dispose()
@@ -0,0 +1,113 @@
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+import pytest
+from sqlalchemy import Column, Integer, LargeBinary, MetaData, Table, create_engine, insert, select, text, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.types import VECTOR_DTYPE, Vector, vectors_to_matrix
+from app.models.document import Document, DocumentChunk
+
+MIGRATION_0003 = Path(__file__).resolve().parents[1] / "alembic" / "versions" / "0003_binary_chunk_embeddings.py"
+
+@pytest.mark.asyncio
+async def test_vector_round_trips_through_the_orm(init_db, test_user: dict, async_session: AsyncSession):
+    """Test that embeddings are stored as little-endian float32 bytes and read back unchanged."""
+    document = Document(user_id=test_user["id"], title="Vectors", content="Vectors", content_type="text/plain")
+    async_session.add(document)
+    await async_session.flush()
+    vector = np.linspace(-1, 1, settings.EMBEDDING_DIMENSION, dtype=np.float64)
+    async_session.add_all([
+        DocumentChunk(document_id=document.id, chunk_index=0, content="with", embedding=vector),
+        DocumentChunk(document_id=document.id, chunk_index=1, content="without", embedding=None),
+    ])
+    await async_session.commit()
+
+    async with AsyncSession(async_session.bind) as session:
+        stored = (await session.execute(
+            select(DocumentChunk.embedding).order_by(DocumentChunk.chunk_index)
+        )).scalars().all()
+        raw = (await session.execute(
+            select(type_coerce(DocumentChunk.embedding, LargeBinary)).where(DocumentChunk.chunk_index == 0)
+        )).scalar_one()
+
+    assert stored[0].dtype == VECTOR_DTYPE
+    np.testing.assert_array_equal(stored[0], vector.astype(np.float32))
+    assert stored[1] is None
+    assert raw == vector.astype("<f4").tobytes()
+
+class TestVector:
+    """Test the float32 vector column type."""
+
+    def test_dimension_is_checked(self):
+        vector_type = Vector(4)
+
+        assert vector_type.process_bind_param([1, 2, 3, 4], None) == np.arange(1, 5, dtype="<f4").tobytes()
+        with pytest.raises(ValueError):
+            vector_type.process_bind_param([1, 2, 3], None)
+        with pytest.raises(ValueError):
+            vector_type.process_bind_param(np.ones((2, 4)), None)
+        with pytest.raises(ValueError):
+            vector_type.process_result_value(np.ones(3, dtype="<f4").tobytes(), None)
+        with pytest.raises(ValueError):
+            vector_type.process_result_value(b"\x00" * 15, None)
+        assert vector_type.process_bind_param(None, None) is None
+        assert vector_type.process_result_value(None, None) is None
+
+    def test_vectors_to_matrix(self):
+        rows = np.arange(12, dtype=np.float32).reshape(3, 4)
+        matrix = vectors_to_matrix([row.astype("<f4").tobytes() for row in rows], 4)
+
+        assert matrix.shape == (3, 4)
+        assert matrix.dtype == np.float32
+        np.testing.assert_array_equal(matrix, rows)
+        assert vectors_to_matrix([], 4).shape == (0, 4)
+        with pytest.raises(ValueError):
+            vectors_to_matrix([rows[0].tobytes(), rows[1][:3].tobytes()], 4)
+
+def test_embedding_backfill_converts_every_batch(tmp_path):
+    """Test that migration 0003 converts embeddings in ID batches, both ways."""
+    pytest.importorskip("alembic.op")
+    spec = importlib.util.spec_from_file_location("migration_0003", MIGRATION_0003)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'backfill.db'}")
+    metadata = MetaData()
+    chunks = Table(
+        "documentchunk", metadata,
+        Column("id", Integer, primary_key=True),
+        Column("embedding", LargeBinary),
+        Column("embedding_vec", LargeBinary),
+        Column("embedding_arr", LargeBinary),
+    )
+    metadata.create_all(engine)
+    vectors = [np.arange(4, dtype=np.float32) + i for i in range(5)]
+    with engine.begin() as conn:
+        conn.execute(insert(chunks), [
+            {"id": i + 1, "embedding": vector.astype("<f4").tobytes()} for i, vector in enumerate(vectors)
+        ] + [{"id": 6, "embedding": None}])
+
+        migration._backfill(
+            conn,
+            "SELECT id, embedding FROM documentchunk "
+            "WHERE id > :last_id AND embedding IS NOT NULL ORDER BY id LIMIT :limit",
+            "UPDATE documentchunk SET embedding_arr = :value WHERE id = :id",
+            lambda value: np.asarray(migration._bytes_to_array(value), dtype=np.float32).tobytes(),
+            batch_size=2
+        )
+        migration._backfill(
+            conn,
+            "SELECT id, embedding_arr FROM documentchunk "
+            "WHERE id > :last_id AND embedding_arr IS NOT NULL ORDER BY id LIMIT :limit",
+            "UPDATE documentchunk SET embedding_vec = :value WHERE id = :id",
+            lambda value: migration._array_to_bytes(np.frombuffer(value, dtype=np.float32).tolist()),
+            batch_size=2
+        )
+        rows = conn.execute(text("SELECT id, embedding, embedding_vec FROM documentchunk ORDER BY id")).all()
+
+    assert [row.embedding_vec for row in rows[:5]] == [row.embedding for row in rows[:5]]
+    assert rows[5].embedding_vec is None
+    np.testing.assert_array_equal(vectors_to_matrix([row.embedding_vec for row in rows[:5]], 4), np.stack(vectors))
@@ -0,0 +1,53 @@
+import subprocess
+import sys
+from pathlib import Path
+from typing import Set, Tuple
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Cumulative cold-import budgets in seconds, several times the current cost
+IMPORT_BUDGETS = {
+    "app.main": 3.0,
+    "scripts/init_db.py": 2.0,
+    "scripts/bulk_ingest.py": 3.0,
+    "scripts/generate_test_data.py": 3.0,
+}
+
+# Heavy ML and LLM packages that must only be imported on first use or at warm-up
+LAZY_MODULES = {"sentence_transformers", "torch", "transformers", "langchain", "langchain_community"}
+
+def _import_time(target: str) -> Tuple[float, Set[str]]:
+    """Cold-import a module or script in a fresh interpreter.
+
+    Returns the total import time in seconds and the top-level packages imported.
+    """
+    if target.endswith(".py"):
+        # Runs the script's imports without its __main__ block
+        code = f"import runpy; runpy.run_path({target!r}, run_name='import_time')"
+    else:
+        code = f"import {target}"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    total_us = 0
+    packages: Set[str] = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, self_us, _, name = [part.strip() for part in line.replace("import time:", "|").split("|")]
+        total_us += int(self_us)
+        packages.add(name.split(".")[0])
+    return total_us / 1_000_000, packages
+
+@pytest.mark.parametrize("target", list(IMPORT_BUDGETS))
+def test_cold_import_within_budget(target: str):
+    """Test that cold imports stay within budget and do not pull in ML dependencies."""
+    seconds, packages = _import_time(target)
+
+    assert not packages & LAZY_MODULES, sorted(packages & LAZY_MODULES)
+    assert seconds <= IMPORT_BUDGETS[target], f"{target} took {seconds:.2f}s to import"